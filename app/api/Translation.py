@@ -2,23 +2,75 @@
 翻译API接口 - 重构版
 """
 
-from fastapi import APIRouter, HTTPException
-from app.models.translation_models import TranslationRequest, TranslationResponse
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.models.translation_models import (
+    TranslationRequest, TranslationResponse, BatchTranslationRequest, BatchTranslationResponse,
+    MultiTargetTranslationRequest, MultiTargetTranslationResponse
+)
 from app.services.baidu_translation_service import baidu_translation_service
-from app.services.dom_replacement_service import dom_replacement_service
-from app.services.large_html_processor import large_html_processor
-from app.services.file_cache_service import file_cache_service
-from app.services.redis_path_cache_service import redis_path_cache_service
+from app.services.page_translation_service import page_translation_service
+from app.services.serializer_service import serializer_service
 
 router = APIRouter(prefix="/api", tags=["翻译"])
 
+# 流式返回缓存结果时每次写出的字符数
+STREAM_SLICE_SIZE = 64 * 1024
+
+
+async def _iter_html_slices(translated_html: str):
+    """按STREAM_SLICE_SIZE分片写出完整译文HTML"""
+    for start in range(0, len(translated_html), STREAM_SLICE_SIZE):
+        yield translated_html[start:start + STREAM_SLICE_SIZE]
+
+
+def _print_request(request: TranslationRequest, title: str):
+    """打印请求参数"""
+    print("=" * 80)
+    print(title)
+    print("=" * 80)
+    print(f"📍 路径: {request.path}")
+    print(f"📝 HTML Body 长度: {len(request.html_body)} 字符")
+    print(f"🌐 源语言: {request.source_language}")
+    print(f"🎯 目标语言: {request.target_language}")
+    print(f"💾 缓存策略: {'文件缓存' if request.cache else 'Redis缓存'}")
+
+
+def _build_validator_headers(result: dict, profile: str) -> dict:
+    """
+    生成ETag和Last-Modified响应头
+
+    缓存中保存的是核心数据的校验值，不同配置档的响应内容不同，ETag按配置档区分
+    """
+    headers = {"ETag": f'"{result["etag"]}-{profile}"'}
+    if result.get("last_modified"):
+        headers["Last-Modified"] = result["last_modified"]
+    return headers
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断If-None-Match是否包含当前ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
 
 @router.post("/translate", response_model=TranslationResponse, summary="终极翻译接口 - 100%替换率")
-async def translate_ultimate(request: TranslationRequest):
+async def translate_ultimate(
+    request: TranslationRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(None)
+):
     """
     终极翻译接口 - 追求100%替换率
 
     使用DOM解析 + 多重替换策略，确保最高的替换成功率
+
+    响应头包含ETag和Last-Modified，If-None-Match与当前ETag一致时返回304
+
+    缓存软过期后仍直接返回旧译文并在后台刷新，cache_status 和 X-Translation-Cache 标明 hit / stale / miss
     """
 
     # 1. 验证百度翻译服务
@@ -29,222 +81,259 @@ async def translate_ultimate(request: TranslationRequest):
         )
 
     # 2. 接收并打印所有参数
-    print("=" * 80)
-    print("🚀 终极翻译接口收到请求！")
-    print("=" * 80)
-    print(f"📍 路径: {request.path}")
-    print(f"📝 HTML Body 长度: {len(request.html_body)} 字符")
-    print(f"🌐 源语言: {request.source_language}")
-    print(f"🎯 目标语言: {request.target_language}")
-    print(f"💾 缓存策略: {'文件缓存' if request.cache else 'Redis缓存'}")
+    _print_request(request, "🚀 终极翻译接口收到请求！")
+
+    # 3. 检查缓存，未命中时翻译并保存
+    result = await page_translation_service.translate_with_cache(request)
+
+    # 4. 客户端已持有当前译文时返回304
+    headers = _build_validator_headers(result, request.profile)
+    headers["X-Translation-Cache"] = result["cache_status"].upper()
+    if _etag_matches(if_none_match, headers["ETag"]):
+        print("🎯 ETag一致，返回304")
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    return TranslationResponse(
+        success=True,
+        message=result["message"],
+        data=result["data"],
+        cache_status=result["cache_status"]
+    )
+
+
+@router.api_route("/translate/probe", methods=["GET", "HEAD"], response_model=TranslationResponse,
+                  summary="缓存探测接口 - 无需上传HTML")
+async def probe_translation(
+    response: Response,
+    path: str = Query(..., description="路径（域名+后缀）"),
+    source_language: str = Query(..., description="源语言"),
+    target_language: str = Query(..., description="目标语言"),
+    cache: bool = Query(True, description="缓存策略：true=文件缓存，false=Redis缓存"),
+    content_hash: Optional[str] = Query(None, description="md5(html_body)，与缓存指纹不一致时返回404"),
+    profile: str = Query("summary", pattern="^(html_only|summary|debug)$", description="返回数据配置档"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    缓存探测接口 - 只按路径和语言对查询缓存，命中时直接返回译文
 
-    # 3. 根据cache参数检查缓存
-    cached_result = None
+    - 命中返回与 /api/translate 相同的响应，响应头 X-Content-Fingerprint 为缓存内容指纹
+    - 已软过期的条目照常返回，X-Translation-Cache 为 STALE（探测请求没有HTML，不触发后台刷新）
+    - 未命中或 content_hash 与缓存指纹不一致时返回404，客户端再调用 /api/translate 上传HTML
+    - HEAD 请求只返回状态码和响应头
+    - If-None-Match与当前ETag一致时返回304
+    """
+    result = await page_translation_service.probe_cached_result(
+        path, source_language, target_language, cache, profile, content_hash
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="缓存未命中，请上传HTML翻译")
+
+    headers = _build_validator_headers(result, profile)
+    headers["X-Translation-Cache"] = result["cache_status"].upper()
+    if result["fingerprint"]:
+        headers["X-Content-Fingerprint"] = result["fingerprint"]
+
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    return TranslationResponse(
+        success=True,
+        message=result["message"],
+        data=result["data"],
+        cache_status=result["cache_status"]
+    )
+
+
+@router.api_route("/translate/html", methods=["GET", "HEAD"], summary="译文HTML接口 - 文件缓存命中时直接返回text/html")
+async def get_translated_html(
+    path: str = Query(..., description="路径（域名+后缀）"),
+    source_language: str = Query(..., description="源语言"),
+    target_language: str = Query(..., description="目标语言"),
+    content_hash: Optional[str] = Query(None, description="md5(html_body)，与缓存指纹不一致时返回404"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    译文HTML接口 - 只查文件缓存，命中时以静态文件方式（sendfile）返回译文HTML
+
+    - 不读取和解析缓存内容，响应头 X-Translation-Cache 为 HIT / STALE，X-Content-Fingerprint 为缓存内容指纹
+    - 未命中、content_hash 与缓存指纹不一致或条目为骨架存储格式时返回404，客户端再调用 /api/translate/stream 上传HTML
+    - If-None-Match与当前ETag一致时返回304
+    """
+    html_file = await page_translation_service.get_cached_html_file(path, source_language, target_language, content_hash)
+    if html_file is None:
+        raise HTTPException(status_code=404, detail="缓存未命中，请上传HTML翻译")
+
+    headers = {"X-Translation-Cache": html_file["cache_status"].upper()}
+    if html_file["etag"]:
+        headers.update(_build_validator_headers(html_file, "html"))
+    if html_file["fingerprint"]:
+        headers["X-Content-Fingerprint"] = html_file["fingerprint"]
+
+    if "ETag" in headers and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(html_file["html_path"], media_type="text/html; charset=utf-8", headers=headers)
+
+
+@router.post("/translate/stream", summary="流式翻译接口 - 直接返回text/html")
+async def translate_stream(request: TranslationRequest):
+    """
+    流式翻译接口 - 译文HTML以text/html分块返回
+
+    大型HTML逐块翻译和替换，每个块只等待它自己的片段翻译完成就立即写出，首字节不必等待整页翻译；
+    标准HTML整页翻译完成后一次写出。缓存元数据通过响应头返回：
+    - **X-Translation-Cache**: HIT / STALE（已软过期，后台刷新中）/ INCREMENTAL（页面已变化，增量翻译）/ MISS
+    - **X-Cache-Strategy**: file_cache / redis_cache
+    - **X-Processing-Mode**: file（文件缓存命中，直接发送译文HTML文件）/ cache / large_html / standard
+    """
+
+    if baidu_translation_service is None:
+        raise HTTPException(
+            status_code=500,
+            detail="百度翻译服务初始化失败，请检查.env配置"
+        )
+
+    _print_request(request, "🌊 流式翻译接口收到请求！")
+
+    headers = {"X-Cache-Strategy": "file_cache" if request.cache else "redis_cache"}
+    try:
+        headers["X-Cache-Key"] = page_translation_service.get_cache_service(request.cache).generate_cache_key(
+            request.path, request.source_language, request.target_language
+        )
+    except ValueError:
+        # 不支持的语言对不会写入缓存，不返回缓存键
+        pass
+
+    # 1. 文件缓存命中：直接发送译文HTML文件，不解析缓存内容
     if request.cache:
-        # 使用文件缓存 - 基于路径哈希
-        print("📁 检查文件缓存 (基于路径MD5哈希)...")
-        cached_result = await file_cache_service.get_cache(
-            request.path,
-            request.source_language,
-            request.target_language
+        html_file = await page_translation_service.get_cached_html_file(
+            request.path, request.source_language, request.target_language,
+            page_translation_service.compute_fingerprint(request.html_body)
         )
-    else:
-        # 使用Redis缓存 - 基于路径哈希
-        print("🔄 检查Redis缓存 (基于路径MD5哈希)...")
-        cached_result = await redis_path_cache_service.get_cache(
-            request.path,
-            request.source_language,
-            request.target_language
+        if html_file:
+            print("🎉 使用文件缓存结果，直接发送译文HTML文件！")
+            if html_file["cache_status"] == "stale":
+                page_translation_service.schedule_refresh(request)
+            headers.update({"X-Translation-Cache": html_file["cache_status"].upper(), "X-Processing-Mode": "file"})
+            return FileResponse(html_file["html_path"], media_type="text/html; charset=utf-8", headers=headers)
+
+    # 2. 缓存命中：按片段写出缓存中的译文
+    cache_entry = await page_translation_service.get_cached_entry(request)
+    cached_result = cache_entry["content"] if cache_entry else None
+    if cached_result and page_translation_service.is_cache_fresh(cached_result, request.html_body):
+        print("🎉 使用缓存结果，流式返回！")
+        cache_status = page_translation_service.get_cache_status(request, cache_entry)
+        if cache_status == "stale":
+            page_translation_service.schedule_refresh(request)
+        headers.update({"X-Translation-Cache": cache_status.upper(), "X-Processing-Mode": "cache"})
+        return StreamingResponse(
+            _iter_html_slices(page_translation_service.get_translated_html(cached_result)),
+            media_type="text/html; charset=utf-8",
+            headers=headers
         )
 
-    # 如果找到缓存，直接返回
-    if cached_result:
-        print("🎉 使用缓存结果，跳过翻译！")
-        return TranslationResponse(
-            success=True,
-            message=f"🎉 使用{'文件' if request.cache else 'Redis'}缓存结果！",
-            data=cached_result
+    # 3. 其他路径已有相同内容的译文：直接复用，只为当前路径写入指针
+    shared_result = await page_translation_service.get_shared_result(request)
+    if shared_result:
+        print("🎉 使用相同内容的共享译文，流式返回！")
+        await page_translation_service.save_cached_result(request, shared_result, pointer_only=True)
+        headers.update({"X-Translation-Cache": "HIT", "X-Processing-Mode": "cache"})
+        return StreamingResponse(
+            _iter_html_slices(page_translation_service.get_translated_html(shared_result)),
+            media_type="text/html; charset=utf-8",
+            headers=headers
         )
 
-    # 4. 检测是否为大型HTML（超过10万字符）
-    html_length = len(request.html_body)
-    is_large_html = html_length > 100000
+    # 页面内容已变化：复用缓存中的片段译文，只翻译新增片段
+    known_translations = await page_translation_service.get_known_translations(request, cached_result) if cached_result else None
+    headers["X-Translation-Cache"] = "INCREMENTAL" if cached_result else "MISS"
 
-    if is_large_html:
-        print("🔥 检测到大型HTML，启用专用处理模式...")
+    # 4. 与非流式接口共用请求合并：大型HTML逐块翻译和替换，每个块完成即写出，全部写出后再保存缓存；
+    #    标准HTML整页处理完成后一次写出
+    headers["X-Processing-Mode"] = "large_html" if page_translation_service.is_large_html(request.html_body) else "standard"
+    return StreamingResponse(
+        page_translation_service.stream_with_cache(request, known_translations),
+        media_type="text/html; charset=utf-8",
+        headers=headers
+    )
 
-        # 使用大型HTML终极DOM处理器 - 100%提取和100%替换
-        translated_html_body, large_stats = await large_html_processor.process_large_html_with_ultimate_dom(
-            request.html_body,
-            dom_replacement_service,  # 传入DOM服务
-            baidu_translation_service,
-            request.source_language,
-            request.target_language
-        )
 
-        # 打印大型HTML终极DOM处理统计
-        print("-" * 40)
-        print("🎉 大型HTML终极DOM处理结果:")
-        print(f"  处理模式: {large_stats['processing_mode']}")
-        print(f"  总耗时: {large_stats['processing_time']}秒")
-        print(f"  翻译耗时: {large_stats['translation_duration']}秒")
-        print(f"  翻译速度: {large_stats['unique_texts']/large_stats['translation_duration']:.1f} 文本/秒")
-        print(f"  处理块数: {large_stats['chunks_processed']}")
-        print(f"  文本总数: {large_stats['total_texts']}")
-        print(f"  唯一文本: {large_stats['unique_texts']}")
-        print(f"  翻译成功: {large_stats['translation_success']}")
-        print(f"  翻译失败: {large_stats['translation_failed']}")
-        print(f"  终极替换率: {large_stats['replacement_rate']:.2f}%")
-        print(f"  内存峰值: {large_stats['memory_peak_mb']}MB")
-        if large_stats['remaining_texts']:
-            print(f"  剩余文本: {large_stats['remaining_texts'][:3]}")
-        print("=" * 80)
-
-        # 保存翻译结果到缓存
-        translation_data = {
-            "request_info": {
-                "path": request.path,
-                "html_length": len(request.html_body),
-                "source_language": request.source_language,
-                "target_language": request.target_language,
-                "processing_mode": "large_html",
-                "untranslatable_tags": request.untranslatable_tags,
-                "no_translate_tags": request.no_translate_tags,
-                "cache_strategy": "file_cache" if request.cache else "redis_cache"
-            },
-            "large_html_results": {
-                "translated_html_body": translated_html_body,
-                "processing_statistics": large_stats
-            }
-        }
-
-        # 根据cache参数保存到对应缓存
-        if request.cache:
-            print("💾 保存到文件缓存 (基于路径MD5哈希)...")
-            await file_cache_service.set_cache(
-                request.path,
-                request.source_language,
-                request.target_language,
-                translation_data
-            )
-        else:
-            print("💾 保存到Redis缓存 (基于路径MD5哈希)...")
-            await redis_path_cache_service.set_cache(
-                request.path,
-                request.source_language,
-                request.target_language,
-                translation_data
-            )
-
-        return TranslationResponse(
-            success=True,
-            message=f"🎉 大型HTML翻译完成！耗时: {large_stats['processing_time']}秒，替换率: {large_stats['replacement_rate']:.2f}%",
-            data=translation_data
+@router.post("/translate/batch", summary="批量翻译接口 - 多页面多语言一次请求")
+async def translate_batch(request: BatchTranslationRequest):
+    """
+    批量翻译接口 - 一次请求翻译多个 (path, html_body, target_language) 条目
+
+    - 缓存批量查询（Redis MGET / 文件批量读取）
+    - 相同的HTML只提取一次，同一语言对的所有片段合并去重后只翻译一次
+    - **stream=true** 时以NDJSON逐条返回，每完成一个条目写出一行
+    """
+
+    if baidu_translation_service is None:
+        raise HTTPException(
+            status_code=500,
+            detail="百度翻译服务初始化失败，请检查.env配置"
         )
 
-    else:
-        print("📝 标准HTML大小，使用常规处理模式...")
+    print("=" * 80)
+    print(f"📦 批量翻译接口收到请求！条目数: {len(request.items)}")
+    print("=" * 80)
 
-        # 4. 使用DOM解析提取中文文本
-        print("-" * 40)
-        print("🔍 使用DOM解析提取中文文本...")
+    requests = [
+        TranslationRequest(**item.model_dump(), cache=request.cache, profile=request.profile)
+        for item in request.items
+    ]
 
-        dom_data = dom_replacement_service.extract_all_chinese_with_dom(request.html_body)
+    if request.stream:
+        async def iter_ndjson():
+            async for item_result in page_translation_service.translate_batch(requests):
+                yield serializer_service.dumps_json(item_result) + b"\n"
 
-        # 5. 打印DOM提取结果
-        print("✅ DOM提取完成！")
-        print(f"📊 文本节点数量: {dom_data['statistics']['total_text_nodes']}")
-        print(f"📝 中文文本片段数量: {dom_data['statistics']['total_chinese_segments']}")
-        print(f"🔤 唯一中文文本数量: {dom_data['statistics']['unique_chinese_texts']}")
+        return StreamingResponse(iter_ndjson(), media_type="application/x-ndjson")
 
-        # 6. 高速并发翻译所有中文文本
-        print("-" * 40)
-        print("⚡ 开始高速并发翻译...")
+    results = [item_result async for item_result in page_translation_service.translate_batch(requests)]
+    results.sort(key=lambda item_result: item_result["index"])
+    success_count = sum(1 for item_result in results if item_result["success"])
+    cache_hits = sum(1 for item_result in results if item_result["cache_hit"])
 
-        all_chinese_texts = dom_data['chinese_texts']
-        print(f"📊 需要翻译的文本数量: {len(all_chinese_texts)}")
+    return BatchTranslationResponse(
+        success=success_count == len(results),
+        message=f"🎉 批量翻译完成！成功: {success_count}/{len(results)}，缓存命中: {cache_hits}",
+        data=results,
+        total=len(results),
+        success_count=success_count,
+        cache_hits=cache_hits
+    )
 
-        # 使用高速并发翻译
-        import asyncio
-        translation_results = await baidu_translation_service.concurrent_batch_translate(
-            all_chinese_texts,
-            request.source_language,
-            request.target_language,
-            max_concurrent=15  # 并发数，可以根据需要调整
-        )
 
-        # 7. 创建翻译映射表
-        print("-" * 40)
-        print("📋 创建翻译映射表...")
-        translation_map = dom_replacement_service.create_translation_map(translation_results)
+@router.post("/translate/multi", response_model=MultiTargetTranslationResponse, summary="多目标语言翻译接口 - 一次解析翻译到多种语言")
+async def translate_multi(request: MultiTargetTranslationRequest):
+    """
+    多目标语言翻译接口
 
-        # 8. 使用终极替换方案
-        print("-" * 40)
-        print("🚀 启动终极替换方案...")
+    HTML只解析和提取一次，所有目标语言并发翻译，在同一份提取结果上逐语言替换，
+    所有缓存条目一次批量写入。**target_languages** 为空时翻译到全部支持的目标语言。
+    """
 
-        translated_html_body, ultimate_stats = dom_replacement_service.ultimate_replace_chinese(
-            request.html_body,
-            translation_map
+    if baidu_translation_service is None:
+        raise HTTPException(
+            status_code=500,
+            detail="百度翻译服务初始化失败，请检查.env配置"
         )
 
-        # 9. 打印最终统计
-        print("-" * 40)
-        print("🎉 高速翻译结果统计:")
-        print(f"  翻译耗时: {translation_results['duration']}秒")
-        print(f"  翻译速度: {translation_results['unique_count']/translation_results['duration']:.1f} 文本/秒")
-        print(f"  翻译成功: {translation_results['success_count']}/{translation_results['unique_count']}")
-        print(f"  原始中文字符数: {ultimate_stats['original_chinese_count']}")
-        print(f"  剩余中文字符数: {ultimate_stats['remaining_chinese_count']}")
-        print(f"  已替换字符数: {ultimate_stats['replaced_count']}")
-        print(f"  替换率: {ultimate_stats['replacement_rate']:.2f}%")
-
-        if ultimate_stats['remaining_texts']:
-            print(f"  剩余文本: {ultimate_stats['remaining_texts'][:5]}")
-
-        print("=" * 80)
-
-        # 保存翻译结果到缓存
-        translation_data = {
-            "request_info": {
-                "path": request.path,
-                "html_length": len(request.html_body),
-                "source_language": request.source_language,
-                "target_language": request.target_language,
-                "processing_mode": "standard",
-                "untranslatable_tags": request.untranslatable_tags,
-                "no_translate_tags": request.no_translate_tags,
-                "cache_strategy": "file_cache" if request.cache else "redis_cache"
-            },
-            "dom_extraction_results": dom_data['statistics'],
-            "translation_results": translation_results,
-            "ultimate_replacement_results": {
-                "original_html_body": request.html_body,
-                "translated_html_body": translated_html_body,
-                "replacement_statistics": ultimate_stats,
-                "translation_map": translation_map
-            }
-        }
-
-        # 根据cache参数保存到对应缓存
-        if request.cache:
-            print("💾 保存到文件缓存 (基于路径MD5哈希)...")
-            await file_cache_service.set_cache(
-                request.path,
-                request.source_language,
-                request.target_language,
-                translation_data
-            )
-        else:
-            print("💾 保存到Redis缓存 (基于路径MD5哈希)...")
-            await redis_path_cache_service.set_cache(
-                request.path,
-                request.source_language,
-                request.target_language,
-                translation_data
-            )
-
-        return TranslationResponse(
-            success=True,
-            message=f"🎉 终极翻译完成！替换率: {ultimate_stats['replacement_rate']:.2f}%",
-            data=translation_data
-        )
+    print("=" * 80)
+    print("🌐 多目标语言翻译接口收到请求！")
+    print("=" * 80)
+    print(f"📍 路径: {request.path}")
+    print(f"📝 HTML Body 长度: {len(request.html_body)} 字符")
+    print(f"🎯 目标语言: {request.target_languages or '全部'}")
+
+    results = await page_translation_service.translate_page_multi(request)
+    success_count = sum(1 for item_result in results.values() if item_result["success"])
+    cache_hits = sum(1 for item_result in results.values() if item_result["cache_hit"])
+
+    return MultiTargetTranslationResponse(
+        success=success_count == len(results),
+        message=f"🎉 多目标语言翻译完成！成功: {success_count}/{len(results)}，缓存命中: {cache_hits}",
+        data=results
+    )
@@ -0,0 +1,98 @@
+"""
+异步翻译任务API接口
+"""
+
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.models.translation_models import TranslationRequest, TranslationJobResponse
+from app.services.serializer_service import serializer_service
+from app.services.translation_job_service import translation_job_service
+
+router = APIRouter(prefix="/api/translate/jobs", tags=["异步翻译任务"])
+
+# SSE推送时轮询任务状态的间隔(秒)
+EVENT_POLL_INTERVAL = 0.5
+
+
+@router.post("", response_model=TranslationJobResponse, status_code=202)
+async def submit_translation_job(request: TranslationRequest):
+    """
+    提交异步翻译任务 - 立即返回任务ID，由后台工作协程执行翻译
+
+    请求参数与 /api/translate 相同
+    """
+    print("=" * 80)
+    print("📮 接收到异步翻译任务")
+    print(f"📍 路径: {request.path}")
+    print(f"🔄 翻译: {request.source_language} -> {request.target_language}")
+    print(f"📄 HTML长度: {len(request.html_body)} 字符")
+    print("=" * 80)
+
+    job_id = await translation_job_service.submit_job(request)
+
+    return TranslationJobResponse(
+        success=True,
+        message="任务已提交",
+        data={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/translate/jobs/{job_id}",
+            "events_url": f"/api/translate/jobs/{job_id}/events"
+        }
+    )
+
+
+@router.get("/{job_id}", response_model=TranslationJobResponse)
+async def get_translation_job(job_id: str):
+    """查询异步翻译任务状态，完成后包含翻译结果"""
+    job = await translation_job_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+
+    return TranslationJobResponse(
+        success=job["status"] != "failed",
+        message=job.get("message", ""),
+        data=job
+    )
+
+
+@router.get("/{job_id}/events")
+async def stream_translation_job_events(job_id: str):
+    """
+    以SSE推送任务进度
+
+    - progress事件: 进度或阶段变化时推送
+    - completed / failed事件: 任务结束时推送最终状态后关闭连接
+    """
+    job = await translation_job_service.get_job(job_id, include_result=False)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+
+    async def event_stream():
+        last_state = None
+        while True:
+            job = await translation_job_service.get_job(job_id, include_result=False)
+            if job is None:
+                expired = {"job_id": job_id, "status": "failed", "message": "任务不存在或已过期"}
+                yield b"event: failed\ndata: " + serializer_service.dumps_json(expired) + b"\n\n"
+                return
+
+            if job["status"] in ("completed", "failed"):
+                if job["status"] == "completed":
+                    job = await translation_job_service.get_job(job_id)
+                yield b"event: " + job["status"].encode('utf-8') + b"\ndata: " + serializer_service.dumps_json(job) + b"\n\n"
+                return
+
+            state = (job["status"], job["progress"], job["stage"])
+            if state != last_state:
+                last_state = state
+                yield b"event: progress\ndata: " + serializer_service.dumps_json(job) + b"\n\n"
+
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -39,19 +39,44 @@ class Settings(BaseSettings):
     redis_max_connections: int = 50
     redis_socket_timeout: float = 5.0
     redis_connect_timeout: float = 5.0
+    redis_pool_timeout: float = 5.0  # 连接池已满时等待空闲连接的超时(秒)
+    redis_health_check_interval: int = 30  # 空闲超过该秒数的连接使用前先PING检查(秒)
     redis_use_compression: bool = True
     redis_compression_min_size: int = 1024
     redis_compression_level: int = 6
 
     # ===== 缓存配置 =====
     cache_ttl: int = 86400
+    cache_soft_ttl: int = 43200  # 软过期(秒)：超过后先返回旧译文并在后台刷新，超过cache_ttl才同步翻译
     memory_cache_size: int = 1000
     memory_cache_ttl: int = 300
+    cache_serializer: str = "orjson"  # 缓存序列化格式: orjson / msgpack / json
+    cache_storage_format: str = "full"  # 缓存存储格式: full=完整译文HTML / skeleton=原文骨架+各语言译文片段
+    block_cache_enabled: bool = True  # 页头、导航、页脚、侧栏等模板区块的译文缓存（Redis）
+    block_cache_min_size: int = 200  # 小于该字符数的区块不缓存
+    cache_stats_reconcile_interval_hours: int = 6  # Redis缓存计数的SCAN校准间隔(小时)，多个worker同一间隔内只校准一次
+
+    # ===== 缓存异步写入配置 =====
+    cache_write_behind: bool = True  # 翻译结果先进入写入队列，由后台协程批量写入缓存，响应不等待写入
+    cache_write_queue_size: int = 1000  # 待写入条目上限，队列已满时先同步写入
+    cache_write_batch_delay: float = 0.05  # 攒批等待时间(秒)
 
     # ===== 文件缓存配置 =====
     file_cache_ttl_days: int = 7
+    file_cache_soft_ttl_days: int = 3  # 软过期(天)：超过后先返回旧译文并在后台刷新
     file_cache_max_size_mb: int = 1024
     file_cache_cleanup_interval_hours: int = 24
+    file_cache_io_workers: int = 8  # 文件缓存读写线程数，文件I/O和(反)序列化不在事件循环中执行
+    file_cache_codec: str = "zstd"  # 缓存文件压缩格式: zstd / gzip / none（未安装zstandard时回退到gzip）
+    file_cache_compression_level: int = 3  # 压缩级别（zstd 1-22，gzip 1-9）
+
+    # ===== 异步翻译任务配置 =====
+    translation_job_workers: int = 2  # API进程内的后台工作协程数，0=只由独立worker进程处理
+    translation_job_ttl: int = 86400  # 任务状态和结果保留时间(秒)
+
+    # ===== 翻译请求合并配置 =====
+    translation_lock_lease: int = 300  # 跨worker翻译锁租约(秒)，持有者崩溃后自动释放
+    translation_lock_wait: int = 120  # 其他worker等待翻译结果的最长时间(秒)，超时后自行翻译
 
     # ===== 百度翻译API配置 =====
     baidu_app_id: str = ""
@@ -3,16 +3,22 @@ FastAPI应用主文件
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
 from app.config.config import init_database, close_database, get_settings
-from app.api.translation import router as translation_router
+from app.api.Translation import router as translation_router
 from app.api.words import router as words_router
+from app.api.translation_jobs import router as translation_jobs_router
 from app.services.redis_path_cache_service import redis_path_cache_service
+from app.services.cache_writer_service import cache_writer_service
+from app.services.file_cache_service import get_file_cache_service
 from app.services.mysql_service import mysql_service
+from app.services.translation_job_service import translation_job_service
+from app.services.serializer_service import FastJSONResponse
 
 
 @asynccontextmanager
@@ -42,6 +48,8 @@ async def lifespan(app: FastAPI):
             print(f"   连接客户端: {redis_info.get('connected_clients', 0)}")
             print(f"   内存使用: {redis_info.get('used_memory_human', 'unknown')}")
             print(f"   路径缓存键数量: {redis_info.get('path_cache_keys', 0)}")
+            # 启动缓存计数校准协程（键按TTL过期后由SCAN校准计数）
+            redis_path_cache_service.start_reconciler()
         else:
             print("❌ Redis路径缓存服务初始化失败")
     except Exception as e:
@@ -57,6 +65,26 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ MySQL连接池初始化异常: {e}")
 
+    # 启动缓存写入协程
+    try:
+        cache_writer_service.start()
+        print(f"✅ 缓存写入协程已启动 ({'异步' if cache_writer_service.running else '同步'}写入)")
+    except Exception as e:
+        print(f"❌ 缓存写入协程启动异常: {e}")
+
+    # 启动文件缓存清理协程（删除过期条目，超出容量时按LRU淘汰）
+    try:
+        get_file_cache_service().start_janitor()
+        print("✅ 文件缓存清理协程已启动")
+    except Exception as e:
+        print(f"❌ 文件缓存清理协程启动异常: {e}")
+
+    # 启动异步翻译任务工作协程（Redis不可用时使用进程内队列）
+    try:
+        translation_job_service.start()
+    except Exception as e:
+        print(f"❌ 异步翻译任务工作协程启动异常: {e}")
+
     print("服务启动完成！")
 
     yield
@@ -64,12 +92,37 @@ async def lifespan(app: FastAPI):
     # 关闭时清理连接
     print("正在关闭服务...")
 
+    try:
+        await translation_job_service.stop()
+        print("✅ 异步翻译任务工作协程已停止")
+    except Exception as e:
+        print(f"⚠️ 异步翻译任务工作协程停止失败: {e}")
+
+    # 先写入队列中剩余的缓存条目，再关闭Redis连接
+    try:
+        await cache_writer_service.stop()
+        print("✅ 缓存写入协程已停止")
+    except Exception as e:
+        print(f"⚠️ 缓存写入协程停止失败: {e}")
+
+    try:
+        await get_file_cache_service().stop_janitor()
+        print("✅ 文件缓存清理协程已停止")
+    except Exception as e:
+        print(f"⚠️ 文件缓存清理协程停止失败: {e}")
+
     try:
         await close_database()
         print("MySQL数据库连接已关闭")
     except Exception as e:
         print(f"MySQL数据库关闭失败: {e}")
 
+    try:
+        await redis_path_cache_service.stop_reconciler()
+        print("✅ Redis缓存计数校准协程已停止")
+    except Exception as e:
+        print(f"⚠️ Redis缓存计数校准协程停止失败: {e}")
+
     try:
         await redis_path_cache_service.close()
         print("✅ Redis路径缓存连接已关闭")
@@ -92,6 +145,7 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -110,6 +164,7 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # 注册路由
 app.include_router(translation_router)
 app.include_router(words_router)
+app.include_router(translation_jobs_router)
 
 
 @app.get("/")
@@ -122,8 +177,12 @@ async def root():
         "admin": "/admin",
         "endpoints": {
             "translate": "/api/translate",
+            "translate_jobs": "/api/translate/jobs",
             "words": "/api/words",
-            "redis_status": "/redis/status"
+            "redis_status": "/redis/status",
+            "redis_invalidate": "/redis/invalidate",
+            "cache_writer_status": "/cache/writer/status",
+            "file_cache_status": "/cache/file/status"
         }
     }
 
@@ -147,6 +206,35 @@ async def redis_status():
             "db": redis_path_cache_service.db,
             "cache_ttl": redis_path_cache_service.cache_ttl,
             "use_compression": redis_path_cache_service.use_compression
-        }
+        },
+        "connection_pool": redis_path_cache_service.get_pool_metrics()
     }
 
+
+@app.post("/redis/invalidate")
+async def redis_invalidate(
+    domain: Optional[str] = Query(None, description="域名，失效该域名下的全部缓存"),
+    path_prefix: Optional[str] = Query(None, description="路径前缀（域名+路径），给出时忽略domain"),
+    target_language: Optional[str] = Query(None, description="目标语言，单独给出时失效该语言对的全部缓存"),
+    scan: bool = Query(False, description="true=SCAN键空间匹配（用于失效索引建立之前写入的缓存）")
+):
+    """按域名、路径前缀、目标语言批量失效Redis缓存"""
+    if not (domain or path_prefix or target_language):
+        raise HTTPException(status_code=400, detail="至少需要指定domain、path_prefix或target_language之一")
+    try:
+        result = await redis_path_cache_service.invalidate(domain, path_prefix, target_language, use_scan=scan)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"invalidated": result}
+
+
+@app.get("/cache/writer/status")
+async def cache_writer_status():
+    """缓存写入队列状态"""
+    return {"cache_writer": cache_writer_service.get_metrics()}
+
+
+@app.get("/cache/file/status")
+async def file_cache_status():
+    """文件缓存状态（容量、淘汰计数）"""
+    return {"file_cache": await get_file_cache_service().get_cache_stats()}
@@ -2,7 +2,7 @@
 翻译相关的数据模型
 """
 
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -15,6 +15,11 @@ class TranslationRequest(BaseModel):
     untranslatable_tags: Optional[str] = Field(None, description="翻译不到的标签")
     no_translate_tags: Optional[str] = Field(None, description="不需要翻译的标签")
     cache: bool = Field(True, description="缓存策略：true=文件缓存，false=Redis缓存")
+    profile: str = Field(
+        "summary",
+        pattern="^(html_only|summary|debug)$",
+        description="返回数据配置档：html_only=仅译文HTML，summary=译文HTML+统计信息，debug=完整调试数据（原文HTML、逐片段结果、翻译映射表）"
+    )
 
 
 class TranslationResponse(BaseModel):
@@ -22,3 +27,66 @@ class TranslationResponse(BaseModel):
     success: bool = Field(True, description="处理是否成功")
     message: str = Field("处理完成", description="处理消息")
     data: Optional[dict] = Field(None, description="处理结果数据")
+    cache_status: Optional[str] = Field(None, description="缓存状态：hit=命中 / stale=已过期的旧译文(后台刷新中) / miss=未命中")
+
+
+class BatchTranslationItem(BaseModel):
+    """批量翻译条目模型"""
+    path: str = Field(..., description="路径（域名+后缀）")
+    html_body: str = Field(..., description="HTML整个页面的body")
+    source_language: str = Field(..., description="源语言")
+    target_language: str = Field(..., description="目标语言")
+    untranslatable_tags: Optional[str] = Field(None, description="翻译不到的标签")
+    no_translate_tags: Optional[str] = Field(None, description="不需要翻译的标签")
+
+
+class BatchTranslationRequest(BaseModel):
+    """批量翻译请求模型"""
+    items: List[BatchTranslationItem] = Field(..., min_length=1, description="翻译条目列表")
+    cache: bool = Field(True, description="缓存策略：true=文件缓存，false=Redis缓存")
+    profile: str = Field(
+        "summary",
+        pattern="^(html_only|summary|debug)$",
+        description="返回数据配置档：html_only / summary / debug"
+    )
+    stream: bool = Field(False, description="true=以NDJSON逐条流式返回结果")
+
+
+class BatchTranslationResponse(BaseModel):
+    """批量翻译响应模型"""
+    success: bool = Field(True, description="全部条目是否成功")
+    message: str = Field("处理完成", description="处理消息")
+    data: List[dict] = Field([], description="按请求顺序排列的条目结果")
+    total: int = Field(0, description="条目总数")
+    success_count: int = Field(0, description="成功条目数")
+    cache_hits: int = Field(0, description="缓存命中条目数")
+
+
+class MultiTargetTranslationRequest(BaseModel):
+    """多目标语言翻译请求模型"""
+    path: str = Field(..., description="路径（域名+后缀）")
+    html_body: str = Field(..., description="HTML整个页面的body")
+    source_language: str = Field(..., description="源语言")
+    target_languages: Optional[List[str]] = Field(None, description="目标语言列表，为空时翻译到缓存支持的全部目标语言")
+    untranslatable_tags: Optional[str] = Field(None, description="翻译不到的标签")
+    no_translate_tags: Optional[str] = Field(None, description="不需要翻译的标签")
+    cache: bool = Field(True, description="缓存策略：true=文件缓存，false=Redis缓存")
+    profile: str = Field(
+        "summary",
+        pattern="^(html_only|summary|debug)$",
+        description="返回数据配置档：html_only / summary / debug"
+    )
+
+
+class MultiTargetTranslationResponse(BaseModel):
+    """多目标语言翻译响应模型"""
+    success: bool = Field(True, description="全部目标语言是否成功")
+    message: str = Field("处理完成", description="处理消息")
+    data: dict = Field({}, description="按目标语言分组的结果")
+
+
+class TranslationJobResponse(BaseModel):
+    """异步翻译任务响应模型"""
+    success: bool = Field(True, description="是否成功")
+    message: str = Field("处理完成", description="处理消息")
+    data: dict = Field({}, description="任务信息：job_id、status、progress、stage，完成后包含result")
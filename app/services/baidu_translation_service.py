@@ -7,7 +7,7 @@ import random
 import time
 import asyncio
 import aiohttp
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 from dotenv import load_dotenv
 
@@ -79,7 +79,8 @@ class BaiduTranslationService:
                 "original": text
             }
     
-    async def concurrent_batch_translate(self, texts: List[str], from_lang: str, to_lang: str, max_concurrent: int = 15) -> Dict:
+    async def concurrent_batch_translate(self, texts: List[str], from_lang: str, to_lang: str, max_concurrent: int = 15,
+                                         known_translations: Optional[Dict[str, str]] = None) -> Dict:
         """
         并发批量翻译 - 翻译方法
         Args:
@@ -87,11 +88,13 @@ class BaiduTranslationService:
             from_lang: 源语言代码
             to_lang: 目标语言代码
             max_concurrent: 最大并发数
+            known_translations: 已知译文（如缓存中的片段映射表），命中的文本不再调用API
         Returns:
             批量翻译结果
         """
         print(f"⚡ 开始高速并发翻译 {len(texts)} 个文本 (并发数: {max_concurrent})...")
         start_time = time.time()
+        known_translations = known_translations or {}
         # 去重并保持顺序
         unique_texts = []
         text_index_map = {}
@@ -99,44 +102,58 @@ class BaiduTranslationService:
             if text not in text_index_map:
                 text_index_map[text] = len(unique_texts)
                 unique_texts.append(text)
-        print(f"📊 去重后需要翻译: {len(unique_texts)} 个唯一文本")
+        # 已知译文直接复用
+        translation_map = {
+            text: {
+                "success": True,
+                "original": text,
+                "translated": known_translations[text],
+                "from_lang": from_lang,
+                "to_lang": to_lang,
+                "reused": True
+            }
+            for text in unique_texts if text in known_translations
+        }
+        pending_texts = [text for text in unique_texts if text not in translation_map]
+        print(f"📊 去重后需要翻译: {len(pending_texts)} 个唯一文本 (复用已知译文: {len(translation_map)})")
         results = {
             "translations": [],
             "success_count": 0,
             "failed_count": 0,
             "total_count": len(texts),
             "unique_count": len(unique_texts),
+            "reused_count": len(translation_map),
             "duration": 0
         }
         if not unique_texts:
             results["duration"] = 0
             return results
-        # 创建异步会话
-        connector = aiohttp.TCPConnector(limit=max_concurrent)
-        timeout = aiohttp.ClientTimeout(total=self.timeout)
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            # 创建并发任务
-            semaphore = asyncio.Semaphore(max_concurrent)
-            
-            async def translate_with_semaphore(text):
-                async with semaphore:
-                    return await self.async_translate_text(session, text, from_lang, to_lang)
-            # 执行并发翻译
-            unique_results = await asyncio.gather(
-                *[translate_with_semaphore(text) for text in unique_texts],
-                return_exceptions=True
-            )
-        # 处理结果
-        translation_map = {}
-        for i, result in enumerate(unique_results):
-            if isinstance(result, Exception):
-                result = {
-                    "success": False,
-                    "error": f"并发执行错误: {str(result)}",
-                    "original": unique_texts[i]
-                }
-            translation_map[unique_texts[i]] = result
-            
+        if pending_texts:
+            # 创建异步会话
+            connector = aiohttp.TCPConnector(limit=max_concurrent)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                # 创建并发任务
+                semaphore = asyncio.Semaphore(max_concurrent)
+                
+                async def translate_with_semaphore(text):
+                    async with semaphore:
+                        return await self.async_translate_text(session, text, from_lang, to_lang)
+                # 执行并发翻译
+                pending_results = await asyncio.gather(
+                    *[translate_with_semaphore(text) for text in pending_texts],
+                    return_exceptions=True
+                )
+            # 处理结果
+            for i, result in enumerate(pending_results):
+                if isinstance(result, Exception):
+                    result = {
+                        "success": False,
+                        "error": f"并发执行错误: {str(result)}",
+                        "original": pending_texts[i]
+                    }
+                translation_map[pending_texts[i]] = result
+        for result in translation_map.values():
             if result["success"]:
                 results["success_count"] += 1
             else:
@@ -151,7 +168,7 @@ class BaiduTranslationService:
         print(f"⚡ 高速翻译完成! 耗时: {results['duration']}秒")
         print(f"📊 成功: {results['success_count']}, 失败: {results['failed_count']}")
         if results['duration'] > 0:
-            print(f"🚀 平均速度: {len(unique_texts)/results['duration']:.1f} 文本/秒")
+            print(f"🚀 平均速度: {len(pending_texts)/results['duration']:.1f} 文本/秒")
         
         return results
     
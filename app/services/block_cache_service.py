@@ -0,0 +1,230 @@
+"""
+区块缓存服务 - 页面间共享的模板区块（页头、导航、页脚、侧栏）译文缓存
+"""
+
+import hashlib
+import re
+import uuid
+from collections import Counter
+from typing import Dict, List, Tuple
+from bs4 import BeautifulSoup, Comment, Tag
+from app.config.config import get_settings
+from app.services.redis_path_cache_service import redis_path_cache_service
+
+
+class BlockCacheService:
+    """区块缓存服务类 - 键为 md5(区块HTML) + 语言对，存放在Redis中"""
+
+    def __init__(self):
+        """初始化区块缓存服务"""
+        self.settings = get_settings()
+
+        self.enabled = self.settings.block_cache_enabled
+        self.min_size = self.settings.block_cache_min_size  # 小于该字符数的区块不缓存
+        self.cache_ttl = self.settings.cache_ttl
+        self.block_tags = ["header", "nav", "footer", "aside"]
+        self.chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
+        self.chinese_text_pattern = re.compile(r'[\u4e00-\u9fff]+')
+
+        print(f"🧱 区块缓存服务初始化完成")
+        print(f"  启用: {self.enabled}")
+        print(f"  区块标签: {', '.join(self.block_tags)}")
+        print(f"  最小区块: {self.min_size}字符")
+
+    @property
+    def redis_client(self):
+        """复用Redis路径缓存服务的连接"""
+        return redis_path_cache_service.redis_client
+
+    def generate_block_key(self, block_html: str, source_lang: str, target_lang: str) -> str:
+        """生成区块缓存键"""
+        block_hash = hashlib.md5(block_html.encode('utf-8')).hexdigest()
+        return f"tb:{block_hash}:{source_lang}-{target_lang}"  # 例如: tb:9e107d9d...:zh-en
+
+    def find_blocks(self, soup: BeautifulSoup) -> List:
+        """查找可缓存的最外层区块 - 嵌套区块只取外层"""
+        blocks = []
+        block_ids = set()
+        for element in soup.find_all(self.block_tags):
+            # Tag的==比较内容，判断祖先需按对象身份
+            if any(id(parent) in block_ids for parent in element.parents):
+                continue
+            blocks.append(element)
+            block_ids.add(id(element))
+        return blocks
+
+    def find_cacheable_blocks(self, soup: BeautifulSoup) -> List[Tuple[Tag, str]]:
+        """查找可缓存的区块及其HTML - 同一HTML解析出的DOM得到的顺序相同，区块计划按该顺序编号"""
+        blocks = []
+        for element in self.find_blocks(soup):
+            block_html = str(element)
+            if len(block_html) < self.min_size or not self.chinese_pattern.search(block_html):
+                continue
+            blocks.append((element, block_html))
+        return blocks
+
+    def empty_plan(self) -> Dict:
+        """不含任何区块的区块计划"""
+        return {"nonce": uuid.uuid4().hex[:8], "cached": {}, "pending": {}, "cached_texts": []}
+
+    async def lookup(self, soup: BeautifulSoup, source_lang: str, target_lang: str) -> Dict:
+        """
+        查询区块缓存，生成区块计划 - 不改动DOM
+
+        Returns:
+            区块计划: cached=命中区块的译文, pending=未命中区块的缓存键, cached_texts=命中区块中的中文片段
+        """
+        plan = self.empty_plan()
+        if not self.enabled or not self.redis_client:
+            return plan
+
+        blocks = self.find_cacheable_blocks(soup)
+        if not blocks:
+            return plan
+
+        block_keys = [self.generate_block_key(block_html, source_lang, target_lang) for _, block_html in blocks]
+        try:
+            cached_values = await self.redis_client.mget(block_keys)
+        except Exception as e:
+            print(f"❌ 区块缓存查询失败: {e}")
+            return plan
+
+        for i, ((_, block_html), block_key, cached_value) in enumerate(zip(blocks, block_keys, cached_values)):
+            if cached_value is not None:
+                plan["cached"][i] = redis_path_cache_service.decompress_data(cached_value).decode('utf-8')
+                plan["cached_texts"].extend(self.chinese_text_pattern.findall(block_html))
+            else:
+                plan["pending"][i] = block_key
+
+        print(f"🧱 区块缓存: 命中 {len(plan['cached'])}, 未命中 {len(plan['pending'])}")
+        return plan
+
+    def apply(self, soup: BeautifulSoup, plan: Dict) -> List[Tuple]:
+        """
+        按区块计划改写DOM
+
+        - 命中缓存的区块替换为占位注释，提取和替换阶段不再遍历
+        - 未命中的区块前后插入标记注释，整页替换完成后取出译文写入缓存
+
+        Returns:
+            (插入的注释, 被替换的区块) 列表，供restore还原DOM
+        """
+        if not plan["cached"] and not plan["pending"]:
+            return []
+
+        nonce = plan["nonce"]
+        changes = []
+        for i, (element, _) in enumerate(self.find_cacheable_blocks(soup)):
+            if i in plan["cached"]:
+                placeholder = Comment(f"tblock-{nonce}:{i}")
+                element.replace_with(placeholder)
+                changes.append((placeholder, element))
+            elif i in plan["pending"]:
+                start_marker = Comment(f"tblock-start-{nonce}:{i}")
+                end_marker = Comment(f"tblock-end-{nonce}:{i}")
+                element.insert_before(start_marker)
+                element.insert_after(end_marker)
+                changes.extend([(start_marker, None), (end_marker, None)])
+        return changes
+
+    def restore(self, changes: List[Tuple]):
+        """还原apply对DOM的改写，使同一份DOM可继续用于其他目标语言"""
+        for inserted, original in reversed(changes):
+            if original is None:
+                inserted.extract()
+            else:
+                inserted.replace_with(original)
+
+    async def prepare(self, soup: BeautifulSoup, source_lang: str, target_lang: str) -> Dict:
+        """
+        在DOM提取前处理区块：查询区块缓存并按计划改写DOM
+
+        Returns:
+            区块计划，供finalize使用
+        """
+        plan = await self.lookup(soup, source_lang, target_lang)
+        self.apply(soup, plan)
+        return plan
+
+    def filter_texts(self, texts: List[str], plan: Dict) -> List[str]:
+        """去掉命中缓存的区块中的中文片段 - 按出现次数扣除，区块外同样出现的片段仍需翻译"""
+        if not plan["cached_texts"]:
+            return texts
+        cached_counts = Counter(plan["cached_texts"])
+        remaining_texts = []
+        for text in texts:
+            if cached_counts[text] > 0:
+                cached_counts[text] -= 1
+            else:
+                remaining_texts.append(text)
+        return remaining_texts
+
+    def finalize(self, html: str, plan: Dict) -> Tuple[str, Dict[str, str]]:
+        """
+        替换完成后处理区块：一次替换中取出未命中区块的译文，并把占位注释换回缓存的译文
+
+        Returns:
+            (最终HTML, {区块缓存键: 区块译文})
+        """
+        if not plan["cached"] and not plan["pending"]:
+            return html, {}
+
+        nonce = plan["nonce"]
+        new_blocks = {}
+
+        def replace_marker(match):
+            if match.group("cached") is not None:
+                return plan["cached"].get(int(match.group("cached")), "")
+            block_html = match.group("block")
+            block_key = plan["pending"].get(int(match.group("pending")))
+            if block_key:
+                new_blocks[block_key] = block_html
+            return block_html
+
+        html = re.sub(
+            rf"<!--tblock-start-{nonce}:(?P<pending>\d+)-->(?P<block>.*?)<!--tblock-end-{nonce}:(?P=pending)-->"
+            rf"|<!--tblock-{nonce}:(?P<cached>\d+)-->",
+            replace_marker,
+            html,
+            flags=re.DOTALL
+        )
+        return html, new_blocks
+
+    async def save_blocks(self, new_blocks: Dict[str, str]) -> int:
+        """
+        批量保存区块译文 - 一次pipeline写入
+
+        译文中仍有中文的区块（有片段翻译失败）不缓存，避免未翻译的内容在整个TTL内被复用
+        """
+        complete_blocks = {
+            block_key: block_html
+            for block_key, block_html in new_blocks.items()
+            if not self.chinese_pattern.search(block_html)
+        }
+        if len(complete_blocks) < len(new_blocks):
+            print(f"⚠️ 跳过含未翻译中文的区块: {len(new_blocks) - len(complete_blocks)} 个")
+        if not complete_blocks or not self.redis_client:
+            return 0
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for block_key, block_html in complete_blocks.items():
+                    pipe.set(block_key, redis_path_cache_service.compress_data(block_html.encode('utf-8')), ex=self.cache_ttl)
+                await pipe.execute()
+            print(f"💾 区块缓存已保存: {len(complete_blocks)} 个")
+            return len(complete_blocks)
+        except Exception as e:
+            print(f"❌ 保存区块缓存失败: {e}")
+            return 0
+
+    def get_statistics(self, plan: Dict, stored_count: int) -> Dict:
+        """区块缓存计入替换统计的字段"""
+        return {
+            "block_cache_hits": len(plan["cached"]),
+            "block_cache_segments": len(plan["cached_texts"]),
+            "block_cache_stored": stored_count
+        }
+
+
+# 创建全局实例
+block_cache_service = BlockCacheService()
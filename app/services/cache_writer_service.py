@@ -0,0 +1,266 @@
+"""
+缓存异步写入服务 - 翻译结果先进入写入队列，由后台协程合并后批量落盘，响应不再等待缓存写入
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config.config import get_settings
+from app.services.file_cache_service import get_file_cache_service
+from app.services.redis_path_cache_service import redis_path_cache_service
+
+
+class CacheWriterService:
+    """缓存异步写入服务类 - 同一缓存键的多次写入只保留最后一次"""
+
+    def __init__(self):
+        """初始化缓存异步写入服务"""
+        self.settings = get_settings()
+
+        self.enabled = self.settings.cache_write_behind
+        self.max_pending = self.settings.cache_write_queue_size      # 待写入条目上限
+        self.batch_delay = self.settings.cache_write_batch_delay     # 攒批等待时间(秒)
+
+        # 待写入条目: (是否文件缓存, 缓存键) -> 条目；正在写入的条目仍可被读取
+        self.pending: Dict[Tuple[bool, str], Dict] = {}
+        self.flushing: Dict[Tuple[bool, str], Dict] = {}
+
+        # 事件循环相关对象在start时创建
+        self.wakeup: Optional[asyncio.Event] = None
+        self.flush_lock: Optional[asyncio.Lock] = None
+        self.writer_task: Optional[asyncio.Task] = None
+        self.running = False
+
+        self.metrics = {
+            "enqueued": 0,             # 入队次数
+            "coalesced": 0,            # 被后续写入覆盖的次数
+            "written": 0,              # 成功写入的条目数
+            "failed": 0,               # 写入失败的条目数
+            "sync_writes": 0,          # 写入协程未运行时的同步写入次数
+            "backpressure_flushes": 0, # 队列已满时的同步刷写次数
+            "flushes": 0,              # 批量写入次数
+            "max_depth": 0,            # 队列深度峰值
+            "last_flush_ms": 0.0       # 最近一次批量写入耗时
+        }
+
+        print(f"✍️ 缓存异步写入服务初始化完成")
+        print(f"  启用: {self.enabled}")
+        print(f"  队列上限: {self.max_pending}条")
+        print(f"  攒批等待: {self.batch_delay}秒")
+
+    def get_cache_service(self, use_file_cache: bool):
+        """根据cache参数选择缓存服务：true=文件缓存，false=Redis缓存"""
+        return get_file_cache_service() if use_file_cache else redis_path_cache_service
+
+    def get_entry_key(self, use_file_cache: bool, path: str, source_lang: str, target_lang: str) -> Tuple[bool, str]:
+        """生成写入队列键，不支持的语言对抛出ValueError"""
+        cache_key = self.get_cache_service(use_file_cache).generate_cache_key(path, source_lang, target_lang)
+        return use_file_cache, cache_key
+
+    async def enqueue(self, key: Tuple[bool, str], item: Dict):
+        """加入写入队列 - 同一键覆盖旧条目，队列已满时先同步刷写"""
+        self.metrics["enqueued"] += 1
+
+        if not self.running:
+            self.metrics["sync_writes"] += 1
+            await self.write_batch({key: item})
+            return
+
+        if key in self.pending:
+            self.metrics["coalesced"] += 1
+            item["waiters"] = self.pending[key]["waiters"] + item["waiters"]
+        elif len(self.pending) >= self.max_pending:
+            self.metrics["backpressure_flushes"] += 1
+            await self.flush()
+
+        self.pending[key] = item
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], len(self.pending))
+        self.wakeup.set()
+
+    async def enqueue_entry(self, use_file_cache: bool, path: str, source_lang: str, target_lang: str,
+                            stored_data: Dict, debug_artifacts: Optional[Dict], content: Dict, validators: Dict,
+                            pointer_only: bool = False):
+        """
+        缓存条目加入写入队列
+
+        Args:
+            stored_data: 写入缓存的数据（骨架存储格式下为紧凑格式）
+            content: 写入完成前供读取的完整数据
+            validators: 与缓存条目一致的ETag/Last-Modified
+            pointer_only: 译文来自相同内容的共享译文，只写路径指针
+        """
+        try:
+            key = self.get_entry_key(use_file_cache, path, source_lang, target_lang)
+        except ValueError as e:
+            print(f"⚠️ 跳过缓存写入: {e}")
+            return
+
+        await self.enqueue(key, {
+            "kind": "entry",
+            "payload": (path, source_lang, target_lang, stored_data, debug_artifacts, pointer_only),
+            "content": content,
+            "content_hash": (content.get("cache_info") or {}).get("content_fingerprint"),
+            "validators": validators,
+            "waiters": []
+        })
+
+    async def enqueue_skeletons(self, use_file_cache: bool, skeletons: Dict[str, List[str]]):
+        """骨架加入写入队列 - 同一批次中先于缓存条目写入"""
+        for content_hash, skeleton in skeletons.items():
+            await self.enqueue((use_file_cache, f"sk:{content_hash}"), {
+                "kind": "skeleton",
+                "payload": (content_hash, skeleton),
+                "waiters": []
+            })
+
+    def get_pending_entry(self, use_file_cache: bool, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """读取尚未写入缓存的条目，格式与缓存服务的get_cache_entry一致"""
+        try:
+            key = self.get_entry_key(use_file_cache, path, source_lang, target_lang)
+        except ValueError:
+            return None
+
+        item = self.pending.get(key) or self.flushing.get(key)
+        if item is None:
+            return None
+        return {"metadata": dict(item["validators"]), "content": item["content"]}
+
+    def get_pending_content(self, use_file_cache: bool, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """按内容指纹读取尚未写入缓存的相同内容译文（不含request_info），格式与缓存服务的get_content一致"""
+        for (is_file, _), item in list(self.pending.items()) + list(self.flushing.items()):
+            if is_file != use_file_cache or item.get("content_hash") != content_hash:
+                continue
+            _, item_source_lang, item_target_lang = item["payload"][:3]
+            if (item_source_lang, item_target_lang) == (source_lang, target_lang):
+                return {section: value for section, value in item["content"].items() if section != "request_info"}
+        return None
+
+    async def wait_persisted(self, use_file_cache: bool, path: str, source_lang: str, target_lang: str) -> bool:
+        """
+        等待条目写入缓存，条目不在队列中时立即返回
+
+        Returns:
+            是否写入成功
+        """
+        try:
+            key = self.get_entry_key(use_file_cache, path, source_lang, target_lang)
+        except ValueError:
+            return False
+
+        item = self.pending.get(key) or self.flushing.get(key)
+        if item is None:
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        item["waiters"].append(waiter)
+        return await waiter
+
+    async def write_batch(self, batch: Dict[Tuple[bool, str], Dict]) -> int:
+        """
+        按缓存后端批量写入：先写骨架，再一次写入所有缓存条目（Redis pipeline / 文件索引只保存一次）
+
+        等待者按条目实际的写入结果完成；骨架写入失败时引用骨架的条目读取不到，同样视为失败
+        """
+        saved_count = 0
+        for use_file_cache in (True, False):
+            items = [item for (is_file, _), item in batch.items() if is_file == use_file_cache]
+            if not items:
+                continue
+            cache_service = self.get_cache_service(use_file_cache)
+
+            skeletons = dict(item["payload"] for item in items if item["kind"] == "skeleton")
+            entry_items = [item for item in items if item["kind"] == "entry"]
+            entries = [item["payload"] for item in entry_items]
+            outcomes = [False] * len(entry_items)
+            try:
+                skeletons_saved = await cache_service.set_skeletons(skeletons) if skeletons else True
+                if entries:
+                    saved = await cache_service.set_cache_many(entries)
+                    saved_count += saved
+                    self.metrics["written"] += saved
+                    self.metrics["failed"] += len(entries) - saved
+                    if saved == len(entries):
+                        outcomes = [True] * len(entries)
+                    elif saved:
+                        # 部分写入失败时（少见）逐条重写，得到每个条目的写入结果
+                        outcomes = [await cache_service.set_cache(*entry) for entry in entries]
+                    if not skeletons_saved:
+                        outcomes = [False] * len(entries)
+            except Exception as e:
+                self.metrics["failed"] += len(entries)
+                print(f"❌ 缓存批量写入失败: {e}")
+
+            for item, outcome in zip(entry_items, outcomes):
+                for waiter in item["waiters"]:
+                    if not waiter.done():
+                        waiter.set_result(outcome)
+
+        for item in batch.values():
+            for waiter in item["waiters"]:
+                if not waiter.done():
+                    waiter.set_result(False)
+        return saved_count
+
+    async def flush(self) -> int:
+        """立即写入队列中的所有条目"""
+        async with self.flush_lock:
+            if not self.pending:
+                return 0
+
+            self.flushing, self.pending = self.pending, {}
+            start_time = time.time()
+            try:
+                saved_count = await self.write_batch(self.flushing)
+            finally:
+                self.flushing = {}
+            self.metrics["flushes"] += 1
+            self.metrics["last_flush_ms"] = round((time.time() - start_time) * 1000, 2)
+            return saved_count
+
+    async def writer_loop(self):
+        """后台写入协程 - 有新条目时等待一个攒批间隔后批量写入"""
+        print("✍️ 缓存写入协程已启动")
+        while self.running:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            await asyncio.sleep(self.batch_delay)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ 缓存写入协程异常: {e}")
+        print("✍️ 缓存写入协程已停止")
+
+    def start(self):
+        """启动后台写入协程 - 未启用时缓存同步写入"""
+        if self.running or not self.enabled:
+            return
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.running = True
+        self.writer_task = asyncio.create_task(self.writer_loop())
+
+    async def stop(self):
+        """停止后台写入协程，并写入队列中剩余的条目"""
+        if not self.running:
+            return
+        self.running = False
+        self.wakeup.set()
+        await self.writer_task
+        self.writer_task = None
+        saved_count = await self.flush()
+        print(f"✍️ 缓存写入队列已清空 (关闭时写入 {saved_count} 条)")
+
+    def get_metrics(self) -> Dict:
+        """获取写入队列指标"""
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "queue_depth": len(self.pending),
+            "flushing": len(self.flushing),
+            "max_pending": self.max_pending,
+            **self.metrics
+        }
+
+
+# 创建全局实例
+cache_writer_service = CacheWriterService()
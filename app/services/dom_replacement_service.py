@@ -3,7 +3,7 @@
 """
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup, NavigableString, Tag
 
 
@@ -14,12 +14,13 @@ class DomReplacementService:
         """初始化DOM替换服务"""
         self.chinese_pattern = r'[\u4e00-\u9fff]+'
     
-    def extract_all_chinese_with_dom(self, html_body: str) -> Dict:
+    def extract_all_chinese_with_dom(self, html_body: str, soup: Optional[BeautifulSoup] = None) -> Dict:
         """
         使用DOM解析提取所有中文文本，包括精确位置信息
         
         Args:
             html_body: HTML内容
+            soup: 已解析的DOM（如已替换缓存区块），传入时不再重新解析
             
         Returns:
             完整的中文文本提取结果
@@ -27,7 +28,8 @@ class DomReplacementService:
         print("🔍 使用DOM解析提取中文文本...")
         
         # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html_body, 'html.parser')
+        if soup is None:
+            soup = BeautifulSoup(html_body, 'html.parser')
         
         chinese_texts = []
         text_nodes = []
@@ -90,13 +92,14 @@ class DomReplacementService:
         print(f" DOM提取完成: {len(text_nodes)} 个文本节点, {len(chinese_texts)} 个中文片段")
         return result
     
-    def replace_chinese_in_dom(self, dom_data: Dict, translation_map: Dict[str, str]) -> str:
+    def replace_chinese_in_dom(self, dom_data: Dict, translation_map: Dict[str, str], restore_dom: bool = False) -> str:
         """
         在DOM中精确替换中文文本
         
         Args:
             dom_data: DOM提取的数据
             translation_map: 翻译映射表
+            restore_dom: 序列化后恢复DOM原文，使同一份提取结果可继续用于其他目标语言
             
         Returns:
             替换后的HTML字符串
@@ -106,6 +109,7 @@ class DomReplacementService:
         soup = dom_data['soup']
         text_nodes = dom_data['text_nodes']
         replacement_count = 0
+        restorations = []
         
         # 处理每个文本节点
         for node_info in text_nodes:
@@ -133,19 +137,32 @@ class DomReplacementService:
                 if 'attr_name' in node_info:
                     # 更新属性值
                     attr_name = node_info['attr_name']
+                    restorations.append((element, attr_name, element[attr_name]))
                     element[attr_name] = new_content
                     print(f"  ✅ 属性替换: {path} = '{content[:30]}...' → '{new_content[:30]}...'")
                 else:
                     # 更新文本节点
-                    element.replace_with(new_content)
+                    new_node = NavigableString(new_content)
+                    element.replace_with(new_node)
+                    restorations.append((new_node, None, element))
                     print(f"  ✅ 文本替换: {path} = '{content[:30]}...' → '{new_content[:30]}...'")
                 
                 replacement_count += node_replacements
         
         print(f"✅ DOM替换完成: 总共替换了 {replacement_count} 处文本")
         
-        # 返回更新后的HTML
-        return str(soup)
+        # 更新后的HTML
+        html_after_dom = str(soup)
+        
+        # 恢复DOM原文
+        if restore_dom:
+            for target, attr_name, original in reversed(restorations):
+                if attr_name is not None:
+                    target[attr_name] = original
+                else:
+                    target.replace_with(original)
+        
+        return html_after_dom
     
     def handle_special_cases(self, html_content: str, translation_map: Dict[str, str]) -> str:
         """
@@ -237,13 +254,14 @@ class DomReplacementService:
         print(f"✅ 特殊情况处理完成: {special_replacements} 处")
         return updated_html
     
-    def ultimate_replace_chinese(self, html_body: str, translation_map: Dict[str, str]) -> Tuple[str, Dict]:
+    def ultimate_replace_chinese(self, html_body: str, translation_map: Dict[str, str], dom_data: Optional[Dict] = None) -> Tuple[str, Dict]:
         """
         终极中文替换方案 - 追求100%替换率
         
         Args:
             html_body: 原始HTML
             translation_map: 翻译映射表
+            dom_data: 已有的DOM提取结果，传入时跳过重新解析，替换后恢复原文以便复用
             
         Returns:
             (替换后的HTML, 统计信息)
@@ -251,8 +269,11 @@ class DomReplacementService:
         print("🚀 启动终极替换方案...")
         
         # 第一步：DOM精确提取和替换
-        dom_data = self.extract_all_chinese_with_dom(html_body)
-        html_after_dom = self.replace_chinese_in_dom(dom_data, translation_map)
+        if dom_data is None:
+            dom_data = self.extract_all_chinese_with_dom(html_body)
+            html_after_dom = self.replace_chinese_in_dom(dom_data, translation_map)
+        else:
+            html_after_dom = self.replace_chinese_in_dom(dom_data, translation_map, restore_dom=True)
         
         # 第二步：处理特殊情况
         html_after_special = self.handle_special_cases(html_after_dom, translation_map)
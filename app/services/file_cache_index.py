@@ -0,0 +1,398 @@
+"""
+文件缓存索引 - SQLite（WAL模式）保存的缓存条目索引，替代整体重写的JSON索引文件
+
+多个worker进程各自打开同一个数据库，写入后其他进程立即可见，无需重新加载
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+
+class FileCacheIndex:
+    """文件缓存索引类 - 单条插入、删除为O(1)，按过期时间、大小、语言对、最近访问时间建索引"""
+
+    columns = (
+        "cache_key", "file_path", "debug_file_path", "content_path", "html_path", "path", "source_lang",
+        "target_lang", "cache_method", "created_at", "soft_expires_at", "expires_at", "etag", "last_modified",
+        "content_fingerprint", "size_bytes", "last_access", "skeleton_path"
+    )
+
+    # 共享文件（共享译文、骨架）按文件路径单独记录，字节数只计一次
+    shared_columns = ("file_path", "kind", "source_lang", "target_lang", "size_bytes", "updated_at")
+
+    # 后续版本新增的列，打开旧版索引表时补齐
+    added_columns = {
+        "content_path": "TEXT",
+        "html_path": "TEXT",
+        "content_fingerprint": "TEXT",
+        "last_access": "REAL NOT NULL DEFAULT 0",
+        "skeleton_path": "TEXT"
+    }
+
+    def __init__(self, db_file: str, legacy_json_file: Optional[str] = None):
+        """
+        初始化文件缓存索引
+
+        Args:
+            db_file: SQLite数据库文件
+            legacy_json_file: 旧版JSON索引文件，存在时一次性迁移
+        """
+        self.db_file = db_file
+        self.lock = threading.Lock()  # 同一连接在多个线程间共用，按语句串行
+        self.busy_timeout = 30  # 其他进程持有写锁时的最长等待时间(秒)
+
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.db_file, timeout=self.busy_timeout, check_same_thread=False, isolation_level=None
+        )
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA recursive_triggers=ON")  # INSERT OR REPLACE覆盖旧行时也触发删除触发器
+        self.create_tables()
+
+        if legacy_json_file:
+            self.migrate_from_json(legacy_json_file)
+
+    def create_tables(self):
+        """创建索引表"""
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache_key TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    debug_file_path TEXT,
+                    content_path TEXT,
+                    html_path TEXT,
+                    path TEXT,
+                    source_lang TEXT,
+                    target_lang TEXT,
+                    cache_method TEXT,
+                    created_at TEXT,
+                    soft_expires_at TEXT,
+                    expires_at TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_fingerprint TEXT,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL NOT NULL DEFAULT 0,
+                    skeleton_path TEXT
+                );
+                CREATE TABLE IF NOT EXISTS shared_files (
+                    file_path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    source_lang TEXT,
+                    target_lang TEXT,
+                    size_bytes INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL DEFAULT 0
+                );
+            """)
+
+            # 补齐旧版索引表缺少的列
+            existing_columns = {row[1] for row in self.conn.execute("PRAGMA table_info(cache_entries)")}
+            for column, column_type in self.added_columns.items():
+                if column not in existing_columns:
+                    self.conn.execute(f"ALTER TABLE cache_entries ADD COLUMN {column} {column_type}")
+
+            self.conn.executescript("""
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at ON cache_entries (expires_at);
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_size ON cache_entries (size_bytes);
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_language ON cache_entries (source_lang, target_lang);
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_last_access ON cache_entries (last_access);
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_content_path ON cache_entries (content_path);
+                CREATE INDEX IF NOT EXISTS idx_cache_entries_skeleton_path ON cache_entries (skeleton_path);
+                CREATE INDEX IF NOT EXISTS idx_shared_files_updated_at ON shared_files (updated_at);
+            """)
+
+            # 条目数、总字节数和各语言对的计数由触发器随写入和删除更新，所有进程共享，无需逐个统计
+            self.conn.executescript("""
+                BEGIN IMMEDIATE;
+                CREATE TABLE IF NOT EXISTS cache_totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS cache_language_totals (
+                    source_lang TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    entries INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    PRIMARY KEY (source_lang, target_lang)
+                );
+                INSERT OR IGNORE INTO cache_totals (id, entries, bytes)
+                    SELECT 1, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries;
+                INSERT OR IGNORE INTO cache_language_totals (source_lang, target_lang, entries, bytes)
+                    SELECT COALESCE(source_lang, ''), COALESCE(target_lang, ''), COUNT(*), COALESCE(SUM(size_bytes), 0)
+                    FROM cache_entries GROUP BY 1, 2;
+                CREATE TRIGGER IF NOT EXISTS trg_cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+                    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+                    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_cache_entries_language_insert AFTER INSERT ON cache_entries BEGIN
+                    INSERT INTO cache_language_totals (source_lang, target_lang, entries, bytes)
+                        VALUES (COALESCE(NEW.source_lang, ''), COALESCE(NEW.target_lang, ''), 1, NEW.size_bytes)
+                        ON CONFLICT (source_lang, target_lang)
+                        DO UPDATE SET entries = entries + 1, bytes = bytes + excluded.bytes;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_cache_entries_language_delete AFTER DELETE ON cache_entries BEGIN
+                    UPDATE cache_language_totals SET entries = entries - 1, bytes = bytes - OLD.size_bytes
+                        WHERE source_lang = COALESCE(OLD.source_lang, '') AND target_lang = COALESCE(OLD.target_lang, '');
+                END;
+                -- 共享文件只计入字节数，不计入条目数；与语言无关的骨架不计入语言对
+                CREATE TRIGGER IF NOT EXISTS trg_shared_files_insert AFTER INSERT ON shared_files BEGIN
+                    UPDATE cache_totals SET bytes = bytes + NEW.size_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_shared_files_delete AFTER DELETE ON shared_files BEGIN
+                    UPDATE cache_totals SET bytes = bytes - OLD.size_bytes WHERE id = 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_shared_files_language_insert AFTER INSERT ON shared_files
+                WHEN NEW.source_lang IS NOT NULL BEGIN
+                    INSERT INTO cache_language_totals (source_lang, target_lang, entries, bytes)
+                        VALUES (NEW.source_lang, COALESCE(NEW.target_lang, ''), 0, NEW.size_bytes)
+                        ON CONFLICT (source_lang, target_lang) DO UPDATE SET bytes = bytes + excluded.bytes;
+                END;
+                CREATE TRIGGER IF NOT EXISTS trg_shared_files_language_delete AFTER DELETE ON shared_files
+                WHEN OLD.source_lang IS NOT NULL BEGIN
+                    UPDATE cache_language_totals SET bytes = bytes - OLD.size_bytes
+                        WHERE source_lang = OLD.source_lang AND target_lang = COALESCE(OLD.target_lang, '');
+                END;
+                COMMIT;
+            """)
+
+    def migrate_from_json(self, json_file: str) -> int:
+        """
+        从旧版JSON索引一次性迁移，迁移后原文件改名为 *.migrated
+
+        Returns:
+            迁移的条目数
+        """
+        if not os.path.exists(json_file):
+            return 0
+
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                legacy_index = json.load(f)
+        except FileNotFoundError:
+            return 0  # 其他worker进程已完成迁移
+        except Exception as e:
+            print(f"⚠️ 旧版JSON索引读取失败，跳过迁移: {e}")
+            return 0
+
+        records = []
+        for cache_key, cache_info in legacy_index.items():
+            if not isinstance(cache_info, dict) or not cache_info.get("file_path"):
+                continue
+            file_path = cache_info["file_path"]
+            records.append({
+                **cache_info,
+                "cache_key": cache_key,
+                "size_bytes": os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            })
+
+        self.put_many(records)
+        try:
+            os.replace(json_file, f"{json_file}.migrated")
+        except FileNotFoundError:
+            pass  # 其他worker进程同时迁移，重复写入的条目相同
+        print(f"📦 已从JSON索引迁移 {len(records)} 条文件缓存索引")
+        return len(records)
+
+    def row_to_dict(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        """查询结果转为字典"""
+        return dict(row) if row is not None else None
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """获取单条索引"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM cache_entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return self.row_to_dict(row)
+
+    def put(self, record: Dict):
+        """插入或覆盖单条索引"""
+        self.put_many([record])
+
+    def put_many(self, records: Iterable[Dict], shared_files: Iterable[Dict] = ()):
+        """批量插入或覆盖索引和共享文件记录 - 一个事务内完成"""
+        records = [{"size_bytes": 0, "last_access": 0, **record} for record in records]
+        rows = [tuple(record.get(column) for column in self.columns) for record in records]
+        shared_rows = [tuple(shared_file.get(column) for column in self.shared_columns) for shared_file in shared_files]
+        if not rows and not shared_rows:
+            return
+
+        placeholders = ", ".join("?" for _ in self.columns)
+        shared_placeholders = ", ".join("?" for _ in self.shared_columns)
+        with self.lock:
+            # 开始时即获取写锁，避免多进程下读锁升级为写锁失败
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 覆盖旧行时先触发删除触发器，共享文件的字节数始终只计一次
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO shared_files ({', '.join(self.shared_columns)}) VALUES ({shared_placeholders})",
+                    shared_rows
+                )
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO cache_entries ({', '.join(self.columns)}) VALUES ({placeholders})",
+                    rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, cache_key: str) -> bool:
+        """删除单条索引"""
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM cache_entries WHERE cache_key = ?", (cache_key,))
+        return cursor.rowcount > 0
+
+    def touch_many(self, accessed: Dict[str, float]):
+        """批量记录最近访问时间，用于LRU淘汰 - 一个事务内完成"""
+        if not accessed:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "UPDATE cache_entries SET last_access = ? WHERE cache_key = ?",
+                    [(accessed_at, cache_key) for cache_key, accessed_at in accessed.items()]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def put_shared_files(self, shared_files: Iterable[Dict]):
+        """插入或覆盖共享文件记录"""
+        self.put_many([], shared_files)
+
+    def get_shared_file(self, file_path: str) -> Optional[Dict]:
+        """获取共享文件记录"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM shared_files WHERE file_path = ?", (file_path,)).fetchone()
+        return self.row_to_dict(row)
+
+    def touch_shared_file(self, file_path: str, updated_at: float) -> bool:
+        """更新共享文件的写入时间，返回记录是否存在"""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE shared_files SET updated_at = ? WHERE file_path = ?", (updated_at, file_path)
+            )
+        return cursor.rowcount > 0
+
+    def delete_shared_file(self, file_path: str) -> bool:
+        """删除共享文件记录"""
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM shared_files WHERE file_path = ?", (file_path,))
+        return cursor.rowcount > 0
+
+    def count_shared_refs(self, file_path: str) -> int:
+        """引用同一共享文件（共享译文或骨架）的条目数"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM cache_entries WHERE content_path = ?)"
+                " + (SELECT COUNT(*) FROM cache_entries WHERE skeleton_path = ?)",
+                (file_path, file_path)
+            ).fetchone()[0]
+
+    def get_orphan_shared_files(self, updated_before: float, limit: int = 1000) -> List[Dict]:
+        """查询没有条目引用、且在updated_before之前写入的共享文件"""
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT * FROM shared_files AS s
+                WHERE s.updated_at < ?
+                    AND NOT EXISTS (SELECT 1 FROM cache_entries WHERE content_path = s.file_path)
+                    AND NOT EXISTS (SELECT 1 FROM cache_entries WHERE skeleton_path = s.file_path)
+                ORDER BY s.updated_at LIMIT ?
+            """, (updated_before, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_least_recent(self, limit: int = 100) -> List[Dict]:
+        """查询最久未访问的条目"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM cache_entries ORDER BY last_access LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """索引条目数（所有进程共享的计数）"""
+        with self.lock:
+            return self.conn.execute("SELECT entries FROM cache_totals WHERE id = 1").fetchone()[0]
+
+    def total_size(self) -> int:
+        """索引记录的缓存总字节数（所有进程共享的计数）"""
+        with self.lock:
+            return self.conn.execute("SELECT bytes FROM cache_totals WHERE id = 1").fetchone()[0]
+
+    def count_by_language(self) -> Dict[tuple, int]:
+        """各语言对的条目数（由触发器维护的计数）"""
+        return {pair: totals["entries"] for pair, totals in self.totals_by_language().items()}
+
+    def totals_by_language(self) -> Dict[tuple, Dict[str, int]]:
+        """各语言对的条目数和字节数（由触发器维护的计数）"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT source_lang, target_lang, entries, bytes FROM cache_language_totals WHERE entries > 0"
+            ).fetchall()
+        return {(row[0], row[1]): {"entries": row[2], "bytes": row[3]} for row in rows}
+
+    def reconcile_totals(self) -> Dict[str, int]:
+        """
+        按索引表重新计算所有计数（全表扫描，只在后台清理时执行）
+
+        Returns:
+            {"entries": 重新计算前后的条目数差值, "bytes": 字节数差值}
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.execute("SELECT entries, bytes FROM cache_totals WHERE id = 1").fetchone()
+                after = self.conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0)"
+                    " + (SELECT COALESCE(SUM(size_bytes), 0) FROM shared_files) FROM cache_entries"
+                ).fetchone()
+                self.conn.execute("UPDATE cache_totals SET entries = ?, bytes = ? WHERE id = 1", tuple(after))
+                self.conn.execute("DELETE FROM cache_language_totals")
+                self.conn.execute("""
+                    INSERT INTO cache_language_totals (source_lang, target_lang, entries, bytes)
+                    SELECT source_lang, target_lang, SUM(entries), SUM(bytes) FROM (
+                        SELECT COALESCE(source_lang, '') AS source_lang, COALESCE(target_lang, '') AS target_lang,
+                            COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS bytes
+                        FROM cache_entries GROUP BY 1, 2
+                        UNION ALL
+                        SELECT source_lang, COALESCE(target_lang, ''), 0, COALESCE(SUM(size_bytes), 0)
+                        FROM shared_files WHERE source_lang IS NOT NULL GROUP BY 1, 2
+                    ) GROUP BY 1, 2
+                """)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return {"entries": after[0] - before[0], "bytes": after[1] - before[1]}
+
+    def get_expired(self, now_iso: str, limit: int = 1000) -> List[Dict]:
+        """查询已过期的条目（expires_at为ISO时间字符串，可直接比较）"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM cache_entries WHERE expires_at < ? ORDER BY expires_at LIMIT ?",
+                (now_iso, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_largest(self, limit: int = 100) -> List[Dict]:
+        """查询占用空间最大的条目"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM cache_entries ORDER BY size_bytes DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
@@ -3,11 +3,27 @@
 """
 
 import os
-import json
+import asyncio
 import hashlib
+import threading
+import time
+import weakref
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from functools import lru_cache, partial
+from typing import Optional, Dict, Any, List, Tuple
 from app.config.config import get_settings
+from app.services.file_cache_index import FileCacheIndex
+from app.services.file_codec_service import get_file_codec_service
+from app.services.serializer_service import serializer_service
+from app.services.skeleton_service import skeleton_service
+
+# fcntl 仅在类Unix系统可用，不可用时多个worker进程各自执行清理
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 class FileCacheService:
@@ -19,10 +35,51 @@ class FileCacheService:
         self.settings = get_settings()
 
         self.cache_dir = "cache/translations"
-        self.index_file = "cache/index/cache_index.json"
-        self.cache_ttl_days = self.settings.file_cache_ttl_days
+        self.content_dir = "cache/content"  # 按内容指纹寻址的共享译文
+        self.index_file = "cache/index/cache_index.db"  # SQLite（WAL模式）索引，多个worker进程共用
+        self.janitor_lock_file = "cache/index/janitor.lock"  # 多个worker进程同时只有一个执行清理
+        self.legacy_index_file = "cache/index/cache_index.json"  # 旧版JSON索引，首次打开索引时一次性迁移
+        self.cache_ttl_days = self.settings.file_cache_ttl_days  # 硬过期
+        self.soft_ttl_days = min(self.settings.file_cache_soft_ttl_days, self.cache_ttl_days)  # 软过期
         self.max_size_mb = self.settings.file_cache_max_size_mb
         self.cleanup_interval_hours = self.settings.file_cache_cleanup_interval_hours
+        self.io_workers = self.settings.file_cache_io_workers
+
+        # 后台清理：先删过期条目，再按最近访问时间淘汰，直到低于容量上限
+        self.max_size_bytes = self.max_size_mb * 1024 * 1024
+        self.evict_target_ratio = 0.9  # 超出上限时淘汰到上限的90%，避免每次写入都触发淘汰
+        self.evict_batch_size = 100    # 每批查询的待删除条目数
+        # 命中时只在内存中记录访问时间，攒够一批或清理前再批量写入索引，读多时不与写入争抢SQLite写锁
+        self.access_times: Dict[str, float] = {}
+        self.access_lock = threading.Lock()
+        self.access_flush_size = 1000  # 待写入的访问记录达到该条数时立即写入
+        self.janitor_wakeup: Optional[asyncio.Event] = None
+        self.janitor_task: Optional[asyncio.Task] = None
+        self.janitor_running = False
+        self.eviction_metrics = {
+            "runs": 0,               # 清理次数
+            "skipped_runs": 0,       # 其他worker进程正在清理而跳过的次数
+            "expired_evictions": 0,  # 删除的过期条目数
+            "lru_evictions": 0,      # 因超出容量淘汰的条目数
+            "bytes_freed": 0,        # 释放的字节数
+            "last_run_at": None,     # 最近一次清理时间
+            "last_run_ms": 0.0       # 最近一次清理耗时
+        }
+
+        # 文件读写和(反)序列化在专用线程池中执行，不阻塞事件循环
+        self.io_executor = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="file-cache-io")
+        # 按缓存键加锁，同一条目的读、写、删除串行执行；不再使用的锁自动回收
+        self.key_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # 共享文件（共享译文、骨架）被多个缓存键引用，写入和按引用计数删除按文件路径加锁（I/O线程间）
+        self.shared_file_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self.shared_file_locks_guard = threading.Lock()
+        # 共享文件先于引用它的条目写入索引（骨架由写入队列先保存），刚写入、未被引用的共享文件保留一段时间再删除
+        self.shared_file_grace_seconds = 60
+
+        # 索引在首次访问时打开，分片目录在首次写入时创建，启动时不做文件系统操作
+        self.cache_index: Optional[FileCacheIndex] = None
+        self.index_lock = threading.Lock()
+        self.codec = get_file_codec_service()
 
         # 中文转其他9种语言映射
         self.source_language = "zh"  # 固定源语言为中文
@@ -39,46 +96,30 @@ class FileCacheService:
             "lo": "lao"           # 老挝语
         }
 
-        # 确保目录存在
-        os.makedirs(self.cache_dir, exist_ok=True)
-        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
-
-        # 创建语言对目录
-        self.create_language_directories()
-
-        # 加载索引
-        self.cache_index = self.load_index()
-
         print(f"📁 文件缓存服务初始化完成")
         print(f"  缓存目录: {self.cache_dir}")
         print(f"  索引文件: {self.index_file}")
         print(f"  缓存TTL: {self.cache_ttl_days}天 (来自配置)")
+        print(f"  软过期: {self.soft_ttl_days}天 (来自配置)")
         print(f"  最大缓存大小: {self.max_size_mb}MB (来自配置)")
         print(f"  清理间隔: {self.cleanup_interval_hours}小时 (来自配置)")
+        print(f"  I/O线程数: {self.io_workers}")
         print(f"  源语言: 中文 (zh)")
         print(f"  目标语言: {len(self.target_languages)}种")
         print(f"  目标语言列表: {', '.join(self.target_languages.values())}")
 
-    def create_language_directories(self):
-        """创建中文转其他语言的缓存目录结构"""
-        print("📂 创建中文转其他语言缓存目录...")
-
-        # 只创建中文转其他语言的目录
-        for target_code, target_name in self.target_languages.items():
-            # 创建语言目录：chinese-english, chinese-malay 等
-            lang_dir = os.path.join(
-                self.cache_dir,
-                f"chinese-{target_name}"
-            )
-            os.makedirs(lang_dir, exist_ok=True)
+    def open_index(self) -> FileCacheIndex:
+        """打开文件缓存索引（首次打开时从旧版JSON索引迁移），多线程下只打开一次"""
+        if self.cache_index is None:
+            with self.index_lock:
+                if self.cache_index is None:
+                    self.cache_index = FileCacheIndex(self.index_file, legacy_json_file=self.legacy_index_file)
+        return self.cache_index
 
-            # 在语言目录下创建哈希分片目录
-            for i in range(16):  # 00-0f
-                for j in range(16):  # 00-0f
-                    hash_dir = os.path.join(lang_dir, f"{i:02x}", f"{j:02x}")
-                    os.makedirs(hash_dir, exist_ok=True)
-
-        print(f"✅ 已创建 {len(self.target_languages)} 个中文转其他语言目录")
+    @property
+    def index(self) -> FileCacheIndex:
+        """文件缓存索引 - 首次访问时打开"""
+        return self.cache_index or self.open_index()
 
     def get_language_pair_name(self, source_lang: str, target_lang: str) -> str:
         """获取语言对名称 - 只支持中文转其他语言"""
@@ -115,6 +156,36 @@ class FileCacheService:
         # 生成MD5哈希并截取12位
         return hashlib.md5(content.encode('utf-8')).hexdigest()[:12]
     
+    async def run_io(self, func, *args, **kwargs):
+        """在文件I/O线程池中执行阻塞操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, partial(func, *args, **kwargs))
+    
+    def get_key_lock(self, cache_key: str) -> asyncio.Lock:
+        """获取缓存键对应的锁"""
+        lock = self.key_locks.get(cache_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.key_locks[cache_key] = lock
+        return lock
+    
+    def get_shared_file_lock(self, file_path: str) -> threading.Lock:
+        """获取共享文件的锁，不存在时创建"""
+        with self.shared_file_locks_guard:
+            lock = self.shared_file_locks.get(file_path)
+            if lock is None:
+                lock = threading.Lock()
+                self.shared_file_locks[file_path] = lock
+            return lock
+    
+    @contextmanager
+    def hold_shared_file_locks(self, file_paths):
+        """按路径顺序获取多个共享文件的锁，避免互相等待"""
+        with ExitStack() as stack:
+            for file_path in sorted(set(file_paths)):
+                stack.enter_context(self.get_shared_file_lock(file_path))
+            yield
+    
     def get_cache_file_path(self, cache_key: str, source_lang: str, target_lang: str) -> str:
         """获取缓存文件路径 - 按语言对和哈希分片"""
         # 获取语言对名称
@@ -129,23 +200,155 @@ class FileCacheService:
             f"{cache_key}.json"
         )
     
-    def load_index(self) -> Dict:
-        """加载缓存索引"""
-        if os.path.exists(self.index_file):
-            try:
-                with open(self.index_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def save_index(self):
-        """保存缓存索引"""
+    def get_content_file_path(self, content_hash: str, source_lang: str, target_lang: str) -> str:
+        """获取共享译文文件路径 - 相同HTML在不同路径下共用一份译文"""
+        lang_pair = self.get_language_pair_name(source_lang, target_lang)
+        return os.path.join(self.content_dir, lang_pair, content_hash[:2], f"{content_hash}.json")
+    
+    def split_shared_content(self, translation_result: Dict) -> Tuple[Optional[str], Dict, Optional[Dict[str, str]]]:
+        """
+        拆分出可在路径间共享的译文内容（不含request_info）
+
+        Returns:
+            (内容指纹, 共享内容, 片段映射表)；有内容指纹时片段映射表从共享内容中移出单独保存
+        """
+        cache_info = translation_result.get("cache_info") or {}
+        content_hash = cache_info.get("content_fingerprint")
+        shared_content = {section: value for section, value in translation_result.items() if section != "request_info"}
+        translation_map = None
+        if content_hash and "translation_map" in cache_info:
+            shared_content["cache_info"] = {key: value for key, value in cache_info.items() if key != "translation_map"}
+            translation_map = cache_info["translation_map"]
+        return content_hash, shared_content, translation_map
+    
+    def load_shared_content(self, content_file_path: str) -> Optional[Dict]:
+        """读取共享译文文件，不存在或已过期返回None"""
+        try:
+            shared_data = serializer_service.loads(self.codec.read_file(content_file_path))
+        except FileNotFoundError:
+            return None
+        
+        # 过期的共享文件由引用它的最后一个条目删除时或后台清理一并删除
+        if self.is_cache_expired(shared_data):
+            return None
+        return shared_data["content"]
+    
+    def get_translation_map_file_path(self, content_file_path: str) -> str:
+        """获取片段映射表文件路径 - 与共享译文文件同目录，只在页面变化需要增量翻译时读取"""
+        return f"{os.path.splitext(content_file_path)[0]}.map.json"
+    
+    def read_translation_map(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict[str, str]]:
+        """读取片段映射表（阻塞，在I/O线程池中执行），不存在返回None"""
+        content_file_path = self.get_content_file_path(content_hash, source_lang, target_lang)
+        try:
+            return serializer_service.loads(self.codec.read_file(self.get_translation_map_file_path(content_file_path)))
+        except FileNotFoundError:
+            return None
+    
+    async def get_translation_map(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict[str, str]]:
+        """按内容指纹获取片段映射表"""
+        try:
+            return await self.run_io(self.read_translation_map, content_hash, source_lang, target_lang)
+        except Exception as e:
+            print(f"❌ 获取文件片段映射表失败: {e}")
+            return None
+    
+    def get_skeleton_file_path(self, content_hash: str) -> str:
+        """获取骨架文件路径 - 与语言无关，同一页面的所有目标语言共用"""
+        return os.path.join(self.content_dir, "skeleton", content_hash[:2], f"{content_hash}.json")
+    
+    def expand_skeletons(self, content: Optional[Dict]) -> Optional[Dict]:
+        """紧凑格式的缓存内容拼回完整译文HTML，骨架已过期时返回None"""
+        if content is None:
+            return None
+        
+        skeletons = {}
+        for ref in skeleton_service.get_skeleton_refs(content):
+            skeleton_data = self.load_shared_content(self.get_skeleton_file_path(ref))
+            if skeleton_data is not None:
+                skeletons[ref] = skeleton_data["skeleton"]
+        return skeleton_service.expand(content, skeletons)
+    
+    def write_skeletons(self, skeletons: Dict[str, List[str]]):
+        """写入骨架文件并记入索引，按引用计数删除（阻塞，在I/O线程池中执行）"""
+        now = datetime.now()
+        skeleton_paths = {content_hash: self.get_skeleton_file_path(content_hash) for content_hash in skeletons}
+        shared_files = []
+        with self.hold_shared_file_locks(skeleton_paths.values()):
+            for content_hash, skeleton in skeletons.items():
+                skeleton_file_path = skeleton_paths[content_hash]
+                os.makedirs(os.path.dirname(skeleton_file_path), exist_ok=True)
+                size_bytes = self.codec.write_file(skeleton_file_path, serializer_service.dumps({
+                    "metadata": {
+                        "content_hash": content_hash,
+                        "created_at": now.isoformat(),
+                        "expires_at": (now + timedelta(days=self.cache_ttl_days)).isoformat()
+                    },
+                    "content": {"skeleton": skeleton}
+                }))
+                shared_files.append({
+                    "file_path": skeleton_file_path,
+                    "kind": "skeleton",
+                    "size_bytes": size_bytes,
+                    "updated_at": time.time()
+                })
+            self.index.put_shared_files(shared_files)
+    
+    async def set_skeletons(self, skeletons: Dict[str, List[str]]) -> bool:
+        """批量保存骨架，有效期与译文相同"""
+        try:
+            await self.run_io(self.write_skeletons, skeletons)
+            return True
+            
+        except Exception as e:
+            print(f"❌ 保存文件骨架失败: {e}")
+            return False
+    
+    def read_content(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """读取共享译文并拼回骨架（阻塞，在I/O线程池中执行）"""
+        return self.expand_skeletons(
+            self.load_shared_content(self.get_content_file_path(content_hash, source_lang, target_lang))
+        )
+    
+    async def get_content(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """按内容指纹获取共享译文（不含request_info）"""
         try:
-            with open(self.index_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache_index, f, ensure_ascii=False, indent=2)
+            shared_content = await self.run_io(self.read_content, content_hash, source_lang, target_lang)
+            if shared_content is not None:
+                print(f"✅ 文件内容缓存命中: {content_hash[:8]}...")
+            return shared_content
+            
         except Exception as e:
-            print(f"❌ 保存索引失败: {e}")
+            print(f"❌ 获取文件内容缓存失败: {e}")
+            return None
+    
+    def get_debug_file_path(self, file_path: str) -> str:
+        """获取调试数据文件路径 - 与缓存文件同目录单独存放"""
+        return f"{os.path.splitext(file_path)[0]}.debug.json"
+    
+    def get_html_file_path(self, file_path: str) -> str:
+        """获取译文HTML文件路径 - 与缓存文件（或共享译文文件）同目录，未压缩，命中时直接以文件返回"""
+        return f"{os.path.splitext(file_path)[0]}.html"
+    
+    def get_translated_html(self, translation_result: Dict) -> Optional[str]:
+        """取出完整译文HTML，骨架存储格式的紧凑内容没有完整译文，返回None"""
+        for section in skeleton_service.result_sections:
+            translated_html = (translation_result.get(section) or {}).get("translated_html_body")
+            if isinstance(translated_html, str):
+                return translated_html
+        return None
+    
+    def write_html_file(self, html_file_path: str, translated_html: str) -> int:
+        """原子写入未压缩的译文HTML文件，正在发送的旧文件不受影响；返回写入的字节数"""
+        return self.codec.write_atomic(html_file_path, translated_html.encode('utf-8'))
+    
+    def remove_files(self, *file_paths: str):
+        """删除存在的文件 - 其他worker进程可能已先删除"""
+        for file_path in file_paths:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
     
     def is_cache_expired(self, cache_data: Dict) -> bool:
         """检查缓存是否过期"""
@@ -155,133 +358,588 @@ class FileCacheService:
         except:
             return True
     
+    def is_soft_expired(self, metadata: Dict) -> bool:
+        """缓存条目是否已软过期 - 没有软过期时间的旧缓存条目视为未过期"""
+        soft_expires_at = metadata.get("soft_expires_at")
+        if not soft_expires_at:
+            return False
+        return datetime.now() > datetime.fromisoformat(soft_expires_at)
+    
     async def get_cache(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
-        """获取缓存"""
+        """获取缓存内容"""
+        cache_entry = await self.get_cache_entry(path, source_lang, target_lang)
+        return cache_entry["content"] if cache_entry else None
+    
+    async def get_cache_entry(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """获取缓存条目，包含metadata（ETag、Last-Modified等）和content"""
         try:
             # 1. 生成基于路径的缓存键
             cache_key = self.generate_cache_key(path, source_lang, target_lang)
             
-            # 2. 检查索引
-            if cache_key in self.cache_index:
-                cache_info = self.cache_index[cache_key]
-                file_path = cache_info["file_path"]
+            # 2. 读取在I/O线程池中执行，同一缓存键与写入、删除互斥
+            async with self.get_key_lock(cache_key):
+                return await self.run_io(self.read_cache_entry, cache_key)
+            
+        except Exception as e:
+            print(f"❌ 获取文件缓存失败: {e}")
+            return None
+    
+    def read_cache_entry(self, cache_key: str) -> Optional[Dict]:
+        """读取缓存条目，已过期或文件缺失时清理（阻塞，在I/O线程池中执行）"""
+        # 1. 检查索引
+        cache_info = self.index.get(cache_key)
+        if cache_info:
+            file_path = cache_info["file_path"]
+            
+            # 2. 检查文件是否存在
+            if os.path.exists(file_path):
+                # 3. 加载缓存数据
+                cache_data = serializer_service.loads(self.codec.read_file(file_path))
                 
-                # 3. 检查文件是否存在
-                if os.path.exists(file_path):
-                    # 4. 加载缓存数据
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    # 5. 检查是否过期
-                    if not self.is_cache_expired(cache_data):
-                        print(f"✅ 文件缓存命中: {cache_key[:8]}...")
-                        return cache_data["content"]
-                    else:
-                        print(f"⏰ 文件缓存已过期: {cache_key[:8]}...")
-                        # 删除过期缓存
-                        await self.delete_cache_file(cache_key, file_path)
+                # 4. 检查是否过期，指针条目读取共享译文
+                if not self.is_cache_expired(cache_data):
+                    content_ref = cache_data["metadata"].get("content_ref")
+                    if content_ref:
+                        shared_content = self.expand_skeletons(self.load_shared_content(content_ref))
+                        if shared_content is None:
+                            print(f"⏰ 文件共享译文已过期: {cache_key[:8]}...")
+                            self.remove_cache_files(cache_key, file_path)
+                            return None
+                        cache_data = {
+                            "metadata": cache_data["metadata"],
+                            "content": {"request_info": cache_data.get("request_info", {}), **shared_content}
+                        }
+                    self.record_access(cache_key)
+                    print(f"✅ 文件缓存命中: {cache_key[:8]}...")
+                    return cache_data
                 else:
-                    print(f"📁 缓存文件不存在: {cache_key[:8]}...")
-                    # 从索引中删除无效条目
-                    del self.cache_index[cache_key]
-                    self.save_index()
-            
-            print(f"❌ 文件缓存未命中: {cache_key[:8]}...")
+                    print(f"⏰ 文件缓存已过期: {cache_key[:8]}...")
+                    # 删除过期缓存
+                    self.remove_cache_files(cache_key, file_path)
+            else:
+                print(f"📁 缓存文件不存在: {cache_key[:8]}...")
+                # 从索引中删除无效条目
+                self.index.delete(cache_key)
+        
+        print(f"❌ 文件缓存未命中: {cache_key[:8]}...")
+        return None
+    
+    async def get_cache_many(self, items: List[Tuple[str, str, str]]) -> List[Optional[Dict]]:
+        """
+        批量获取文件缓存 - 各条目在I/O线程池中并发读取
+
+        Args:
+            items: (路径, 源语言, 目标语言) 列表
+
+        Returns:
+            与items顺序一致的缓存内容，未命中为None
+        """
+        cache_entries = await self.get_cache_entry_many(items)
+        return [cache_entry["content"] if cache_entry else None for cache_entry in cache_entries]
+    
+    async def get_cache_entry_many(self, items: List[Tuple[str, str, str]]) -> List[Optional[Dict]]:
+        """批量获取文件缓存条目（metadata和content）- 各条目在I/O线程池中并发读取"""
+        results = await asyncio.gather(*[
+            self.get_cache_entry(path, source_lang, target_lang) for path, source_lang, target_lang in items
+        ])
+        
+        hit_count = sum(1 for result in results if result is not None)
+        print(f"✅ 文件缓存批量查询: {hit_count}/{len(items)} 命中")
+        return results
+    
+    def read_html_entry(self, cache_key: str) -> Optional[Dict]:
+        """只查索引取得译文HTML文件，不读取和解析缓存文件（阻塞，在I/O线程池中执行）"""
+        cache_info = self.index.get(cache_key)
+        if not cache_info or not cache_info.get("html_path"):
+            return None
+        # 已过期的条目交给常规读取流程清理
+        if not cache_info.get("expires_at") or cache_info["expires_at"] < datetime.now().isoformat():
             return None
+        if not os.path.exists(cache_info["html_path"]):
+            return None
+        
+        self.record_access(cache_key)
+        return {
+            "html_path": cache_info["html_path"],
+            "metadata": {
+                "soft_expires_at": cache_info["soft_expires_at"],
+                "etag": cache_info["etag"],
+                "last_modified": cache_info["last_modified"],
+                "content_fingerprint": cache_info["content_fingerprint"]
+            }
+        }
+    
+    async def get_html_entry(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """
+        获取译文HTML文件，命中时可直接以文件返回（sendfile），无需解析缓存内容
+
+        Returns:
+            {"html_path": 译文HTML文件, "metadata": 索引中的过期时间、校验值和内容指纹}，
+            未命中、已过期或骨架存储格式的条目为None
+        """
+        try:
+            cache_key = self.generate_cache_key(path, source_lang, target_lang)
+            async with self.get_key_lock(cache_key):
+                return await self.run_io(self.read_html_entry, cache_key)
             
         except Exception as e:
-            print(f"❌ 获取文件缓存失败: {e}")
+            print(f"❌ 获取文件缓存译文HTML失败: {e}")
+            return None
+    
+    def read_debug_artifacts(self, cache_key: str) -> Optional[Dict]:
+        """读取调试数据文件（阻塞，在I/O线程池中执行）"""
+        cache_info = self.index.get(cache_key)
+        if not cache_info or not cache_info.get("debug_file_path"):
+            return None
+        
+        debug_file_path = cache_info["debug_file_path"]
+        if not os.path.exists(debug_file_path):
             return None
+        
+        return serializer_service.loads(self.codec.read_file(debug_file_path))
     
-    async def set_cache(self, path: str, source_lang: str, target_lang: str, translation_result: Dict) -> bool:
-        """设置缓存"""
+    async def get_debug_artifacts(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """获取调试数据（原文HTML、逐片段翻译结果、翻译映射表）"""
         try:
-            # 1. 生成基于路径的缓存键
             cache_key = self.generate_cache_key(path, source_lang, target_lang)
+            async with self.get_key_lock(cache_key):
+                return await self.run_io(self.read_debug_artifacts, cache_key)
+                
+        except Exception as e:
+            print(f"❌ 获取文件调试数据失败: {e}")
+            return None
+    
+    def write_shared_content(self, content_file_path: str, shared_data: Dict, translated_html: Optional[str],
+                             translation_map: Optional[Dict[str, str]], source_lang: str, target_lang: str,
+                             pointer_only: bool = False) -> Optional[str]:
+        """
+        写入共享译文文件、片段映射表文件并记入索引（阻塞，在I/O线程池中执行）
+
+        Args:
+            pointer_only: 共享译文已由其他路径保存，文件仍存在时只刷新写入时间，不重写文件
+
+        Returns:
+            共享译文HTML文件路径，没有时为None
+        """
+        html_file_path = self.get_html_file_path(content_file_path)
+        with self.get_shared_file_lock(content_file_path):
+            if pointer_only and self.index.touch_shared_file(content_file_path, time.time()) \
+                    and os.path.exists(content_file_path):
+                return html_file_path if os.path.exists(html_file_path) else None
             
-            # 2. 获取文件路径
-            file_path = self.get_cache_file_path(cache_key, source_lang, target_lang)
-            
-            # 3. 创建目录
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            
-            # 4. 准备缓存数据
-            cache_data = {
+            os.makedirs(os.path.dirname(content_file_path), exist_ok=True)
+            shared_size = self.codec.write_file(content_file_path, serializer_service.dumps(shared_data))
+            if translated_html is not None:
+                shared_size += self.write_html_file(html_file_path, translated_html)
+            else:
+                self.remove_files(html_file_path)
+                html_file_path = None
+            translation_map_file_path = self.get_translation_map_file_path(content_file_path)
+            if translation_map is not None:
+                shared_size += self.codec.write_file(translation_map_file_path, serializer_service.dumps(translation_map))
+            else:
+                self.remove_files(translation_map_file_path)
+            self.index.put_shared_files([{
+                "file_path": content_file_path,
+                "kind": "content",
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "size_bytes": shared_size,
+                "updated_at": time.time()
+            }])
+        return html_file_path
+    
+    def write_cache_entry(self, path: str, source_lang: str, target_lang: str, translation_result: Dict,
+                          debug_artifacts: Optional[Dict] = None, pointer_only: bool = False) -> Dict:
+        """
+        写入缓存文件，返回待写入索引的记录（阻塞，在I/O线程池中执行）
+
+        Args:
+            pointer_only: 译文来自相同内容的共享译文，共享译文文件仍存在时只写路径指针
+        """
+        # 1. 生成基于路径的缓存键
+        cache_key = self.generate_cache_key(path, source_lang, target_lang)
+        
+        # 2. 获取文件路径
+        file_path = self.get_cache_file_path(cache_key, source_lang, target_lang)
+        
+        # 3. 创建目录
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        
+        # 4. 准备缓存数据
+        now = datetime.now()
+        metadata = {
+            "cache_key": cache_key,
+            "created_at": now.isoformat(),
+            "soft_expires_at": (now + timedelta(days=self.soft_ttl_days)).isoformat(),
+            "expires_at": (now + timedelta(days=self.cache_ttl_days)).isoformat(),
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "path": path,
+            "file_path": file_path,
+            "cache_method": "path_hash_md5",
+            **serializer_service.build_validators(translation_result)
+        }
+        
+        # 有内容指纹时译文按内容寻址保存，路径文件只保存指针和request_info；
+        # 共享译文单独记入索引，字节数只计一次，不计入各个引用条目
+        size_bytes = 0
+        content_file_path = None
+        content_hash, shared_content, translation_map = self.split_shared_content(translation_result)
+        translated_html = self.get_translated_html(translation_result)
+        html_file_path = None
+        if content_hash:
+            content_file_path = self.get_content_file_path(content_hash, source_lang, target_lang)
+            shared_data = {
                 "metadata": {
-                    "cache_key": cache_key,
-                    "created_at": datetime.now().isoformat(),
-                    "expires_at": (datetime.now() + timedelta(days=self.cache_ttl_days)).isoformat(),
-                    "source_lang": source_lang,
-                    "target_lang": target_lang,
-                    "path": path,
-                    "file_path": file_path,
-                    "cache_method": "path_hash_md5"
+                    "content_hash": content_hash,
+                    "created_at": metadata["created_at"],
+                    "expires_at": metadata["expires_at"]
                 },
-                "content": translation_result
+                "content": shared_content
             }
-            
-            # 5. 保存缓存文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False)
-            
-            # 6. 更新索引
-            self.cache_index[cache_key] = {
-                "file_path": file_path,
-                "created_at": cache_data["metadata"]["created_at"],
-                "expires_at": cache_data["metadata"]["expires_at"],
-                "path": path,
-                "source_lang": source_lang,
-                "target_lang": target_lang,
-                "cache_method": "path_hash_md5"
+            html_file_path = self.write_shared_content(
+                content_file_path, shared_data, translated_html, translation_map, source_lang, target_lang, pointer_only
+            )
+            cache_data = {
+                "metadata": {**metadata, "content_ref": content_file_path},
+                "request_info": translation_result.get("request_info", {})
             }
-            self.save_index()
+        else:
+            cache_data = {"metadata": metadata, "content": translation_result}
+            if translated_html is not None:
+                html_file_path = self.get_html_file_path(file_path)
+                size_bytes += self.write_html_file(html_file_path, translated_html)
+        
+        # 5. 保存缓存文件，清理上一版本遗留的译文HTML文件
+        size_bytes += self.codec.write_file(file_path, serializer_service.dumps(cache_data))
+        if html_file_path != self.get_html_file_path(file_path):
+            self.remove_files(self.get_html_file_path(file_path))
+        
+        # 6. 调试数据单独保存，命中时按需读取
+        debug_file_path = None
+        if debug_artifacts is not None:
+            debug_file_path = self.get_debug_file_path(file_path)
+            size_bytes += self.codec.write_file(debug_file_path, serializer_service.dumps(debug_artifacts))
+        else:
+            self.remove_files(self.get_debug_file_path(file_path))
+        
+        # 7. 索引记录，引用的骨架按引用计数删除
+        skeleton_refs = skeleton_service.get_skeleton_refs(translation_result)
+        return {
+            "cache_key": cache_key,
+            "file_path": file_path,
+            "debug_file_path": debug_file_path,
+            "content_path": content_file_path,
+            "html_path": html_file_path,
+            "created_at": cache_data["metadata"]["created_at"],
+            "soft_expires_at": cache_data["metadata"]["soft_expires_at"],
+            "expires_at": cache_data["metadata"]["expires_at"],
+            "path": path,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "cache_method": "path_hash_md5",
+            "etag": cache_data["metadata"]["etag"],
+            "last_modified": cache_data["metadata"]["last_modified"],
+            "content_fingerprint": content_hash,
+            "skeleton_path": self.get_skeleton_file_path(skeleton_refs[0]) if skeleton_refs else None,
+            "size_bytes": size_bytes,
+            "last_access": time.time()
+        }
+    
+    async def set_cache(self, path: str, source_lang: str, target_lang: str, translation_result: Dict,
+                        debug_artifacts: Optional[Dict] = None, pointer_only: bool = False) -> bool:
+        """设置缓存，调试数据单独存放；pointer_only时共享译文已存在则只写路径指针"""
+        try:
+            cache_key = self.generate_cache_key(path, source_lang, target_lang)
+            async with self.get_key_lock(cache_key):
+                record = await self.run_io(
+                    self.write_cache_entry, path, source_lang, target_lang, translation_result, debug_artifacts, pointer_only
+                )
+                await self.run_io(lambda: self.index.put(record))
             
-            print(f"💾 文件缓存已保存: {cache_key[:8]}...")
+            print(f"💾 文件缓存已保存: {record['cache_key'][:8]}...")
+            await self.wake_janitor_if_full()
             return True
             
         except Exception as e:
             print(f"❌ 保存文件缓存失败: {e}")
             return False
     
-    async def delete_cache_file(self, cache_key: str, file_path: str):
-        """删除缓存文件"""
+    async def set_cache_many(self, entries: List[Tuple[str, str, str, Dict, Optional[Dict]]]) -> int:
+        """
+        批量设置文件缓存 - 逐个写入缓存文件，索引在一个事务内写入
+
+        Args:
+            entries: (路径, 源语言, 目标语言, 缓存内容, 调试数据, 是否只写指针) 列表
+
+        Returns:
+            写入的条目数
+        """
+        records = []
+        for path, source_lang, target_lang, translation_result, debug_artifacts, pointer_only in entries:
+            try:
+                cache_key = self.generate_cache_key(path, source_lang, target_lang)
+                async with self.get_key_lock(cache_key):
+                    records.append(await self.run_io(
+                        self.write_cache_entry, path, source_lang, target_lang, translation_result, debug_artifacts, pointer_only
+                    ))
+            except Exception as e:
+                print(f"❌ 保存文件缓存失败: {e}")
+        
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            if cache_key in self.cache_index:
-                del self.cache_index[cache_key]
-                self.save_index()
-                
-            print(f"🗑️ 已删除过期缓存: {cache_key[:8]}...")
+            await self.run_io(lambda: self.index.put_many(records))
+        except Exception as e:
+            print(f"❌ 保存文件缓存索引失败: {e}")
+            return 0
+        
+        print(f"💾 文件缓存批量保存: {len(records)}/{len(entries)} 条")
+        await self.wake_janitor_if_full()
+        return len(records)
+    
+    def release_shared_file(self, file_path: Optional[str]) -> int:
+        """
+        共享文件没有条目引用时删除文件和索引记录（阻塞，在I/O线程池中执行）
+
+        刚写入的共享文件，引用它的条目可能还未写入索引，保留到后台清理时再判断
+
+        Returns:
+            释放的字节数
+        """
+        if not file_path:
+            return 0
+        
+        with self.get_shared_file_lock(file_path):
+            if self.index.count_shared_refs(file_path) > 0:
+                return 0
+            shared_file = self.index.get_shared_file(file_path)
+            if shared_file and shared_file["updated_at"] > time.time() - self.shared_file_grace_seconds:
+                return 0
+            self.remove_files(file_path, self.get_html_file_path(file_path), self.get_translation_map_file_path(file_path))
+            self.index.delete_shared_file(file_path)
+        return (shared_file or {}).get("size_bytes") or 0
+    
+    def remove_cache_files(self, cache_key: str, file_path: str) -> int:
+        """删除缓存文件和索引条目，共享译文和骨架没有其他引用时一并删除（阻塞，在I/O线程池中执行）
+
+        Returns:
+            释放的字节数（索引中记录的该条目字节数和一并删除的共享文件字节数）
+        """
+        cache_info = self.index.get(cache_key) or {}
+        self.remove_files(file_path, self.get_debug_file_path(file_path), self.get_html_file_path(file_path))
+        
+        self.index.delete(cache_key)
+        
+        freed = cache_info.get("size_bytes") or 0
+        freed += self.release_shared_file(cache_info.get("content_path"))
+        freed += self.release_shared_file(cache_info.get("skeleton_path"))
+        
+        print(f"🗑️ 已删除文件缓存: {cache_key[:8]}...")
+        return freed
+    
+    async def delete_cache_file(self, cache_key: str, file_path: str) -> int:
+        """删除缓存文件，返回释放的字节数"""
+        try:
+            async with self.get_key_lock(cache_key):
+                return await self.run_io(self.remove_cache_files, cache_key, file_path)
         except Exception as e:
             print(f"❌ 删除缓存文件失败: {e}")
+            return 0
+    
+    async def cleanup_expired(self, limit: int = 1000) -> int:
+        """按索引中的过期时间删除已过期的缓存文件，返回删除条数"""
+        expired = await self.run_io(self.index.get_expired, datetime.now().isoformat(), limit)
+        for cache_info in expired:
+            self.eviction_metrics["bytes_freed"] += await self.delete_cache_file(cache_info["cache_key"], cache_info["file_path"])
+        self.eviction_metrics["expired_evictions"] += len(expired)
+        return len(expired)
+    
+    def remove_orphan_shared_files(self, limit: int = 1000) -> Tuple[int, int]:
+        """删除超过保留时间仍没有条目引用的共享文件（阻塞，在I/O线程池中执行），返回 (删除个数, 释放字节数)"""
+        orphans = self.index.get_orphan_shared_files(time.time() - self.shared_file_grace_seconds, limit)
+        freed = sum(self.release_shared_file(shared_file["file_path"]) for shared_file in orphans)
+        return len(orphans), freed
+    
+    async def cleanup_orphan_shared_files(self, limit: int = 1000) -> int:
+        """删除没有条目引用的共享文件，返回删除个数"""
+        removed, freed = await self.run_io(self.remove_orphan_shared_files, limit)
+        self.eviction_metrics["bytes_freed"] += freed
+        return removed
+    
+    def record_access(self, cache_key: str):
+        """记录缓存命中时间，攒够access_flush_size条时批量写入索引（阻塞，在I/O线程池中执行）"""
+        with self.access_lock:
+            self.access_times[cache_key] = time.time()
+            should_flush = len(self.access_times) >= self.access_flush_size
+        if should_flush:
+            self.flush_access_times()
+    
+    def flush_access_times(self) -> int:
+        """把内存中的访问时间批量写入索引（阻塞，在I/O线程池中执行），返回写入条数"""
+        with self.access_lock:
+            accessed, self.access_times = self.access_times, {}
+        if accessed:
+            self.index.touch_many(accessed)
+        return len(accessed)
+    
+    async def get_total_size(self) -> int:
+        """索引记录的缓存总字节数 - 在I/O线程池中查询，其他进程写入时等待SQLite锁不阻塞事件循环"""
+        return await self.run_io(lambda: self.index.total_size())
+    
+    async def evict_lru(self) -> int:
+        """超出容量上限时按最近访问时间淘汰，直到低于上限的evict_target_ratio，返回淘汰条数"""
+        total_size = await self.get_total_size()
+        if total_size <= self.max_size_bytes:
+            return 0
+        
+        target_bytes = self.max_size_bytes * self.evict_target_ratio
+        evicted = 0
+        while total_size > target_bytes:
+            candidates = await self.run_io(self.index.get_least_recent, self.evict_batch_size)
+            size_before = total_size
+            for cache_info in candidates:
+                if total_size <= target_bytes:
+                    break
+                freed = await self.delete_cache_file(cache_info["cache_key"], cache_info["file_path"])
+                self.eviction_metrics["bytes_freed"] += freed
+                total_size -= freed
+                evicted += 1
+            total_size = await self.get_total_size()  # 期间其他进程可能写入，每批后重新读取
+            if total_size >= size_before:
+                break  # 没有可删除的条目或删除失败，等下次清理
+        
+        self.eviction_metrics["lru_evictions"] += evicted
+        print(f"🧹 文件缓存超出容量上限，已淘汰 {evicted} 条最久未访问的缓存")
+        return evicted
+    
+    def acquire_janitor_lock(self):
+        """
+        获取跨进程的清理锁（不阻塞）
+
+        Returns:
+            获取成功返回锁文件对象（不支持fcntl时为True）；其他worker进程正在清理返回None
+        """
+        if fcntl is None:
+            return True
+        
+        os.makedirs(os.path.dirname(self.janitor_lock_file), exist_ok=True)
+        lock_file = open(self.janitor_lock_file, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            lock_file.close()
+            return None
+    
+    def release_janitor_lock(self, lock_file):
+        """释放跨进程的清理锁"""
+        if fcntl is None:
+            return
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+    
+    async def run_cleanup(self) -> Dict[str, int]:
+        """执行一次清理：先删除所有过期条目，再按LRU淘汰到容量上限以内；其他worker进程正在清理时跳过"""
+        # 每个进程先写入本进程的访问记录，执行清理的进程按最新的访问时间淘汰
+        await self.run_io(self.flush_access_times)
+        lock_file = await self.run_io(self.acquire_janitor_lock)
+        if lock_file is None:
+            self.eviction_metrics["skipped_runs"] += 1
+            print("🧹 其他worker进程正在清理文件缓存，跳过本次清理")
+            return {"expired": 0, "evicted": 0}
+        
+        start_time = time.time()
+        try:
+            expired = 0
+            while True:
+                removed = await self.cleanup_expired(self.evict_batch_size)
+                expired += removed
+                if removed < self.evict_batch_size:
+                    break
+            while await self.cleanup_orphan_shared_files(self.evict_batch_size) >= self.evict_batch_size:
+                pass
+            evicted = await self.evict_lru()
+            
+            # 计数由索引触发器维护，这里按索引表重新计算一次兜底
+            drift = await self.run_io(self.index.reconcile_totals)
+            if drift["entries"] or drift["bytes"]:
+                print(f"🧮 文件缓存计数已校准: 条目 {drift['entries']:+d}, 字节 {drift['bytes']:+d}")
+        finally:
+            await self.run_io(self.release_janitor_lock, lock_file)
+        
+        self.eviction_metrics["runs"] += 1
+        self.eviction_metrics["last_run_at"] = datetime.now().isoformat()
+        self.eviction_metrics["last_run_ms"] = round((time.time() - start_time) * 1000, 2)
+        return {"expired": expired, "evicted": evicted}
+    
+    async def wake_janitor_if_full(self):
+        """写入后超出容量上限时提前唤醒清理协程"""
+        if self.janitor_running and await self.get_total_size() > self.max_size_bytes:
+            self.janitor_wakeup.set()
     
-    def get_cache_stats(self) -> Dict[str, Any]:
+    async def janitor_loop(self):
+        """后台清理协程 - 每隔cleanup_interval_hours执行一次，超出容量时被提前唤醒"""
+        print("🧹 文件缓存清理协程已启动")
+        interval = self.cleanup_interval_hours * 3600
+        await self.run_io(self.open_index)  # 在I/O线程中打开索引，不阻塞事件循环
+        while self.janitor_running:
+            try:
+                await self.run_cleanup()
+            except Exception as e:
+                print(f"❌ 文件缓存清理异常: {e}")
+            try:
+                await asyncio.wait_for(self.janitor_wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self.janitor_wakeup.clear()
+        print("🧹 文件缓存清理协程已停止")
+    
+    def start_janitor(self):
+        """启动后台清理协程"""
+        if self.janitor_running:
+            return
+        self.janitor_wakeup = asyncio.Event()
+        self.janitor_running = True
+        self.janitor_task = asyncio.create_task(self.janitor_loop())
+    
+    async def stop_janitor(self):
+        """停止后台清理协程"""
+        if not self.janitor_running:
+            return
+        self.janitor_running = False
+        self.janitor_wakeup.set()
+        await self.janitor_task
+        self.janitor_task = None
+        await self.run_io(self.flush_access_times)
+    
+    def read_index_totals(self) -> Tuple[int, int, Dict[tuple, Dict[str, int]]]:
+        """读取索引维护的计数：条目数、总字节数、各语言对计数（阻塞，在I/O线程池中执行）"""
+        return self.index.count(), self.index.total_size(), self.index.totals_by_language()
+    
+    async def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
         try:
-            total_files = len(self.cache_index)
-            total_size = 0
+            # 直接读取索引维护的计数，O(1)，不扫描索引表和缓存文件
+            total_files, total_size, language_totals = await self.run_io(self.read_index_totals)
             language_pairs = {}
-
-            for cache_info in self.cache_index.values():
-                file_path = cache_info["file_path"]
-                if os.path.exists(file_path):
-                    total_size += os.path.getsize(file_path)
-
-                    # 统计语言对
-                    source_lang = cache_info.get("source_lang", "unknown")
-                    target_lang = cache_info.get("target_lang", "unknown")
+            language_sizes = {}
+            for (source_lang, target_lang), totals in language_totals.items():
+                try:
                     lang_pair = self.get_language_pair_name(source_lang, target_lang)
-                    language_pairs[lang_pair] = language_pairs.get(lang_pair, 0) + 1
+                except ValueError:
+                    lang_pair = "unknown"  # 迁移自旧版索引、没有语言信息的条目
+                language_pairs[lang_pair] = language_pairs.get(lang_pair, 0) + totals["entries"]
+                language_sizes[lang_pair] = language_sizes.get(lang_pair, 0) + totals["bytes"]
 
             return {
                 "status": "active",
                 "total_files": total_files,
                 "total_size_mb": round(total_size / 1024 / 1024, 2),
+                "usage_percent": round(total_size / self.max_size_bytes * 100, 2) if self.max_size_bytes else None,
                 "cache_dir": self.cache_dir,
                 "config": {
                     "ttl_days": self.cache_ttl_days,
+                    "soft_ttl_days": self.soft_ttl_days,
                     "max_size_mb": self.max_size_mb,
                     "cleanup_interval_hours": self.cleanup_interval_hours,
                     "config_source": ".env文件"
@@ -289,7 +947,11 @@ class FileCacheService:
                 "source_language": "chinese (zh)",
                 "supported_target_languages": len(self.target_languages),
                 "language_directories": language_pairs,
-                "target_languages": self.target_languages
+                "language_size_mb": {
+                    lang_pair: round(size / 1024 / 1024, 2) for lang_pair, size in language_sizes.items()
+                },
+                "target_languages": self.target_languages,
+                "janitor": {"running": self.janitor_running, **self.eviction_metrics}
             }
         except Exception as e:
             return {
@@ -298,5 +960,8 @@ class FileCacheService:
             }
 
 
-# 创建全局实例
-file_cache_service = FileCacheService()
+# 全局实例 - 首次使用时创建
+@lru_cache()
+def get_file_cache_service() -> FileCacheService:
+    """获取文件缓存服务单例"""
+    return FileCacheService()
@@ -0,0 +1,121 @@
+"""
+文件缓存编码服务 - 缓存文件压缩格式（zstd / gzip），带格式头，兼容未压缩的旧缓存文件
+"""
+
+import gzip
+import os
+import threading
+from functools import lru_cache
+from typing import BinaryIO
+from app.config.config import get_settings
+
+# zstandard 为可选依赖，未安装时回退到gzip
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class FileCodecService:
+    """
+    文件缓存编码服务类
+
+    文件格式: 魔数(4字节) + 编码(1字节) + 数据；没有魔数的文件为旧格式，按未压缩数据读取
+    """
+
+    def __init__(self):
+        """初始化文件缓存编码服务"""
+        self.settings = get_settings()
+
+        self.magic = b"TCF1"
+        self.codec_ids = {"none": 0, "gzip": 1, "zstd": 2}
+        self.codec_names = {codec_id: name for name, codec_id in self.codec_ids.items()}
+        self.read_chunk_size = 64 * 1024  # 流式解压每次读取的字节数
+        self.min_size = 1024  # 小于该字节数的数据不压缩
+
+        self.codec = self.resolve_codec(self.settings.file_cache_codec)
+        self.level = self.settings.file_cache_compression_level
+
+        print(f"🗜️ 文件缓存编码服务初始化完成")
+        print(f"  编码: {self.codec} (配置: {self.settings.file_cache_codec})")
+        print(f"  压缩级别: {self.level}")
+
+    def resolve_codec(self, codec: str) -> str:
+        """解析配置的编码，zstandard未安装时回退到gzip"""
+        codec = codec.lower()
+        if codec == "zstd" and zstandard is None:
+            return "gzip"
+        return codec if codec in self.codec_ids else "none"
+
+    def encode(self, data: bytes) -> bytes:
+        """按配置的编码压缩数据并加上格式头"""
+        codec = self.codec if len(data) >= self.min_size else "none"
+        if codec == "zstd":
+            data = zstandard.ZstdCompressor(level=self.level).compress(data)
+        elif codec == "gzip":
+            data = gzip.compress(data, compresslevel=min(max(self.level, 1), 9))
+        return self.magic + bytes([self.codec_ids[codec]]) + data
+
+    def read_stream(self, stream: BinaryIO) -> bytes:
+        """
+        从文件流读取并流式解压，压缩数据不整体读入内存
+
+        没有格式头的旧缓存文件原样返回
+        """
+        header = stream.read(len(self.magic) + 1)
+        if len(header) < len(self.magic) + 1 or header[:len(self.magic)] != self.magic:
+            return header + stream.read()
+
+        codec = self.codec_names.get(header[-1])
+        if codec == "none":
+            return stream.read()
+        if codec == "gzip":
+            reader = gzip.GzipFile(fileobj=stream, mode='rb')
+        elif codec == "zstd":
+            if zstandard is None:
+                raise ValueError("缓存文件为zstd格式，但未安装zstandard")
+            reader = zstandard.ZstdDecompressor().stream_reader(stream)
+        else:
+            raise ValueError(f"未知的缓存文件编码: {header[-1]}")
+
+        chunks = bytearray()
+        with reader:
+            while True:
+                chunk = reader.read(self.read_chunk_size)
+                if not chunk:
+                    break
+                chunks += chunk
+        return bytes(chunks)
+
+    def read_file(self, file_path: str) -> bytes:
+        """读取并解码缓存文件"""
+        with open(file_path, 'rb') as f:
+            return self.read_stream(f)
+
+    def write_atomic(self, file_path: str, data: bytes) -> int:
+        """
+        原子写入文件 - 先写同目录下的临时文件再替换，返回写入的字节数
+
+        其他进程或线程只会读到完整的旧文件或新文件；临时文件名按进程和线程区分，并发写入互不覆盖
+        """
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return len(data)
+
+    def write_file(self, file_path: str, data: bytes) -> int:
+        """编码并原子写入缓存文件，返回写入的字节数"""
+        return self.write_atomic(file_path, self.encode(data))
+
+
+# 全局实例 - 首次使用时创建
+@lru_cache()
+def get_file_codec_service() -> FileCodecService:
+    """获取文件缓存编码服务单例"""
+    return FileCodecService()
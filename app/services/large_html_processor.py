@@ -6,7 +6,7 @@ import re
 import asyncio
 import time
 import gc
-from typing import Dict, List, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 from bs4 import BeautifulSoup, NavigableString, Tag
 
 
@@ -69,91 +69,129 @@ class LargeHtmlProcessor:
         print(f"📦 HTML分割完成: {len(chunks)} 个块")
         return chunks
     
-    async def process_large_html_with_ultimate_dom(self, html_content: str, dom_service, translation_service, from_lang: str, to_lang: str) -> Tuple[str, Dict]:
+    async def process_large_html_with_ultimate_dom(self, html_content: str, dom_service, translation_service, from_lang: str, to_lang: str,
+                                                   progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                                                   known_translations: Optional[Dict[str, str]] = None,
+                                                   block_cache=None) -> Tuple[str, Dict]:
         """
         使用DOM服务的终极方法处理大型HTML - 100%提取和100%替换
+
+        统计信息中的translation_map为本次使用的片段映射表，供缓存增量翻译使用
         """
-        start_time = time.time()
-        
-        print("🚀 启动大型HTML终极DOM处理模式 - 100%提取和100%替换...")
-        
-        # 1. 估算处理时间
-        estimation = self.estimate_processing_time(len(html_content))
-        print("📊 大型HTML终极DOM处理估算:")
-        for key, value in estimation.items():
-            print(f"  {key}: {value}")
-        
-        # 2. 分割HTML为可处理的块
+        stats = {}
+        translated_chunks = []
+        async for translated_chunk in self.iter_translated_chunks(
+            html_content, dom_service, translation_service, from_lang, to_lang, stats, progress_callback, known_translations,
+            block_cache
+        ):
+            translated_chunks.append(translated_chunk)
+
+        # 合并所有块
+        final_html = "".join(translated_chunks)
+        return final_html, stats
+
+    def extract_chunks(self, html_content: str, dom_service, keep_dom: bool = False) -> Tuple[List[Dict], List[str]]:
+        """
+        分割HTML并对每个块使用DOM服务进行100%提取
+
+        Args:
+            keep_dom: 保留每个块的DOM提取结果，替换阶段不再重新解析（多语言共享提取计划时使用）
+
+        Returns:
+            (块列表, 全部中文片段)
+        """
+        # 分割HTML为可处理的块
         chunks = self.split_html_into_chunks(html_content)
         
-        # 3. 对每个块使用DOM服务进行100%提取
+        # 对每个块使用DOM服务进行100%提取
         print("🔍 使用DOM服务进行100%提取...")
-        all_dom_data = []
         all_chinese_texts = []
         
         for i, chunk in enumerate(chunks):
             print(f"  处理块 {i+1}/{len(chunks)}...")
-            
-            # 使用DOM服务提取中文文本
-            dom_data = dom_service.extract_all_chinese_with_dom(chunk["content"])
-            
-            # 添加块信息
-            dom_data["chunk_index"] = i
-            dom_data["chunk_start_pos"] = chunk["start_pos"]
-            dom_data["chunk_end_pos"] = chunk["end_pos"]
-            
-            all_dom_data.append(dom_data)
-            all_chinese_texts.extend(dom_data["chinese_texts"])
+            all_chinese_texts.extend(self.extract_chunk(chunk, dom_service, keep_dom))
             
             # 定期清理内存
             if (i + 1) % 3 == 0:
                 gc.collect()
         
         print(f"✅ DOM提取完成: {len(all_chinese_texts)} 个中文片段")
-        
-        # 4. 高速并发翻译所有中文文本
-        print("⚡ 开始高速并发翻译...")
-        
-        translation_results = await translation_service.concurrent_batch_translate(
-            all_chinese_texts,
-            from_lang,
-            to_lang,
-            max_concurrent=15  # 大型HTML使用更高并发
-        )
-        
-        # 5. 创建翻译映射表
-        print("📋 创建翻译映射表...")
-        translation_map = dom_service.create_translation_map(translation_results)
-        
-        # 6. 对每个块使用DOM服务进行100%替换
+        return chunks, all_chinese_texts
+    
+    def extract_chunk(self, chunk: Dict, dom_service, keep_dom: bool = False, soup: Optional[BeautifulSoup] = None) -> List[str]:
+        """使用DOM服务提取单个块的中文文本，记录在块的chinese_texts中"""
+        dom_data = dom_service.extract_all_chinese_with_dom(chunk["content"], soup=soup)
+        chunk["chinese_texts"] = dom_data["chinese_texts"]
+        if keep_dom:
+            chunk["dom_data"] = dom_data
+        return dom_data["chinese_texts"]
+    
+    def iter_replaced_chunks(self, chunks: List[Dict], dom_service, translation_map: Dict[str, str], remaining_chinese: List[str]) -> Iterator[str]:
+        """
+        对每个块使用DOM服务进行100%替换，替换完成即产出
+
+        Args:
+            remaining_chinese: 调用方传入的列表，收集替换后剩余的中文
+        """
         print("🔄 使用DOM服务进行100%替换...")
-        translated_chunks = []
         
-        for i, (chunk, dom_data) in enumerate(zip(chunks, all_dom_data)):
+        for i, chunk in enumerate(chunks):
             print(f"  替换块 {i+1}/{len(chunks)}...")
-            
-            # 使用DOM服务的终极替换方法
-            translated_chunk, chunk_stats = dom_service.ultimate_replace_chinese(
-                chunk["content"],
-                translation_map
-            )
-            
-            translated_chunks.append(translated_chunk)
+            yield self.replace_chunk(chunk, dom_service, translation_map, remaining_chinese)
             
             # 定期清理内存
             if (i + 1) % 3 == 0:
                 gc.collect()
-        
-        # 7. 合并所有块
-        final_html = "".join(translated_chunks)
-        
-        # 8. 最终统计
+    
+    def replace_chunk(self, chunk: Dict, dom_service, translation_map: Dict[str, str], remaining_chinese: List[str],
+                      block_cache=None) -> str:
+        """
+        使用DOM服务的终极替换方法替换单个块，剩余的中文收集到remaining_chinese
+
+        块有区块计划时换回缓存区块的译文，新区块的译文记录在块的new_blocks中
+        """
+        translated_chunk, chunk_stats = dom_service.ultimate_replace_chinese(
+            chunk["content"],
+            translation_map,
+            dom_data=chunk.get("dom_data")
+        )
+        if block_cache is not None and "block_plan" in chunk:
+            translated_chunk, chunk["new_blocks"] = block_cache.finalize(translated_chunk, chunk["block_plan"])
+        remaining_chinese.extend(re.findall(r'[\u4e00-\u9fff]+', translated_chunk))
+        return translated_chunk
+    
+    async def start_chunk_translation(self, chunk: Dict, dom_service, claimed_texts: set, translation_service, from_lang: str, to_lang: str,
+                                      known_translations: Optional[Dict[str, str]], block_cache=None) -> asyncio.Task:
+        """
+        提取一个块的中文，并在后台翻译其中前面的块尚未翻译的片段
+
+        Args:
+            claimed_texts: 已由前面的块翻译的片段，本块的新片段会加入其中
+            block_cache: 区块缓存服务，传入时块内命中缓存的区块不再提取和翻译，块的DOM保留到替换阶段
+        """
+        if block_cache is not None:
+            soup = BeautifulSoup(chunk["content"], 'html.parser')
+            chunk["block_plan"] = await block_cache.prepare(soup, from_lang, to_lang)
+            chunk_texts = self.extract_chunk(chunk, dom_service, keep_dom=True, soup=soup)
+        else:
+            chunk_texts = self.extract_chunk(chunk, dom_service)
+        texts = [text for text in dict.fromkeys(chunk_texts) if text not in claimed_texts]
+        claimed_texts.update(texts)
+        return asyncio.create_task(translation_service.concurrent_batch_translate(
+            texts,
+            from_lang,
+            to_lang,
+            max_concurrent=15,  # 大型HTML使用更高并发
+            known_translations=known_translations
+        ))
+    
+    def build_statistics(self, html_content: str, chunks: List[Dict], all_chinese_texts: List[str], translation_results: Dict, remaining_chinese: List[str], start_time: float) -> Dict:
+        """生成大型HTML处理的最终统计"""
         end_time = time.time()
         processing_time = round(end_time - start_time, 2)
         
         # 计算最终替换率
         original_chinese = re.findall(r'[\u4e00-\u9fff]+', html_content)
-        remaining_chinese = re.findall(r'[\u4e00-\u9fff]+', final_html)
         
         stats = {
             "processing_time": processing_time,
@@ -163,21 +201,105 @@ class LargeHtmlProcessor:
             "unique_texts": len(set(all_chinese_texts)),
             "translation_success": translation_results["success_count"],
             "translation_failed": translation_results["failed_count"],
+            "translation_reused": translation_results.get("reused_count", 0),
             "translation_duration": translation_results["duration"],
             "original_chinese_count": len(original_chinese),
             "remaining_chinese_count": len(remaining_chinese),
             "replaced_count": len(original_chinese) - len(remaining_chinese),
             "replacement_rate": (len(original_chinese) - len(remaining_chinese)) / len(original_chinese) * 100 if original_chinese else 100,
-            "memory_peak_mb": estimation["memory_usage_mb"],
+            "memory_peak_mb": self.estimate_processing_time(len(html_content))["memory_usage_mb"],
             "remaining_texts": list(set(remaining_chinese))[:10]
         }
         
         print(f"🎉 大型HTML终极DOM处理完成! 耗时: {processing_time}秒")
         print(f"🎯 终极替换率: {stats['replacement_rate']:.2f}%")
         print(f"⚡ 翻译耗时: {stats['translation_duration']}秒")
-        print(f"🚀 翻译速度: {stats['unique_texts']/stats['translation_duration']:.1f} 文本/秒")
+        if stats['translation_duration'] > 0:
+            print(f"🚀 翻译速度: {stats['unique_texts']/stats['translation_duration']:.1f} 文本/秒")
         
-        return final_html, stats
+        return stats
+    
+    async def iter_translated_chunks(self, html_content: str, dom_service, translation_service, from_lang: str, to_lang: str, stats: Dict,
+                                     progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                                     known_translations: Optional[Dict[str, str]] = None,
+                                     block_cache=None) -> AsyncIterator[str]:
+        """
+        流式处理大型HTML - 逐块翻译和替换，每个块只等待它自己的片段翻译完成就立即产出
+
+        翻译当前块时下一个块的新片段已在后台翻译，前面的块翻译过的片段不再重复翻译
+
+        Args:
+            stats: 调用方传入的字典，迭代结束后填充最终统计信息和translation_map
+            progress_callback: 进度回调 (进度百分比, 阶段)
+            known_translations: 已知译文，命中的片段不再调用翻译API
+            block_cache: 区块缓存服务，传入时逐块换回缓存区块并保存完整翻译的新区块
+        """
+        start_time = time.time()
+        
+        print("🚀 启动大型HTML终极DOM处理模式 - 100%提取和100%替换...")
+        
+        # 1. 估算处理时间
+        estimation = self.estimate_processing_time(len(html_content))
+        print("📊 大型HTML终极DOM处理估算:")
+        for key, value in estimation.items():
+            print(f"  {key}: {value}")
+        
+        # 2. 分割HTML，各块在开始翻译前才提取中文
+        chunks = self.split_html_into_chunks(html_content)
+        
+        # 3. 逐块提取、翻译、替换并产出，下一个块的翻译与当前块并行
+        print("⚡ 开始逐块高速并发翻译...")
+        translation_results = {"success_count": 0, "failed_count": 0, "reused_count": 0, "duration": 0}
+        translation_map = {}
+        remaining_chinese = []
+        block_stats = {}
+        claimed_texts = set()
+        pending = [await self.start_chunk_translation(
+            chunks[0], dom_service, claimed_texts, translation_service, from_lang, to_lang, known_translations, block_cache
+        )]
+        if progress_callback:
+            await progress_callback(20, "extracted")
+        try:
+            for i, chunk in enumerate(chunks):
+                if i + 1 < len(chunks):
+                    pending.append(await self.start_chunk_translation(
+                        chunks[i + 1], dom_service, claimed_texts, translation_service, from_lang, to_lang, known_translations,
+                        block_cache
+                    ))
+                chunk_results = await pending.pop(0)
+                
+                # 合并本块的翻译结果和映射表
+                for key in ("success_count", "failed_count", "reused_count", "duration"):
+                    translation_results[key] += chunk_results.get(key, 0)
+                translation_map.update(dom_service.create_translation_map(chunk_results))
+                
+                print(f"  替换块 {i+1}/{len(chunks)}...")
+                translated_chunk = self.replace_chunk(chunk, dom_service, translation_map, remaining_chinese, block_cache)
+                chunk.pop("dom_data", None)
+                if block_cache is not None:
+                    stored_count = await block_cache.save_blocks(chunk.pop("new_blocks", {}))
+                    for key, value in block_cache.get_statistics(chunk.pop("block_plan"), stored_count).items():
+                        block_stats[key] = block_stats.get(key, 0) + value
+                yield translated_chunk
+                if progress_callback:
+                    await progress_callback(20 + 75 * (i + 1) // len(chunks), "translating")
+                
+                # 定期清理内存
+                if (i + 1) % 3 == 0:
+                    gc.collect()
+        finally:
+            # 客户端提前断开或出错时取消后台翻译
+            for task in pending:
+                task.cancel()
+        
+        # 4. 最终统计
+        all_chinese_texts = [text for chunk in chunks for text in chunk["chinese_texts"]]
+        translation_results["duration"] = round(translation_results["duration"], 2)
+        stats.update(self.build_statistics(
+            html_content, chunks, all_chinese_texts, translation_results, remaining_chinese, start_time
+        ))
+        stats.update(block_stats)
+        stats["translation_map"] = translation_map
 
 
 # 创建全局实例
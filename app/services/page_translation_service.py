@@ -0,0 +1,1099 @@
+"""
+页面翻译服务 - 单页与批量翻译流程、缓存读写
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.models.translation_models import TranslationRequest, MultiTargetTranslationRequest
+from bs4 import BeautifulSoup
+from app.services.baidu_translation_service import baidu_translation_service
+from app.services.block_cache_service import block_cache_service
+from app.services.cache_writer_service import cache_writer_service
+from app.services.dom_replacement_service import dom_replacement_service
+from app.services.large_html_processor import large_html_processor
+from app.services.file_cache_service import get_file_cache_service
+from app.services.redis_path_cache_service import redis_path_cache_service
+from app.services.payload_profile_service import payload_profile_service
+from app.services.serializer_service import serializer_service
+from app.services.singleflight_service import singleflight_service
+from app.services.skeleton_service import skeleton_service
+
+
+class PageTranslationService:
+    """页面翻译服务类"""
+
+    def __init__(self):
+        """初始化页面翻译服务"""
+        self.large_html_threshold = 100000  # 大型HTML阈值（字符数）
+        self.max_concurrent = 15  # 百度翻译并发数
+        self.fanout_max_concurrent = 60  # 多目标语言翻译时所有语言共享的并发总数
+        self.refresh_tasks: Dict[str, asyncio.Task] = {}  # 软过期缓存的后台刷新任务，按缓存键去重
+
+    def get_cache_service(self, use_file_cache: bool):
+        """根据cache参数选择缓存服务：true=文件缓存，false=Redis缓存"""
+        return get_file_cache_service() if use_file_cache else redis_path_cache_service
+
+    def is_large_html(self, html_body: str) -> bool:
+        """检测是否为大型HTML（超过10万字符）"""
+        return len(html_body) > self.large_html_threshold
+
+    def build_request_info(self, request: TranslationRequest, processing_mode: str) -> Dict:
+        """构建缓存和响应中的请求信息"""
+        return {
+            "path": request.path,
+            "html_length": len(request.html_body),
+            "source_language": request.source_language,
+            "target_language": request.target_language,
+            "processing_mode": processing_mode,
+            "untranslatable_tags": request.untranslatable_tags,
+            "no_translate_tags": request.no_translate_tags,
+            "cache_strategy": "file_cache" if request.cache else "redis_cache"
+        }
+
+    def get_translated_html(self, translation_data: Dict) -> str:
+        """从翻译结果（含缓存结果）中取出译文HTML"""
+        for section in ("large_html_results", "ultimate_replacement_results"):
+            if section in translation_data:
+                return translation_data[section].get("translated_html_body", "")
+        return ""
+
+    def compute_fingerprint(self, html_body: str) -> str:
+        """计算页面内容指纹"""
+        return hashlib.md5(html_body.encode('utf-8')).hexdigest()
+
+    def build_cache_info(self, request: TranslationRequest, translation_map: Dict[str, str]) -> Dict:
+        """
+        构建缓存校验信息：内容指纹和片段映射表，页面变化时用于增量翻译
+
+        缓存后端按内容指纹单独保存片段映射表，缓存条目中不含映射表
+        """
+        return {
+            "content_fingerprint": self.compute_fingerprint(request.html_body),
+            "translation_map": translation_map
+        }
+
+    def is_cache_fresh(self, cached_result: Dict, html_body: str) -> bool:
+        """缓存内容指纹与当前页面一致 - 没有指纹的旧缓存条目视为一致"""
+        cache_info = cached_result.get("cache_info")
+        if not cache_info or "content_fingerprint" not in cache_info:
+            return True
+        return cache_info["content_fingerprint"] == self.compute_fingerprint(html_body)
+
+    async def get_known_translations(self, request: TranslationRequest, cached_result: Dict) -> Dict[str, str]:
+        """取出缓存条目对应的片段映射表 - 只在页面变化需要增量翻译时按内容指纹读取"""
+        cache_info = cached_result.get("cache_info") or {}
+        if "translation_map" in cache_info:
+            # 写入队列中尚未写入的条目、映射表单独保存之前的旧缓存条目
+            return cache_info["translation_map"] or {}
+        if not cache_info.get("content_fingerprint"):
+            return {}
+        translation_map = await self.get_cache_service(request.cache).get_translation_map(
+            cache_info["content_fingerprint"], request.source_language, request.target_language
+        )
+        return translation_map or {}
+
+    def build_large_translation_data(self, request: TranslationRequest, translated_html_body: str, large_stats: Dict) -> Dict:
+        """构建大型HTML的翻译结果 - large_stats中的translation_map移入cache_info"""
+        large_stats = dict(large_stats)
+        translation_map = large_stats.pop("translation_map", {})
+        return {
+            "request_info": self.build_request_info(request, "large_html"),
+            "cache_info": self.build_cache_info(request, translation_map),
+            "large_html_results": {
+                "translated_html_body": translated_html_body,
+                "processing_statistics": large_stats
+            }
+        }
+
+    def build_standard_translation_data(self, request: TranslationRequest, dom_statistics: Dict, translation_results: Dict,
+                                        translated_html_body: str, ultimate_stats: Dict, translation_map: Dict[str, str]) -> Dict:
+        """构建标准HTML的翻译结果"""
+        return {
+            "request_info": self.build_request_info(request, "standard"),
+            "cache_info": self.build_cache_info(request, translation_map),
+            "dom_extraction_results": dom_statistics,
+            "translation_results": translation_results,
+            "ultimate_replacement_results": {
+                "original_html_body": request.html_body,
+                "translated_html_body": translated_html_body,
+                "replacement_statistics": ultimate_stats,
+                "translation_map": translation_map
+            }
+        }
+
+    async def translate_with_cache(self, request: TranslationRequest,
+                                   progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None) -> Dict:
+        """
+        单页翻译完整流程：检查缓存 → 翻译 → 保存缓存 → 按配置档生成响应数据
+
+        缓存软过期后仍直接返回旧译文，同时在后台刷新；超过硬过期（TTL）的条目已不存在，同步翻译
+
+        Returns:
+            {"message": 处理消息, "data": 响应数据, "cache_hit": 是否命中缓存,
+             "cache_status": hit / stale / miss, "etag": 缓存内容校验值, "last_modified": 缓存写入时间}
+        """
+        # 1. 根据cache参数检查缓存
+        cache_entry = await self.get_cached_entry(request)
+        cached_result = cache_entry["content"] if cache_entry else None
+
+        # 如果找到缓存且页面内容未变化，直接返回；已软过期的条目同时安排后台刷新
+        if cached_result and self.is_cache_fresh(cached_result, request.html_body):
+            cache_status = self.get_cache_status(request, cache_entry)
+            message = f"🎉 使用{'文件' if request.cache else 'Redis'}缓存结果！"
+            if cache_status == "stale":
+                self.schedule_refresh(request)
+                message += "（缓存已过期，后台刷新中）"
+            print("🎉 使用缓存结果，跳过翻译！")
+            debug_artifacts = await self.get_cached_debug_artifacts(request)
+            return {
+                "message": message,
+                "data": payload_profile_service.apply_profile(cached_result, request.profile, debug_artifacts),
+                "cache_hit": True,
+                "cache_status": cache_status,
+                **self.get_entry_validators(cache_entry)
+            }
+
+        # 其他路径已有相同内容的译文：直接复用，只为当前路径写入指针
+        shared_result = await self.get_shared_result(request)
+        if shared_result:
+            print("🎉 使用相同内容的共享译文，跳过翻译！")
+            _, _, validators = await self.save_cached_result(request, shared_result, pointer_only=True)
+            return {
+                "message": f"🎉 使用{'文件' if request.cache else 'Redis'}缓存中相同内容的译文！",
+                "data": payload_profile_service.apply_profile(shared_result, request.profile),
+                "cache_hit": True,
+                "cache_status": "hit",
+                **validators
+            }
+
+        # 页面内容已变化：复用缓存中的片段译文，只翻译新增片段
+        known_translations = None
+        if cached_result:
+            known_translations = await self.get_known_translations(request, cached_result)
+            print(f"♻️ 页面内容已变化，增量翻译 (可复用片段: {len(known_translations)})")
+
+        # 2. 相同页面的并发请求只翻译一次：进程内共用一个任务，跨worker由Redis锁协调
+        flight_key = self.get_flight_key(request)
+        outcome = await singleflight_service.do(
+            flight_key,
+            lambda: singleflight_service.run_once(
+                flight_key,
+                lambda: self.translate_and_save(request, progress_callback, known_translations),
+                lambda: self.load_fresh_outcome(request),
+                persisted=lambda: self.wait_persisted(request)
+            )
+        )
+
+        return {
+            "message": outcome["message"],
+            "data": payload_profile_service.apply_profile(outcome["core_data"], request.profile, outcome["debug_artifacts"]),
+            "cache_hit": outcome["cache_status"] != "miss",
+            "cache_status": outcome["cache_status"],
+            **outcome["validators"]
+        }
+
+    def get_flight_key(self, request: TranslationRequest) -> str:
+        """请求合并键 - 缓存后端 + 路径 + 语言对 + 内容指纹"""
+        normalized_path = self.get_cache_service(request.cache).normalize_path(request.path)
+        return "{}:{}|{}|{}:{}".format(
+            "file" if request.cache else "redis",
+            normalized_path,
+            request.source_language,
+            request.target_language,
+            self.compute_fingerprint(request.html_body)
+        )
+
+    async def translate_and_save(self, request: TranslationRequest,
+                                 progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                                 known_translations: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        翻译页面并保存缓存
+
+        Returns:
+            {"message", "core_data", "debug_artifacts", "validators", "cache_status"}
+        """
+        # 按HTML大小选择处理模式
+        translation_data = await self.translate_page(request, progress_callback, known_translations)
+        if "large_html_results" in translation_data:
+            large_stats = translation_data["large_html_results"]["processing_statistics"]
+            message = f"🎉 大型HTML翻译完成！耗时: {large_stats['processing_time']}秒，替换率: {large_stats['replacement_rate']:.2f}%"
+        else:
+            ultimate_stats = translation_data["ultimate_replacement_results"]["replacement_statistics"]
+            message = f"🎉 终极翻译完成！替换率: {ultimate_stats['replacement_rate']:.2f}%"
+        if known_translations is not None:
+            message += "（增量翻译）"
+
+        # 保存翻译结果到缓存
+        if progress_callback:
+            await progress_callback(98, "saving")
+        core_data, debug_artifacts, validators = await self.save_cached_result(request, translation_data)
+
+        return {
+            "message": message,
+            "core_data": core_data,
+            "debug_artifacts": debug_artifacts,
+            "validators": validators,
+            "cache_status": "miss"
+        }
+
+    async def translate_and_stream(self, request: TranslationRequest, chunk_queue: asyncio.Queue,
+                                   known_translations: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        大型HTML逐块翻译并保存缓存 - 每个块完成即放入chunk_queue，全部放入后放入None
+
+        Returns:
+            与translate_and_save格式相同
+        """
+        large_stats = {}
+        translated_chunks = []
+        async for translated_chunk in large_html_processor.iter_translated_chunks(
+            request.html_body,
+            dom_replacement_service,
+            baidu_translation_service,
+            request.source_language,
+            request.target_language,
+            large_stats,
+            known_translations=known_translations,
+            block_cache=block_cache_service
+        ):
+            translated_chunks.append(translated_chunk)
+            chunk_queue.put_nowait(translated_chunk)
+        chunk_queue.put_nowait(None)
+
+        translation_data = self.build_large_translation_data(request, "".join(translated_chunks), large_stats)
+        core_data, debug_artifacts, validators = await self.save_cached_result(request, translation_data)
+        message = f"🎉 大型HTML流式翻译完成！耗时: {large_stats['processing_time']}秒"
+        if known_translations is not None:
+            message += "（增量翻译）"
+        return {
+            "message": message,
+            "core_data": core_data,
+            "debug_artifacts": debug_artifacts,
+            "validators": validators,
+            "cache_status": "miss"
+        }
+
+    async def stream_with_cache(self, request: TranslationRequest,
+                                known_translations: Optional[Dict[str, str]] = None) -> AsyncIterator[str]:
+        """
+        缓存未命中时流式翻译 - 与translate_with_cache共用请求合并键，相同页面的并发请求只翻译一次
+
+        由当前请求翻译的大型HTML每个块完成即写出；标准HTML、合并到其他请求或读取其他worker的结果时整页写出。
+        翻译任务不随客户端断开而取消，合并到该任务的请求仍能拿到结果
+        """
+        chunk_queue = asyncio.Queue()
+        if self.is_large_html(request.html_body):
+            translate = lambda: self.translate_and_stream(request, chunk_queue, known_translations)
+        else:
+            translate = lambda: self.translate_and_save(request, None, known_translations)
+
+        flight_key = self.get_flight_key(request)
+        flight = asyncio.ensure_future(singleflight_service.do(
+            flight_key,
+            lambda: singleflight_service.run_once(
+                flight_key,
+                translate,
+                lambda: self.load_fresh_outcome(request),
+                persisted=lambda: self.wait_persisted(request)
+            )
+        ))
+
+        streamed = False
+        while not (flight.done() and chunk_queue.empty()):
+            getter = asyncio.ensure_future(chunk_queue.get())
+            await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                continue
+            translated_chunk = getter.result()
+            if translated_chunk is None:
+                break
+            streamed = True
+            yield translated_chunk
+
+        outcome = await flight
+        if not streamed:
+            yield self.get_translated_html(outcome["core_data"])
+
+    async def load_fresh_outcome(self, request: TranslationRequest) -> Optional[Dict]:
+        """读取其他worker刚写入的缓存，内容指纹与当前页面不一致时返回None"""
+        cache_entry = await self.get_cached_entry(request)
+        if not cache_entry or not self.is_cache_fresh(cache_entry["content"], request.html_body):
+            return None
+
+        print("🎉 使用其他worker的翻译结果，跳过翻译！")
+        return {
+            "message": f"🎉 使用{'文件' if request.cache else 'Redis'}缓存结果！",
+            "core_data": cache_entry["content"],
+            "debug_artifacts": await self.get_cached_debug_artifacts(request),
+            "validators": self.get_entry_validators(cache_entry),
+            "cache_status": "hit"
+        }
+
+    def get_cache_status(self, request: TranslationRequest, cache_entry: Dict) -> str:
+        """缓存条目状态：hit=未过期, stale=已软过期"""
+        metadata = cache_entry.get("metadata", {})
+        return "stale" if self.get_cache_service(request.cache).is_soft_expired(metadata) else "hit"
+
+    async def build_cached_batch_item(self, index: int, request: TranslationRequest, cache_entry: Dict) -> Dict:
+        """批量、多目标语言翻译中命中缓存的单条结果 - 已软过期的条目同时安排后台刷新"""
+        cached_result = cache_entry["content"]
+        cache_status = self.get_cache_status(request, cache_entry)
+        message = f"🎉 使用{'文件' if request.cache else 'Redis'}缓存结果！"
+        if cache_status == "stale":
+            self.schedule_refresh(request)
+            message += "（缓存已过期，后台刷新中）"
+        debug_artifacts = await self.get_cached_debug_artifacts(request)
+        return self.build_batch_item(
+            index, request, True, message,
+            cache_hit=True,
+            data=payload_profile_service.apply_profile(cached_result, request.profile, debug_artifacts),
+            cache_status=cache_status
+        )
+
+    def schedule_refresh(self, request: TranslationRequest) -> bool:
+        """
+        安排软过期缓存的后台刷新 - 同一缓存键同时只有一个刷新任务
+
+        Returns:
+            是否新建了刷新任务
+        """
+        refresh_key = "{}:{}".format(
+            "file" if request.cache else "redis",
+            self.get_cache_service(request.cache).generate_cache_key(
+                request.path, request.source_language, request.target_language
+            )
+        )
+        if refresh_key in self.refresh_tasks:
+            print(f"🔄 后台刷新已在进行: {refresh_key}")
+            return False
+
+        task = asyncio.create_task(self.refresh_cached_result(request))
+        self.refresh_tasks[refresh_key] = task
+        task.add_done_callback(lambda _: self.refresh_tasks.pop(refresh_key, None))
+        print(f"🔄 缓存已软过期，安排后台刷新: {refresh_key}")
+        return True
+
+    async def refresh_cached_result(self, request: TranslationRequest):
+        """
+        后台重新翻译页面并覆盖缓存 - 失败时保留旧缓存，直到硬过期；其他worker已在翻译时跳过
+
+        不复用缓存中的片段译文和区块缓存，所有片段重新调用翻译API，译文随翻译结果更新
+        """
+        lock = await singleflight_service.acquire_lock(self.get_flight_key(request))
+        if lock is None:
+            print(f"🔄 其他worker正在翻译，跳过后台刷新: {request.path}")
+            return
+
+        try:
+            translation_data = await self.translate_page(request, use_block_cache=False)
+            await self.save_cached_result(request, translation_data)
+            if await self.wait_persisted(request):
+                print(f"✅ 后台刷新完成: {request.path}")
+            else:
+                print(f"❌ 后台刷新结果未写入缓存: {request.path}")
+        except Exception as e:
+            print(f"❌ 后台刷新失败: {request.path} - {e}")
+        finally:
+            if lock:
+                await singleflight_service.release_lock(lock)
+
+    async def translate_page(self, request: TranslationRequest,
+                             progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                             known_translations: Optional[Dict[str, str]] = None, use_block_cache: bool = True) -> Dict:
+        """
+        翻译单个页面 - 检测是否为大型HTML（超过10万字符）选择处理模式
+
+        Args:
+            known_translations: 已知片段译文（缓存中的片段映射表），命中的片段不再调用翻译API
+            use_block_cache: 是否使用区块缓存，后台刷新时关闭，所有区块重新翻译
+        """
+        if self.is_large_html(request.html_body):
+            return await self.translate_large_html(request, progress_callback, known_translations, use_block_cache)
+        return await self.translate_standard_html(request, progress_callback, known_translations, use_block_cache)
+
+    async def translate_large_html(self, request: TranslationRequest,
+                                   progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                                   known_translations: Optional[Dict[str, str]] = None, use_block_cache: bool = True) -> Dict:
+        """大型HTML处理流程 - 返回可缓存的翻译结果"""
+        print("🔥 检测到大型HTML，启用专用处理模式...")
+
+        # 使用大型HTML终极DOM处理器 - 100%提取和100%替换
+        translated_html_body, large_stats = await large_html_processor.process_large_html_with_ultimate_dom(
+            request.html_body,
+            dom_replacement_service,  # 传入DOM服务
+            baidu_translation_service,
+            request.source_language,
+            request.target_language,
+            progress_callback=progress_callback,
+            known_translations=known_translations,
+            block_cache=block_cache_service if use_block_cache else None
+        )
+
+        # 打印大型HTML终极DOM处理统计
+        print("-" * 40)
+        print("🎉 大型HTML终极DOM处理结果:")
+        print(f"  处理模式: {large_stats['processing_mode']}")
+        print(f"  总耗时: {large_stats['processing_time']}秒")
+        print(f"  翻译耗时: {large_stats['translation_duration']}秒")
+        print(f"  翻译速度: {large_stats['unique_texts']/large_stats['translation_duration']:.1f} 文本/秒")
+        print(f"  处理块数: {large_stats['chunks_processed']}")
+        print(f"  文本总数: {large_stats['total_texts']}")
+        print(f"  唯一文本: {large_stats['unique_texts']}")
+        print(f"  翻译成功: {large_stats['translation_success']}")
+        print(f"  翻译失败: {large_stats['translation_failed']}")
+        print(f"  终极替换率: {large_stats['replacement_rate']:.2f}%")
+        print(f"  内存峰值: {large_stats['memory_peak_mb']}MB")
+        if large_stats['remaining_texts']:
+            print(f"  剩余文本: {large_stats['remaining_texts'][:3]}")
+        print("=" * 80)
+
+        return self.build_large_translation_data(request, translated_html_body, large_stats)
+
+    async def translate_standard_html(self, request: TranslationRequest,
+                                      progress_callback: Optional[Callable[[int, str], Awaitable[None]]] = None,
+                                      known_translations: Optional[Dict[str, str]] = None, use_block_cache: bool = True) -> Dict:
+        """标准HTML处理流程 - 返回可缓存的翻译结果"""
+        print("📝 标准HTML大小，使用常规处理模式...")
+
+        # 4. 使用DOM解析提取中文文本
+        print("-" * 40)
+        print("🔍 使用DOM解析提取中文文本...")
+
+        # 命中区块缓存的页头、导航、页脚等区块不再提取和翻译
+        soup = BeautifulSoup(request.html_body, 'html.parser')
+        if use_block_cache:
+            block_plan = await block_cache_service.prepare(soup, request.source_language, request.target_language)
+        else:
+            block_plan = block_cache_service.empty_plan()
+        dom_data = dom_replacement_service.extract_all_chinese_with_dom(request.html_body, soup=soup)
+
+        # 5. 打印DOM提取结果
+        print("✅ DOM提取完成！")
+        print(f"📊 文本节点数量: {dom_data['statistics']['total_text_nodes']}")
+        print(f"📝 中文文本片段数量: {dom_data['statistics']['total_chinese_segments']}")
+        print(f"🔤 唯一中文文本数量: {dom_data['statistics']['unique_chinese_texts']}")
+        if progress_callback:
+            await progress_callback(20, "extracted")
+
+        # 6. 高速并发翻译所有中文文本
+        print("-" * 40)
+        print("⚡ 开始高速并发翻译...")
+
+        all_chinese_texts = dom_data['chinese_texts']
+        print(f"📊 需要翻译的文本数量: {len(all_chinese_texts)}")
+
+        # 使用高速并发翻译
+        translation_results = await baidu_translation_service.concurrent_batch_translate(
+            all_chinese_texts,
+            request.source_language,
+            request.target_language,
+            max_concurrent=self.max_concurrent,  # 并发数，可以根据需要调整
+            known_translations=known_translations
+        )
+
+        # 7. 创建翻译映射表
+        print("-" * 40)
+        print("📋 创建翻译映射表...")
+        translation_map = dom_replacement_service.create_translation_map(translation_results)
+        if progress_callback:
+            await progress_callback(60, "translated")
+
+        # 8. 使用终极替换方案
+        print("-" * 40)
+        print("🚀 启动终极替换方案...")
+
+        translated_html_body, ultimate_stats = dom_replacement_service.ultimate_replace_chinese(
+            request.html_body,
+            translation_map,
+            dom_data=dom_data  # 复用提取阶段的DOM，无需重新解析
+        )
+
+        # 换回缓存区块的译文，保存完整翻译的新区块，并把缓存区块计入替换统计
+        translated_html_body, new_blocks = block_cache_service.finalize(translated_html_body, block_plan)
+        stored_count = await block_cache_service.save_blocks(new_blocks)
+        self.count_block_statistics(ultimate_stats, translated_html_body, block_plan, stored_count)
+
+        # 9. 打印最终统计
+        print("-" * 40)
+        print("🎉 高速翻译结果统计:")
+        print(f"  翻译耗时: {translation_results['duration']}秒")
+        if translation_results['duration'] > 0:
+            print(f"  翻译速度: {translation_results['unique_count']/translation_results['duration']:.1f} 文本/秒")
+        if translation_results.get('reused_count'):
+            print(f"  复用缓存片段: {translation_results['reused_count']}")
+        print(f"  翻译成功: {translation_results['success_count']}/{translation_results['unique_count']}")
+        print(f"  原始中文字符数: {ultimate_stats['original_chinese_count']}")
+        print(f"  剩余中文字符数: {ultimate_stats['remaining_chinese_count']}")
+        print(f"  已替换字符数: {ultimate_stats['replaced_count']}")
+        print(f"  替换率: {ultimate_stats['replacement_rate']:.2f}%")
+
+        if ultimate_stats['remaining_texts']:
+            print(f"  剩余文本: {ultimate_stats['remaining_texts'][:5]}")
+
+        print("=" * 80)
+
+        return self.build_standard_translation_data(
+            request, dom_data['statistics'], translation_results,
+            translated_html_body, ultimate_stats, translation_map
+        )
+
+    async def get_cached_result(self, request: TranslationRequest) -> Optional[Dict]:
+        """根据cache参数检查缓存，返回缓存内容"""
+        cache_entry = await self.get_cached_entry(request)
+        return cache_entry["content"] if cache_entry else None
+
+    async def get_cached_entry(self, request: TranslationRequest) -> Optional[Dict]:
+        """根据cache参数检查缓存，返回包含metadata和content的缓存条目"""
+        return await self.get_cache_entry(request.path, request.source_language, request.target_language, request.cache)
+
+    async def get_cache_entry(self, path: str, source_language: str, target_language: str,
+                              use_file_cache: bool) -> Optional[Dict]:
+        """查询缓存条目 - 先查写入队列中尚未写入的条目，再查缓存后端"""
+        pending_entry = cache_writer_service.get_pending_entry(use_file_cache, path, source_language, target_language)
+        if pending_entry:
+            print("✅ 写入队列命中（缓存写入中）")
+            return pending_entry
+
+        if use_file_cache:
+            # 使用文件缓存 - 基于路径哈希
+            print("📁 检查文件缓存 (基于路径MD5哈希)...")
+        else:
+            # 使用Redis缓存 - 基于路径哈希
+            print("🔄 检查Redis缓存 (基于路径MD5哈希)...")
+
+        return await self.get_cache_service(use_file_cache).get_cache_entry(path, source_language, target_language)
+
+    async def wait_persisted(self, request: TranslationRequest) -> bool:
+        """等待请求对应的缓存条目写入缓存后端"""
+        return await cache_writer_service.wait_persisted(
+            request.cache, request.path, request.source_language, request.target_language
+        )
+
+    async def get_shared_result(self, request: TranslationRequest) -> Optional[Dict]:
+        """按内容指纹查找其他路径保存的相同内容译文（先查写入队列，再查缓存后端），补上当前请求的request_info"""
+        content_hash = self.compute_fingerprint(request.html_body)
+        shared_content = cache_writer_service.get_pending_content(
+            request.cache, content_hash, request.source_language, request.target_language
+        )
+        if shared_content is not None:
+            print("✅ 写入队列命中相同内容的译文（缓存写入中）")
+        else:
+            shared_content = await self.get_cache_service(request.cache).get_content(
+                content_hash, request.source_language, request.target_language
+            )
+        if shared_content is None:
+            return None
+
+        processing_mode = "large_html" if "large_html_results" in shared_content else "standard"
+        return {"request_info": self.build_request_info(request, processing_mode), **shared_content}
+
+    def get_entry_validators(self, cache_entry: Dict) -> Dict:
+        """取出缓存条目中保存的ETag和Last-Modified - 旧缓存条目没有时按内容计算ETag"""
+        metadata = cache_entry.get("metadata", {})
+        return {
+            "etag": metadata.get("etag") or serializer_service.build_validators(cache_entry["content"])["etag"],
+            "last_modified": metadata.get("last_modified")
+        }
+
+    async def get_cached_debug_artifacts(self, request: TranslationRequest) -> Optional[Dict]:
+        """debug配置档命中缓存时读取单独存放的调试数据"""
+        if request.profile != "debug":
+            return None
+
+        return await self.get_cache_service(request.cache).get_debug_artifacts(
+            request.path,
+            request.source_language,
+            request.target_language
+        )
+
+    async def probe_cached_result(self, path: str, source_language: str, target_language: str, use_file_cache: bool,
+                                  profile: str = "summary", content_hash: Optional[str] = None) -> Optional[Dict]:
+        """
+        不上传HTML只按路径和语言对查询缓存
+
+        Args:
+            content_hash: 客户端计算的 md5(html_body)，与缓存指纹不一致时视为未命中
+
+        Returns:
+            {"message": 处理消息, "data": 响应数据, "fingerprint": 内容指纹, "cache_status": hit / stale,
+             "etag": 缓存内容校验值, "last_modified": 缓存写入时间}，未命中为None
+            没有HTML无法刷新，已软过期的条目只标记为stale
+        """
+        cache_service = self.get_cache_service(use_file_cache)
+        cache_entry = await self.get_cache_entry(path, source_language, target_language, use_file_cache)
+        if not cache_entry:
+            return None
+        cached_result = cache_entry["content"]
+
+        fingerprint = (cached_result.get("cache_info") or {}).get("content_fingerprint")
+        if content_hash and fingerprint and content_hash.lower() != fingerprint:
+            print(f"♻️ 缓存内容指纹不一致，需要上传HTML: {path}")
+            return None
+
+        debug_artifacts = None
+        if profile == "debug":
+            debug_artifacts = await cache_service.get_debug_artifacts(path, source_language, target_language)
+
+        return {
+            "message": f"🎉 使用{'文件' if use_file_cache else 'Redis'}缓存结果！",
+            "data": payload_profile_service.apply_profile(cached_result, profile, debug_artifacts),
+            "fingerprint": fingerprint,
+            "cache_status": "stale" if cache_service.is_soft_expired(cache_entry.get("metadata", {})) else "hit",
+            **self.get_entry_validators(cache_entry)
+        }
+
+    async def get_cached_html_file(self, path: str, source_language: str, target_language: str,
+                                   content_hash: Optional[str] = None) -> Optional[Dict]:
+        """
+        文件缓存命中时取得译文HTML文件，可直接以文件返回，不读取和解析缓存内容
+
+        Args:
+            content_hash: md5(html_body)，与缓存指纹不一致时视为未命中
+
+        Returns:
+            {"html_path": 译文HTML文件, "fingerprint": 内容指纹, "cache_status": hit / stale,
+             "etag": 缓存内容校验值, "last_modified": 缓存写入时间}；写入队列中有更新的条目、
+            骨架存储格式或未命中时为None，按常规流程处理
+        """
+        if cache_writer_service.get_pending_entry(True, path, source_language, target_language):
+            return None
+
+        html_entry = await get_file_cache_service().get_html_entry(path, source_language, target_language)
+        if not html_entry:
+            return None
+
+        metadata = html_entry["metadata"]
+        fingerprint = metadata.get("content_fingerprint")
+        if content_hash and fingerprint and content_hash.lower() != fingerprint:
+            return None
+
+        return {
+            "html_path": html_entry["html_path"],
+            "fingerprint": fingerprint,
+            "cache_status": "stale" if get_file_cache_service().is_soft_expired(metadata) else "hit",
+            "etag": metadata.get("etag"),
+            "last_modified": metadata.get("last_modified")
+        }
+
+    async def compact_for_storage(self, results: List[Tuple[TranslationRequest, Dict]]) -> List[Dict]:
+        """
+        骨架存储格式下把核心数据中的译文HTML换成译文片段，并保存骨架
+
+        同一页面的骨架只生成和保存一次，所有目标语言共用；译文与骨架对不上时按完整HTML存储
+
+        Returns:
+            与results顺序一致的待存储核心数据
+        """
+        if not skeleton_service.enabled:
+            return [core_data for _, core_data in results]
+
+        built_skeletons = {}
+        skeletons_by_backend = {True: {}, False: {}}
+        stored = []
+        for request, core_data in results:
+            content_hash = (core_data.get("cache_info") or {}).get("content_fingerprint")
+            if not content_hash:
+                stored.append(core_data)
+                continue
+
+            if content_hash not in built_skeletons:
+                built_skeletons[content_hash] = skeleton_service.build_skeleton(
+                    request.html_body, "large_html_results" in core_data
+                )
+            compacted = skeleton_service.compact(core_data, built_skeletons[content_hash])
+            if compacted is None:
+                print(f"⚠️ 译文与骨架不一致，按完整HTML存储: {request.path}")
+                stored.append(core_data)
+                continue
+
+            skeletons_by_backend[request.cache][content_hash] = built_skeletons[content_hash]
+            stored.append(compacted)
+
+        for use_file_cache, skeletons in skeletons_by_backend.items():
+            if skeletons:
+                await cache_writer_service.enqueue_skeletons(use_file_cache, skeletons)
+        return stored
+
+    async def save_cached_result(self, request: TranslationRequest, translation_data: Dict,
+                                 pointer_only: bool = False) -> Tuple[Dict, Optional[Dict], Dict]:
+        """
+        根据cache参数保存到对应缓存
+
+        缓存只保存响应所需的核心数据，调试数据仅在debug配置档下单独保存；
+        条目进入写入队列后即返回，由后台协程写入缓存
+
+        Args:
+            pointer_only: 译文来自相同内容的共享译文，不再生成骨架、重写共享译文，只为当前路径写入指针
+
+        Returns:
+            (核心数据, 调试数据, 与缓存条目一致的ETag/Last-Modified)
+        """
+        core_data, debug_artifacts = payload_profile_service.split_payload(translation_data)
+        if pointer_only:
+            stored_data = core_data
+        else:
+            stored_data = (await self.compact_for_storage([(request, core_data)]))[0]
+        validators = serializer_service.build_validators(stored_data)
+
+        if request.cache:
+            print("💾 保存到文件缓存 (基于路径MD5哈希)...")
+        else:
+            print("💾 保存到Redis缓存 (基于路径MD5哈希)...")
+
+        await cache_writer_service.enqueue_entry(
+            request.cache,
+            request.path,
+            request.source_language,
+            request.target_language,
+            stored_data,
+            debug_artifacts if request.profile == "debug" else None,
+            content=core_data,
+            validators=validators,
+            pointer_only=pointer_only
+        )
+        return core_data, debug_artifacts, validators
+
+    async def save_cached_results(self, results: List[Tuple[TranslationRequest, Dict]]) -> List[Tuple[Dict, Optional[Dict]]]:
+        """
+        批量保存到缓存 - 所有条目进入写入队列，由后台协程按缓存后端一次写入（Redis pipeline / 文件索引只保存一次）
+
+        Returns:
+            与results顺序一致的 (核心数据, 调试数据)
+        """
+        payloads = [payload_profile_service.split_payload(translation_data) for _, translation_data in results]
+        stored = await self.compact_for_storage([
+            (request, core_data) for (request, _), (core_data, _) in zip(results, payloads)
+        ])
+
+        for (request, _), (core_data, debug_artifacts), stored_data in zip(results, payloads, stored):
+            await cache_writer_service.enqueue_entry(
+                request.cache,
+                request.path,
+                request.source_language,
+                request.target_language,
+                stored_data,
+                debug_artifacts if request.profile == "debug" else None,
+                content=core_data,
+                validators=serializer_service.build_validators(stored_data)
+            )
+
+        return payloads
+
+    def extract_page(self, html_body: str, keep_dom: bool = False) -> Dict:
+        """
+        提取页面中需要翻译的中文片段 - 每个不同的HTML只提取一次
+
+        Args:
+            keep_dom: 保留DOM提取结果，各目标语言直接在同一份DOM上替换，无需重新解析
+
+        Returns:
+            提取计划：处理模式、中文片段，以及替换阶段所需的块或DOM统计
+        """
+        if self.is_large_html(html_body):
+            chunks, chinese_texts = large_html_processor.extract_chunks(
+                html_body, dom_replacement_service, keep_dom=keep_dom
+            )
+            return {"is_large": True, "chunks": chunks, "chinese_texts": chinese_texts}
+
+        dom_data = dom_replacement_service.extract_all_chinese_with_dom(html_body)
+        return {
+            "is_large": False,
+            "chinese_texts": dom_data['chinese_texts'],
+            "statistics": dom_data['statistics'],
+            "dom_data": dom_data if keep_dom else None
+        }
+
+    def select_translation_results(self, texts: List[str], results_by_text: Dict[str, Dict], duration: float) -> Dict:
+        """从批量翻译结果中取出单个页面的翻译结果，格式与concurrent_batch_translate一致"""
+        unique_texts = list(dict.fromkeys(texts))
+        success_count = sum(1 for text in unique_texts if results_by_text[text]["success"])
+        return {
+            "translations": [results_by_text[text] for text in texts],
+            "success_count": success_count,
+            "failed_count": len(unique_texts) - success_count,
+            "total_count": len(texts),
+            "unique_count": len(unique_texts),
+            "duration": duration
+        }
+
+    def count_block_statistics(self, ultimate_stats: Dict, translated_html_body: str, block_plan: Dict, stored_count: int):
+        """把缓存区块计入替换统计 - 换回缓存区块后按最终HTML重新统计剩余中文"""
+        remaining_chinese = re.findall(dom_replacement_service.chinese_pattern, translated_html_body)
+        original_count = ultimate_stats['original_chinese_count']
+        ultimate_stats.update({
+            'remaining_chinese_count': len(remaining_chinese),
+            'replaced_count': original_count - len(remaining_chinese),
+            'replacement_rate': (original_count - len(remaining_chinese)) / original_count * 100 if original_count else 100,
+            'remaining_texts': list(set(remaining_chinese)),
+            **block_cache_service.get_statistics(block_plan, stored_count)
+        })
+
+    async def lookup_blocks(self, request: TranslationRequest, extraction: Dict) -> Dict:
+        """查询提取计划中标准HTML的区块缓存 - 大型HTML的共享提取计划不使用区块缓存"""
+        if extraction["is_large"] or extraction.get("dom_data") is None:
+            return block_cache_service.empty_plan()
+        return await block_cache_service.lookup(
+            extraction["dom_data"]["soup"], request.source_language, request.target_language
+        )
+
+    async def render_page(self, request: TranslationRequest, extraction: Dict, translation_results: Dict, start_time: float,
+                          block_plan: Optional[Dict] = None) -> Dict:
+        """
+        根据提取计划和翻译结果生成页面译文
+
+        标准HTML在共享的DOM上按区块计划换回缓存区块，替换完成后还原DOM，并保存完整翻译的新区块
+        """
+        translation_map = dom_replacement_service.create_translation_map(translation_results)
+
+        if extraction["is_large"]:
+            remaining_chinese = []
+            translated_html_body = "".join(large_html_processor.iter_replaced_chunks(
+                extraction["chunks"], dom_replacement_service, translation_map, remaining_chinese
+            ))
+            large_stats = large_html_processor.build_statistics(
+                request.html_body, extraction["chunks"], extraction["chinese_texts"],
+                translation_results, remaining_chinese, start_time
+            )
+            large_stats["translation_map"] = translation_map
+            return self.build_large_translation_data(request, translated_html_body, large_stats)
+
+        block_plan = block_plan or block_cache_service.empty_plan()
+        dom_data = extraction.get("dom_data")
+        block_changes = block_cache_service.apply(dom_data["soup"], block_plan) if dom_data else []
+        try:
+            translated_html_body, ultimate_stats = dom_replacement_service.ultimate_replace_chinese(
+                request.html_body,
+                translation_map,
+                dom_data=dom_data
+            )
+        finally:
+            block_cache_service.restore(block_changes)
+
+        translated_html_body, new_blocks = block_cache_service.finalize(translated_html_body, block_plan)
+        stored_count = await block_cache_service.save_blocks(new_blocks)
+        self.count_block_statistics(ultimate_stats, translated_html_body, block_plan, stored_count)
+        return self.build_standard_translation_data(
+            request, extraction["statistics"], translation_results,
+            translated_html_body, ultimate_stats, translation_map
+        )
+
+    def build_batch_item(self, index: int, request: TranslationRequest, success: bool, message: str,
+                         cache_hit: bool = False, data: Optional[Dict] = None, cache_status: Optional[str] = None) -> Dict:
+        """构建批量翻译的单条结果"""
+        return {
+            "index": index,
+            "path": request.path,
+            "source_language": request.source_language,
+            "target_language": request.target_language,
+            "success": success,
+            "cache_hit": cache_hit,
+            "cache_status": cache_status or ("hit" if cache_hit else "miss"),
+            "message": message,
+            "data": data
+        }
+
+    async def translate_batch(self, requests: List[TranslationRequest]) -> AsyncIterator[Dict]:
+        """
+        批量翻译多个页面和语言 - 按完成顺序逐条产出结果
+
+        1. 按缓存策略批量查询缓存（Redis MGET / 文件批量读取）
+        2. 未命中的页面按HTML内容去重，每个不同的HTML只提取一次
+        3. 同一语言对的所有中文片段合并去重后只翻译一次
+        """
+        start_time = time.time()
+        print(f"📦 批量翻译开始: {len(requests)} 个条目")
+
+        # 1. 批量查询缓存，内容已变化的条目保留片段映射表用于增量翻译
+        pending_indexes = []
+        known_translations = {}
+        for use_file_cache in (True, False):
+            indexes = [i for i, request in enumerate(requests) if request.cache == use_file_cache]
+            if not indexes:
+                continue
+
+            cache_entries = await self.get_cache_service(use_file_cache).get_cache_entry_many([
+                (requests[i].path, requests[i].source_language, requests[i].target_language)
+                for i in indexes
+            ])
+            for i, cache_entry in zip(indexes, cache_entries):
+                cached_result = cache_entry["content"] if cache_entry else None
+                if cached_result and self.is_cache_fresh(cached_result, requests[i].html_body):
+                    yield await self.build_cached_batch_item(i, requests[i], cache_entry)
+                else:
+                    pending_indexes.append(i)
+                    if cached_result:
+                        known_translations[i] = await self.get_known_translations(requests[i], cached_result)
+
+        print(f"📊 缓存命中: {len(requests) - len(pending_indexes)}, 需要翻译: {len(pending_indexes)}")
+        if not pending_indexes:
+            return
+
+        # 2. 每个不同的HTML只提取一次；标准HTML保留DOM，各条目在同一份DOM上换回缓存区块并替换
+        extractions = {}
+        body_hashes = {}
+        for i in pending_indexes:
+            body_hash = hashlib.md5(requests[i].html_body.encode('utf-8')).hexdigest()
+            body_hashes[i] = body_hash
+            if body_hash not in extractions:
+                extractions[body_hash] = self.extract_page(
+                    requests[i].html_body, keep_dom=not self.is_large_html(requests[i].html_body)
+                )
+        print(f"🔍 不同HTML数量: {len(extractions)}")
+
+        # 命中区块缓存的区块中的片段不再翻译
+        block_plans = dict(zip(pending_indexes, await asyncio.gather(*[
+            self.lookup_blocks(requests[i], extractions[body_hashes[i]]) for i in pending_indexes
+        ])))
+        page_texts = {
+            i: block_cache_service.filter_texts(extractions[body_hashes[i]]["chinese_texts"], block_plans[i])
+            for i in pending_indexes
+        }
+
+        # 3. 按语言对分组，合并去重所有中文片段后一次翻译
+        language_groups = {}
+        for i in pending_indexes:
+            language_pair = (requests[i].source_language, requests[i].target_language)
+            language_groups.setdefault(language_pair, []).append(i)
+
+        for (source_language, target_language), indexes in language_groups.items():
+            group_texts = list(dict.fromkeys(text for i in indexes for text in page_texts[i]))
+            print(f"⚡ 语言对 {source_language}->{target_language}: {len(indexes)} 个页面, {len(group_texts)} 个唯一片段")
+
+            # 同一语言对下各页面缓存中的片段译文可以共用
+            group_known = {}
+            for i in indexes:
+                group_known.update(known_translations.get(i, {}))
+
+            group_results = await baidu_translation_service.concurrent_batch_translate(
+                group_texts,
+                source_language,
+                target_language,
+                max_concurrent=self.max_concurrent,
+                known_translations=group_known
+            )
+            results_by_text = {
+                translation["original"]: translation
+                for translation in group_results["translations"]
+            }
+
+            # 4. 逐页替换并写入缓存
+            for i in indexes:
+                request = requests[i]
+                try:
+                    translation_results = self.select_translation_results(
+                        page_texts[i], results_by_text, group_results["duration"]
+                    )
+                    translation_data = await self.render_page(
+                        request, extractions[body_hashes[i]], translation_results, start_time, block_plans[i]
+                    )
+                    core_data, debug_artifacts, _ = await self.save_cached_result(request, translation_data)
+                    yield self.build_batch_item(
+                        i, request, True, "🎉 翻译完成！",
+                        data=payload_profile_service.apply_profile(core_data, request.profile, debug_artifacts)
+                    )
+                except Exception as e:
+                    print(f"❌ 批量翻译条目失败 [{i}] {request.path}: {e}")
+                    yield self.build_batch_item(i, request, False, f"❌ 翻译失败: {e}")
+
+        print(f"🎉 批量翻译完成! 耗时: {time.time() - start_time:.2f}秒")
+
+    async def translate_page_multi(self, request: MultiTargetTranslationRequest) -> Dict[str, Dict]:
+        """
+        一次翻译到多个目标语言
+
+        HTML只解析和提取一次，所有目标语言并发翻译同一组片段，
+        再在同一份DOM上逐语言替换，最后所有缓存条目一次批量写入
+
+        Returns:
+            {目标语言: 单条结果}
+        """
+        start_time = time.time()
+        target_languages = list(dict.fromkeys(
+            request.target_languages or self.get_cache_service(request.cache).target_languages.keys()
+        ))
+        base_fields = request.model_dump(exclude={"target_languages"})
+        requests = {
+            target_language: TranslationRequest(**base_fields, target_language=target_language)
+            for target_language in target_languages
+        }
+        print(f"🌐 多目标语言翻译: {request.path} → {', '.join(target_languages)}")
+
+        # 1. 批量查询所有目标语言的缓存，内容已变化的语言保留片段映射表用于增量翻译
+        results = {}
+        known_translations = {}
+        cache_entries = await self.get_cache_service(request.cache).get_cache_entry_many([
+            (request.path, request.source_language, target_language)
+            for target_language in target_languages
+        ])
+        for target_language, cache_entry in zip(target_languages, cache_entries):
+            cached_result = cache_entry["content"] if cache_entry else None
+            if cached_result and not self.is_cache_fresh(cached_result, request.html_body):
+                known_translations[target_language] = await self.get_known_translations(
+                    requests[target_language], cached_result
+                )
+            elif cached_result:
+                results[target_language] = await self.build_cached_batch_item(
+                    target_languages.index(target_language), requests[target_language], cache_entry
+                )
+
+        missing_languages = [target_language for target_language in target_languages if target_language not in results]
+        print(f"📊 缓存命中: {len(results)}, 需要翻译: {len(missing_languages)}")
+        if not missing_languages:
+            return results
+
+        # 2. 只解析和提取一次，保留DOM供所有目标语言复用；各语言命中区块缓存的区块中的片段不再翻译
+        extraction = self.extract_page(request.html_body, keep_dom=True)
+        block_plans = dict(zip(missing_languages, await asyncio.gather(*[
+            self.lookup_blocks(requests[target_language], extraction) for target_language in missing_languages
+        ])))
+
+        # 3. 所有目标语言并发翻译，共享并发总数
+        per_language_concurrent = max(1, self.fanout_max_concurrent // len(missing_languages))
+        language_results = await asyncio.gather(
+            *[
+                baidu_translation_service.concurrent_batch_translate(
+                    block_cache_service.filter_texts(extraction["chinese_texts"], block_plans[target_language]),
+                    request.source_language,
+                    target_language,
+                    max_concurrent=per_language_concurrent,
+                    known_translations=known_translations.get(target_language)
+                )
+                for target_language in missing_languages
+            ],
+            return_exceptions=True
+        )
+
+        # 4. 在共享的提取计划上逐语言替换
+        rendered = []
+        for target_language, translation_results in zip(missing_languages, language_results):
+            language_request = requests[target_language]
+            index = target_languages.index(target_language)
+            try:
+                if isinstance(translation_results, Exception):
+                    raise translation_results
+                translation_data = await self.render_page(
+                    language_request, extraction, translation_results, start_time, block_plans[target_language]
+                )
+                rendered.append((language_request, translation_data))
+            except Exception as e:
+                print(f"❌ 目标语言 {target_language} 翻译失败: {e}")
+                results[target_language] = self.build_batch_item(index, language_request, False, f"❌ 翻译失败: {e}")
+
+        # 5. 所有缓存条目一次批量写入
+        payloads = await self.save_cached_results(rendered)
+        for (language_request, _), (core_data, debug_artifacts) in zip(rendered, payloads):
+            results[language_request.target_language] = self.build_batch_item(
+                target_languages.index(language_request.target_language), language_request, True, "🎉 翻译完成！",
+                data=payload_profile_service.apply_profile(core_data, request.profile, debug_artifacts)
+            )
+
+        print(f"🎉 多目标语言翻译完成! 耗时: {time.time() - start_time:.2f}秒")
+        return {target_language: results[target_language] for target_language in target_languages}
+
+
+# 创建全局实例
+page_translation_service = PageTranslationService()
@@ -0,0 +1,87 @@
+"""
+翻译结果配置档服务 - 按profile裁剪响应和缓存数据
+"""
+
+from typing import Dict, Optional, Tuple
+
+
+class PayloadProfileService:
+    """翻译结果配置档服务类"""
+
+    def __init__(self):
+        """初始化配置档服务"""
+        # 各处理模式下存放译文HTML的结果段
+        self.result_sections = ("ultimate_replacement_results", "large_html_results")
+
+    def split_payload(self, translation_data: Dict) -> Tuple[Dict, Optional[Dict]]:
+        """
+        拆分翻译结果为缓存核心数据和调试数据
+
+        Returns:
+            (核心数据, 调试数据)，没有调试数据时第二项为None
+        """
+        core = dict(translation_data)
+        debug_artifacts = {}
+
+        if "translation_results" in core:
+            translation_results = dict(core["translation_results"])
+            if "translations" in translation_results:
+                debug_artifacts["translations"] = translation_results.pop("translations")
+            core["translation_results"] = translation_results
+
+        if "ultimate_replacement_results" in core:
+            replacement_results = dict(core["ultimate_replacement_results"])
+            for field in ("original_html_body", "translation_map"):
+                if field in replacement_results:
+                    debug_artifacts[field] = replacement_results.pop(field)
+            core["ultimate_replacement_results"] = replacement_results
+
+        return core, (debug_artifacts or None)
+
+    def apply_profile(self, core: Dict, profile: str, debug_artifacts: Optional[Dict] = None) -> Dict:
+        """
+        按配置档生成响应数据
+
+        Args:
+            core: 缓存核心数据
+            profile: html_only / summary / debug
+            debug_artifacts: 调试数据，仅debug配置档使用
+        """
+        if profile != "debug":
+            # 缓存校验信息（内容指纹、片段映射表）只在debug配置档返回
+            core = {section: value for section, value in core.items() if section != "cache_info"}
+
+        if profile == "html_only":
+            result = {"request_info": core.get("request_info", {})}
+            for section in self.result_sections:
+                if section in core:
+                    result[section] = {
+                        "translated_html_body": core[section].get("translated_html_body", "")
+                    }
+            return result
+
+        if profile == "debug":
+            result = dict(core)
+            if debug_artifacts:
+                if "translations" in debug_artifacts and "translation_results" in result:
+                    result["translation_results"] = {
+                        **result["translation_results"],
+                        "translations": debug_artifacts["translations"]
+                    }
+                if "ultimate_replacement_results" in result:
+                    result["ultimate_replacement_results"] = {
+                        **result["ultimate_replacement_results"],
+                        **{
+                            field: debug_artifacts[field]
+                            for field in ("original_html_body", "translation_map")
+                            if field in debug_artifacts
+                        }
+                    }
+            result["debug_artifacts_available"] = debug_artifacts is not None
+            return result
+
+        return core
+
+
+# 创建全局实例
+payload_profile_service = PayloadProfileService()
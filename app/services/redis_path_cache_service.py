@@ -2,12 +2,87 @@
 Redis路径缓存服务 - 基于路径MD5哈希
 """
 
+import asyncio
 import hashlib
-import json
 import gzip
-from typing import Optional, Dict, Any
+import time
+from collections import defaultdict
+from typing import Optional, Dict, Any, List, Tuple
 import redis.asyncio as redis
+from redis.commands.core import AsyncScript
+from redis.utils import HIREDIS_AVAILABLE  # 安装hiredis（redis[hiredis]）时redis-py自动使用C实现的响应解析器
 from app.config.config import get_settings
+from app.services.serializer_service import serializer_service
+from app.services.skeleton_service import skeleton_service
+
+# 写入缓存键并更新计数：键已存在时条目数不变，字节数按新旧值长度之差调整
+# KEYS: 缓存键, 计数哈希；ARGV: 值, TTL, 成对的(条目数字段, 字节数字段)
+SET_WITH_STATS_SCRIPT = """
+local old_size = redis.call('STRLEN', KEYS[1])
+local existed = redis.call('EXISTS', KEYS[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+local delta = string.len(ARGV[1]) - old_size
+for i = 3, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[2], ARGV[i], 1 - existed)
+    redis.call('HINCRBY', KEYS[2], ARGV[i + 1], delta)
+end
+return existed
+"""
+
+# 删除缓存键并更新计数，UNLINK在后台线程释放内存；KEYS: 缓存键, 计数哈希；ARGV: 成对的(条目数字段, 字节数字段)
+DELETE_WITH_STATS_SCRIPT = """
+local old_size = redis.call('STRLEN', KEYS[1])
+local removed = redis.call('UNLINK', KEYS[1])
+if removed == 1 then
+    for i = 1, #ARGV, 2 do
+        redis.call('HINCRBY', KEYS[2], ARGV[i], -1)
+        redis.call('HINCRBY', KEYS[2], ARGV[i + 1], -old_size)
+    end
+end
+return removed
+"""
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """有界阻塞连接池 - 连接用满时等待空闲连接而不是报错，并记录等待时间、超时次数和峰值占用，用于按并发量调整连接池大小"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquired_count = 0
+        self.wait_timeout_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_in_use = 0
+    
+    async def get_connection(self, *args, **kwargs):
+        """从连接池取连接，记录等待时间"""
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                self.wait_timeout_count += 1  # 等待超过 timeout 仍没有空闲连接
+            raise
+        wait_seconds = time.perf_counter() - start
+        self.acquired_count += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """连接池指标"""
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "peak_in_use": self.peak_in_use,
+            "acquired": self.acquired_count,
+            "wait_timeouts": self.wait_timeout_count,
+            "avg_wait_ms": round(self.wait_seconds_total / self.acquired_count * 1000, 3) if self.acquired_count else 0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+            "pool_timeout_seconds": self.timeout
+        }
 
 
 class RedisPathCacheService:
@@ -22,9 +97,39 @@ class RedisPathCacheService:
         self.port = self.settings.redis_port
         self.db = self.settings.redis_db
         self.password = self.settings.redis_password
-        self.cache_ttl = self.settings.cache_ttl  # Redis TTL (秒)
-        self.use_compression = True
-        self.compression_min_size = 1024  # 1KB以上启用压缩
+        self.cache_ttl = self.settings.cache_ttl  # Redis TTL (秒)，即硬过期
+        self.soft_ttl = min(self.settings.cache_soft_ttl, self.cache_ttl)  # 软过期 (秒)
+        self.use_compression = self.settings.redis_use_compression
+        self.compression_min_size = self.settings.redis_compression_min_size  # 该字节数以上启用压缩
+        self.compression_level = min(max(self.settings.redis_compression_level, 1), 9)  # gzip压缩级别
+        
+        # 连接池：所有Redis使用方（路径缓存、区块缓存、单飞锁、异步任务队列）共用一个有界连接池
+        self.max_connections = self.settings.redis_max_connections
+        self.pool_timeout = self.settings.redis_pool_timeout  # 连接用满时等待空闲连接的超时(秒)
+        self.socket_timeout = self.settings.redis_socket_timeout
+        self.connect_timeout = self.settings.redis_connect_timeout
+        self.health_check_interval = self.settings.redis_health_check_interval  # 空闲超过该秒数的连接使用前先PING
+        self.connection_pool: Optional[MeteredConnectionPool] = None
+        
+        # 缓存计数：写入、删除时在Redis哈希中增减，状态接口O(1)读取；
+        # 键按TTL过期不会减少计数，由后台任务定期SCAN校准
+        self.stats_key = "rs:stats"
+        # 计数脚本只创建一次，以EVALSHA执行（pipeline执行前自动SCRIPT LOAD），不再每次发送脚本全文；
+        # 连接在initialize时才建立，脚本总是传入pipeline执行，无需绑定客户端
+        self.set_with_stats_script = AsyncScript(None, SET_WITH_STATS_SCRIPT.encode())
+        self.delete_with_stats_script = AsyncScript(None, DELETE_WITH_STATS_SCRIPT.encode())
+        self.reconcile_lock_key = "rs:reconcile"  # 多个worker同一校准间隔内只校准一次
+        self.reconcile_interval = self.settings.cache_stats_reconcile_interval_hours * 3600
+        self.scan_batch_size = 500
+        self.reconcile_wakeup: Optional[asyncio.Event] = None
+        self.reconcile_task: Optional[asyncio.Task] = None
+        self.reconcile_running = False
+        
+        # 失效索引：写入时维护，按域名/路径前缀/语言对失效时不遍历整个键空间
+        # 域名索引为有序集合，成员为 "路径\t缓存键"（分值相同按字典序排列，路径前缀对应一段连续范围）；语言对索引为集合
+        self.domain_index_prefix = "ri:d:"
+        self.language_index_prefix = "ri:l:"
+        self.invalidate_batch_size = 500  # 每批删除的键数，批次之间让出事件循环，不长时间阻塞Redis
         
         # 中文转其他10种语言映射
         self.source_language = "zh"  # 固定源语言为中文
@@ -49,7 +154,9 @@ class RedisPathCacheService:
         print(f"  数据库: {self.db}")
         print(f"  密码: {'***' if self.password else '无'}")
         print(f"  缓存TTL: {self.cache_ttl}秒 (来自配置)")
-        print(f"  压缩: {self.use_compression}")
+        print(f"  软过期: {self.soft_ttl}秒 (来自配置)")
+        print(f"  压缩: {self.use_compression} (级别: {self.compression_level}, 最小: {self.compression_min_size}字节)")
+        print(f"  连接池: 最多{self.max_connections}个连接, 等待超时{self.pool_timeout}秒, 解析器: {'hiredis' if HIREDIS_AVAILABLE else 'python'}")
         print(f"  源语言: 中文 (zh)")
         print(f"  目标语言: {len(self.target_languages)}种")
     
@@ -88,32 +195,213 @@ class RedisPathCacheService:
         target_name = self.target_languages[target_lang]
         return f"r:{path_hash}:zh-{target_name[:3]}"  # 例如: r:a1b2c3d4e5:zh-eng
     
-    def compress_data(self, data: str) -> bytes:
-        """压缩数据"""
-        data_bytes = data.encode('utf-8')
+    def get_stats_fields(self, cache_key: str) -> List[str]:
+        """缓存键对应的计数字段（成对的条目数、字节数字段）"""
+        language_suffix = cache_key.rsplit(":", 1)[1]
+        if cache_key.startswith("c:"):
+            return ["content_entries", "content_bytes"]
+        return ["entries", "bytes", f"entries:{language_suffix}", f"bytes:{language_suffix}"]
+    
+    def get_index_path(self, path: str) -> str:
+        """失效索引中的路径 - 标准化并去掉协议"""
+        return self.normalize_path(path).split("://", 1)[-1]  # 例如: example.com/news/list
+    
+    def get_domain_index_key(self, index_path: str) -> str:
+        """路径所属域名的失效索引键"""
+        return f"{self.domain_index_prefix}{index_path.split('/', 1)[0]}"  # 例如: ri:d:example.com
+    
+    def get_language_index_key(self, cache_key: str) -> str:
+        """缓存键所属语言对的失效索引键"""
+        return f"{self.language_index_prefix}{cache_key.rsplit(':', 1)[1]}"  # 例如: ri:l:zh-eng
+    
+    def get_language_suffix(self, target_lang: str) -> str:
+        """目标语言对应的缓存键后缀"""
+        if target_lang not in self.target_languages:
+            raise ValueError(f"不支持的目标语言: {target_lang}，支持的语言: {list(self.target_languages.keys())}")
+        return f"zh-{self.target_languages[target_lang][:3]}"  # 例如: zh-eng
+    
+    def queue_index_entry(self, pipe, path: str, cache_keys: List[str]):
+        """把缓存键加入域名、语言对失效索引；索引随写入续期，长期没有写入时与缓存一起过期"""
+        index_path = self.get_index_path(path)
+        domain_index_key = self.get_domain_index_key(index_path)
+        language_index_key = self.get_language_index_key(cache_keys[0])  # 同一条目的键属于同一语言对
+        pipe.zadd(domain_index_key, {f"{index_path}\t{cache_key}": 0 for cache_key in cache_keys})
+        pipe.sadd(language_index_key, *cache_keys)
+        pipe.expire(domain_index_key, self.cache_ttl)
+        pipe.expire(language_index_key, self.cache_ttl)
+    
+    async def queue_set_with_stats(self, pipe, cache_key: str, value: bytes):
+        """把带计数更新的缓存写入加入pipeline"""
+        await self.set_with_stats_script(
+            keys=[cache_key, self.stats_key],
+            args=[value, self.cache_ttl, *self.get_stats_fields(cache_key)],
+            client=pipe
+        )
+    
+    def get_content_cache_key(self, content_hash: str, source_lang: str, target_lang: str) -> str:
+        """生成内容寻址的Redis键 - 相同HTML在不同路径下共用一份译文"""
+        target_name = self.target_languages[target_lang]
+        return f"c:{content_hash}:zh-{target_name[:3]}"  # 例如: c:9e107d9d...:zh-eng
+    
+    def get_translation_map_key(self, content_key: str) -> str:
+        """共享内容键对应的片段映射表键 - 只在页面变化需要增量翻译时读取"""
+        return f"m:{content_key[2:]}"  # 例如: m:9e107d9d...:zh-eng
+    
+    def split_shared_content(self, translation_result: Dict) -> Tuple[Optional[str], Dict, Optional[Dict[str, str]]]:
+        """
+        拆分出可在路径间共享的译文内容（不含request_info）
+
+        Returns:
+            (内容指纹, 共享内容, 片段映射表)；有内容指纹时片段映射表从共享内容中移出单独保存
+        """
+        cache_info = translation_result.get("cache_info") or {}
+        content_hash = cache_info.get("content_fingerprint")
+        shared_content = {section: value for section, value in translation_result.items() if section != "request_info"}
+        translation_map = None
+        if content_hash and "translation_map" in cache_info:
+            shared_content["cache_info"] = {key: value for key, value in cache_info.items() if key != "translation_map"}
+            translation_map = cache_info["translation_map"]
+        return content_hash, shared_content, translation_map
+    
+    async def resolve_content(self, cache_results: List[Optional[Dict]]) -> List[Optional[Dict]]:
+        """
+        把路径指针条目解析为完整缓存条目 - 一次MGET取回所有引用的共享内容，再一次MGET取回骨架
+
+        共享内容或骨架已过期的条目视为未命中
+        """
+        refs = {
+            i: cache_result["metadata"]["content_ref"]
+            for i, cache_result in enumerate(cache_results)
+            if cache_result and "content_ref" in cache_result.get("metadata", {})
+        }
+        if refs:
+            shared_values = await self.redis_client.mget(list(refs.values()))
+            for i, shared_value in zip(refs.keys(), shared_values):
+                if shared_value is None:
+                    cache_results[i] = None
+                    continue
+                shared = serializer_service.loads(self.decompress_data(shared_value))
+                cache_results[i] = {
+                    "metadata": cache_results[i]["metadata"],
+                    "content": {"request_info": cache_results[i].get("request_info", {}), **shared["content"]}
+                }
         
-        if self.use_compression and len(data_bytes) >= self.compression_min_size:
-            return gzip.compress(data_bytes)
+        contents = await self.expand_skeletons([
+            cache_result["content"] if cache_result else None for cache_result in cache_results
+        ])
+        return [
+            {"metadata": cache_result["metadata"], "content": content} if cache_result and content else None
+            for cache_result, content in zip(cache_results, contents)
+        ]
+    
+    def get_skeleton_key(self, content_hash: str) -> str:
+        """生成骨架的Redis键 - 与语言无关，同一页面的所有目标语言共用"""
+        return f"sk:{content_hash}"  # 例如: sk:9e107d9d...
+    
+    async def expand_skeletons(self, contents: List[Optional[Dict]]) -> List[Optional[Dict]]:
+        """紧凑格式的缓存内容拼回完整译文HTML - 一次MGET取回所有引用的骨架"""
+        skeleton_refs = list(dict.fromkeys(
+            ref for content in contents if content for ref in skeleton_service.get_skeleton_refs(content)
+        ))
+        if not skeleton_refs:
+            return contents
         
-        return data_bytes
+        skeleton_values = await self.redis_client.mget([self.get_skeleton_key(ref) for ref in skeleton_refs])
+        skeletons = {
+            ref: serializer_service.loads(self.decompress_data(value))["skeleton"]
+            for ref, value in zip(skeleton_refs, skeleton_values)
+            if value is not None
+        }
+        return [skeleton_service.expand(content, skeletons) if content else None for content in contents]
     
-    def decompress_data(self, data: bytes) -> str:
+    async def set_skeletons(self, skeletons: Dict[str, List[str]]) -> bool:
+        """批量保存骨架 - 一次pipeline写入，TTL与译文相同"""
+        if not self.redis_client or not skeletons:
+            return False
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for content_hash, skeleton in skeletons.items():
+                    skeleton_data = self.compress_data(serializer_service.dumps({"skeleton": skeleton}))
+                    pipe.set(self.get_skeleton_key(content_hash), skeleton_data, ex=self.cache_ttl)
+                await pipe.execute()
+            return True
+            
+        except Exception as e:
+            print(f"❌ 保存Redis骨架失败: {e}")
+            return False
+    
+    async def get_content(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """按内容指纹获取共享译文（不含request_info）"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            content_key = self.get_content_cache_key(content_hash, source_lang, target_lang)
+            shared_value = await self.redis_client.get(content_key)
+            if shared_value is None:
+                return None
+            
+            shared_content = serializer_service.loads(self.decompress_data(shared_value))["content"]
+            shared_content = (await self.expand_skeletons([shared_content]))[0]
+            if shared_content is not None:
+                print(f"✅ Redis内容缓存命中: {content_key}")
+            return shared_content
+            
+        except Exception as e:
+            print(f"❌ 获取Redis内容缓存失败: {e}")
+            return None
+    
+    async def get_translation_map(self, content_hash: str, source_lang: str, target_lang: str) -> Optional[Dict[str, str]]:
+        """按内容指纹获取片段映射表"""
+        if not self.redis_client:
+            return None
+        
+        try:
+            content_key = self.get_content_cache_key(content_hash, source_lang, target_lang)
+            value = await self.redis_client.get(self.get_translation_map_key(content_key))
+            return serializer_service.loads(self.decompress_data(value)) if value is not None else None
+            
+        except Exception as e:
+            print(f"❌ 获取Redis片段映射表失败: {e}")
+            return None
+    
+    def is_soft_expired(self, metadata: Dict) -> bool:
+        """缓存条目是否已软过期 - 没有软过期时间的旧缓存条目视为未过期"""
+        soft_expires_at = metadata.get("soft_expires_at")
+        return soft_expires_at is not None and time.time() > soft_expires_at
+    
+    def compress_data(self, data: bytes) -> bytes:
+        """压缩数据"""
+        if self.use_compression and len(data) >= self.compression_min_size:
+            return gzip.compress(data, compresslevel=self.compression_level)
+        
+        return data
+    
+    def decompress_data(self, data: bytes) -> bytes:
         """解压数据"""
         if self.use_compression and data.startswith(b'\x1f\x8b'):  # gzip魔数
-            return gzip.decompress(data).decode('utf-8')
+            return gzip.decompress(data)
         
-        return data.decode('utf-8')
+        return data
     
     async def initialize(self) -> bool:
         """初始化Redis连接"""
         try:
-            self.redis_client = redis.Redis(
+            self.connection_pool = MeteredConnectionPool(
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
                 host=self.host,
                 port=self.port,
                 db=self.db,
                 password=self.password,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.connect_timeout,
+                socket_keepalive=True,
+                health_check_interval=self.health_check_interval,
                 decode_responses=False  # 保持二进制数据用于压缩
             )
+            self.redis_client = redis.Redis.from_pool(self.connection_pool)  # 客户端关闭时一并断开连接池
             
             # 测试连接
             await self.redis_client.ping()
@@ -122,10 +410,20 @@ class RedisPathCacheService:
             
         except Exception as e:
             print(f"❌ Redis路径缓存连接失败: {str(e)}")
+            # 连接失败时置空客户端，依赖方据此回退（如异步任务使用进程内队列）
+            if self.redis_client:
+                await self.redis_client.aclose()
+            self.redis_client = None
+            self.connection_pool = None
             return False
     
     async def get_cache(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
-        """获取Redis缓存"""
+        """获取Redis缓存内容"""
+        cache_entry = await self.get_cache_entry(path, source_lang, target_lang)
+        return cache_entry["content"] if cache_entry else None
+    
+    async def get_cache_entry(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """获取Redis缓存条目，包含metadata（ETag、Last-Modified等）和content"""
         if not self.redis_client:
             return None
         
@@ -140,45 +438,167 @@ class RedisPathCacheService:
                 print(f"❌ Redis缓存未命中: {cache_key}")
                 return None
             
-            # 3. 解压和反序列化数据
+            # 3. 解压和反序列化数据，指针条目取回共享内容
             decompressed_data = self.decompress_data(cached_data)
-            cache_result = json.loads(decompressed_data)
+            cache_result = (await self.resolve_content([serializer_service.loads(decompressed_data)]))[0]
+            
+            if cache_result is None:
+                print(f"❌ Redis共享内容已过期: {cache_key}")
+                return None
             
             print(f"✅ Redis缓存命中: {cache_key}")
-            return cache_result["content"]
+            return cache_result
             
         except Exception as e:
             print(f"❌ 获取Redis缓存失败: {e}")
             return None
     
-    async def set_cache(self, path: str, source_lang: str, target_lang: str, translation_result: Dict) -> bool:
-        """设置Redis缓存"""
+    async def get_cache_many(self, items: List[Tuple[str, str, str]]) -> List[Optional[Dict]]:
+        """
+        批量获取Redis缓存 - 一次MGET往返
+
+        Args:
+            items: (路径, 源语言, 目标语言) 列表
+
+        Returns:
+            与items顺序一致的缓存内容，未命中为None
+        """
+        cache_entries = await self.get_cache_entry_many(items)
+        return [cache_entry["content"] if cache_entry else None for cache_entry in cache_entries]
+    
+    async def get_cache_entry_many(self, items: List[Tuple[str, str, str]]) -> List[Optional[Dict]]:
+        """批量获取Redis缓存条目（metadata和content）- 一次MGET往返"""
+        results = [None] * len(items)
+        if not self.redis_client or not items:
+            return results
+        
+        try:
+            # 1. 生成缓存键，不支持的语言对直接视为未命中
+            cache_keys = {}
+            for i, (path, source_lang, target_lang) in enumerate(items):
+                try:
+                    cache_keys[i] = self.generate_cache_key(path, source_lang, target_lang)
+                except ValueError:
+                    continue
+            
+            if not cache_keys:
+                return results
+            
+            # 2. 一次MGET获取所有缓存
+            cached_values = await self.redis_client.mget(list(cache_keys.values()))
+            
+            # 3. 解压和反序列化，指针条目再一次MGET取回共享内容
+            for i, cached_data in zip(cache_keys.keys(), cached_values):
+                if cached_data is not None:
+                    results[i] = serializer_service.loads(self.decompress_data(cached_data))
+            results = await self.resolve_content(results)
+            
+            hit_count = sum(1 for result in results if result is not None)
+            print(f"✅ Redis批量查询: {hit_count}/{len(items)} 命中")
+            return results
+            
+        except Exception as e:
+            print(f"❌ 批量获取Redis缓存失败: {e}")
+            return [None] * len(items)
+    
+    def get_debug_cache_key(self, cache_key: str) -> str:
+        """获取调试数据的Redis键 - 与主缓存分开存放"""
+        return f"{cache_key}:dbg"  # 例如: r:a1b2c3d4e5:zh-eng:dbg
+    
+    async def get_debug_artifacts(self, path: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """获取调试数据（原文HTML、逐片段翻译结果、翻译映射表）"""
         if not self.redis_client:
-            return False
+            return None
         
         try:
-            # 1. 生成基于路径的缓存键
             cache_key = self.generate_cache_key(path, source_lang, target_lang)
+            cached_data = await self.redis_client.get(self.get_debug_cache_key(cache_key))
             
-            # 2. 准备缓存数据
-            cache_data = {
-                "metadata": {
-                    "cache_key": cache_key,
-                    "path": path,
-                    "source_lang": source_lang,
-                    "target_lang": target_lang,
-                    "cache_method": "redis_path_hash_md5",
-                    "ttl_seconds": self.cache_ttl
-                },
-                "content": translation_result
-            }
+            if cached_data is None:
+                return None
             
-            # 3. 序列化和压缩数据
-            serialized_data = json.dumps(cache_data, ensure_ascii=False)
-            compressed_data = self.compress_data(serialized_data)
+            return serializer_service.loads(self.decompress_data(cached_data))
             
-            # 4. 保存到Redis并设置TTL
-            await self.redis_client.set(cache_key, compressed_data, ex=self.cache_ttl)
+        except Exception as e:
+            print(f"❌ 获取Redis调试数据失败: {e}")
+            return None
+    
+    async def queue_cache_entry(self, pipe, path: str, source_lang: str, target_lang: str, translation_result: Dict,
+                          debug_artifacts: Optional[Dict] = None, pointer_only: bool = False) -> str:
+        """
+        把一条缓存写入加入pipeline，返回缓存键
+
+        Args:
+            pointer_only: 译文来自相同内容的共享译文，只写路径指针并为共享译文和骨架续期
+        """
+        # 1. 生成基于路径的缓存键
+        cache_key = self.generate_cache_key(path, source_lang, target_lang)
+        
+        # 2. 准备缓存数据
+        metadata = {
+            "cache_key": cache_key,
+            "path": path,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "cache_method": "redis_path_hash_md5",
+            "ttl_seconds": self.cache_ttl,
+            "soft_expires_at": time.time() + self.soft_ttl,
+            **serializer_service.build_validators(translation_result)
+        }
+        
+        # 有内容指纹时译文按内容寻址保存，路径键只保存指针和request_info
+        index_keys = [cache_key]
+        content_hash, shared_content, translation_map = self.split_shared_content(translation_result)
+        if content_hash:
+            content_key = self.get_content_cache_key(content_hash, source_lang, target_lang)
+            translation_map_key = self.get_translation_map_key(content_key)
+            if pointer_only:
+                pipe.expire(content_key, self.cache_ttl)
+                pipe.expire(translation_map_key, self.cache_ttl)
+                pipe.expire(self.get_skeleton_key(content_hash), self.cache_ttl)
+            else:
+                shared_data = self.compress_data(serializer_service.dumps({"content": shared_content}))
+                await self.queue_set_with_stats(pipe, content_key, shared_data)
+                if translation_map is not None:
+                    pipe.set(translation_map_key, self.compress_data(serializer_service.dumps(translation_map)), ex=self.cache_ttl)
+                else:
+                    pipe.delete(translation_map_key)
+            index_keys.append(content_key)
+            cache_data = {
+                "metadata": {**metadata, "content_ref": content_key},
+                "request_info": translation_result.get("request_info", {})
+            }
+        else:
+            cache_data = {"metadata": metadata, "content": translation_result}
+        
+        # 3. 序列化和压缩数据
+        serialized_data = serializer_service.dumps(cache_data)
+        compressed_data = self.compress_data(serialized_data)
+        
+        # 4. 保存到Redis并设置TTL，调试数据单独保存，命中时按需读取
+        debug_cache_key = self.get_debug_cache_key(cache_key)
+        await self.queue_set_with_stats(pipe, cache_key, compressed_data)
+        if debug_artifacts is not None:
+            debug_data = self.compress_data(serializer_service.dumps(debug_artifacts))
+            pipe.set(debug_cache_key, debug_data, ex=self.cache_ttl)
+        else:
+            pipe.delete(debug_cache_key)
+        self.queue_index_entry(pipe, path, index_keys)
+        
+        return cache_key
+    
+    async def set_cache(self, path: str, source_lang: str, target_lang: str, translation_result: Dict,
+                        debug_artifacts: Optional[Dict] = None, pointer_only: bool = False) -> bool:
+        """设置Redis缓存，调试数据单独存放；pointer_only时只写路径指针"""
+        if not self.redis_client:
+            return False
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                cache_key = await self.queue_cache_entry(
+                    pipe, path, source_lang, target_lang, translation_result, debug_artifacts, pointer_only
+                )
+                await pipe.execute()
             
             print(f"💾 Redis缓存已保存: {cache_key} (TTL: {self.cache_ttl}秒)")
             return True
@@ -187,6 +607,37 @@ class RedisPathCacheService:
             print(f"❌ 保存Redis缓存失败: {e}")
             return False
     
+    async def set_cache_many(self, entries: List[Tuple[str, str, str, Dict, Optional[Dict]]]) -> int:
+        """
+        批量设置Redis缓存 - 所有条目在一个pipeline中写入
+
+        Args:
+            entries: (路径, 源语言, 目标语言, 缓存内容, 调试数据, 是否只写指针) 列表
+
+        Returns:
+            写入的条目数
+        """
+        if not self.redis_client or not entries:
+            return 0
+        
+        try:
+            saved_count = 0
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for entry in entries:
+                    try:
+                        await self.queue_cache_entry(pipe, *entry)
+                        saved_count += 1
+                    except ValueError as e:
+                        print(f"⚠️ 跳过Redis缓存条目: {e}")
+                await pipe.execute()
+            
+            print(f"💾 Redis缓存批量保存: {saved_count}/{len(entries)} 条 (TTL: {self.cache_ttl}秒)")
+            return saved_count
+            
+        except Exception as e:
+            print(f"❌ 批量保存Redis缓存失败: {e}")
+            return 0
+    
     async def delete_cache(self, path: str, source_lang: str, target_lang: str) -> bool:
         """删除Redis缓存"""
         if not self.redis_client:
@@ -194,9 +645,12 @@ class RedisPathCacheService:
         
         try:
             cache_key = self.generate_cache_key(path, source_lang, target_lang)
-            result = await self.redis_client.delete(cache_key)
+            index_path = self.get_index_path(path)
+            deleted_keys = await self.unlink_keys(
+                [cache_key], {self.get_domain_index_key(index_path): [f"{index_path}\t{cache_key}"]}
+            )
             
-            if result:
+            if deleted_keys:
                 print(f"🗑️ Redis缓存已删除: {cache_key}")
                 return True
             else:
@@ -229,9 +683,16 @@ class RedisPathCacheService:
         try:
             info = await self.redis_client.info()
             
-            # 统计路径缓存键数量
-            pattern = "r:*:zh-*"
-            cache_keys = await self.redis_client.keys(pattern)
+            # 读取维护的计数，不再用KEYS遍历整个键空间
+            stats = {
+                field.decode(): value.decode()
+                for field, value in (await self.redis_client.hgetall(self.stats_key)).items()
+            }
+            language_totals = {
+                field.split(":", 1)[1]: {"entries": int(value), "bytes": int(stats.get(f"bytes:{field.split(':', 1)[1]}", 0))}
+                for field, value in stats.items()
+                if field.startswith("entries:") and int(value) > 0
+            }
             
             return {
                 "status": "connected",
@@ -240,12 +701,20 @@ class RedisPathCacheService:
                 "used_memory_human": info.get('used_memory_human', 'unknown'),
                 "keyspace_hits": info.get('keyspace_hits', 0),
                 "keyspace_misses": info.get('keyspace_misses', 0),
-                "path_cache_keys": len(cache_keys),
+                "path_cache_keys": int(stats.get("entries", 0)),
+                "path_cache_bytes": int(stats.get("bytes", 0)),
+                "content_cache_keys": int(stats.get("content_entries", 0)),
+                "content_cache_bytes": int(stats.get("content_bytes", 0)),
+                "language_totals": language_totals,
+                "stats_reconciled_at": stats.get("reconciled_at"),
                 "cache_method": "redis_path_hash_md5",
                 "config": {
                     "ttl_seconds": self.cache_ttl,
+                    "soft_ttl_seconds": self.soft_ttl,
                     "compression": self.use_compression,
-                    "supported_languages": len(self.target_languages)
+                    "compression_level": self.compression_level,
+                    "supported_languages": len(self.target_languages),
+                    "stats_reconcile_interval_seconds": self.reconcile_interval
                 }
             }
             
@@ -255,31 +724,318 @@ class RedisPathCacheService:
                 "error": str(e)
             }
     
+    async def unlink_keys(self, cache_keys: List[str], domain_members: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """
+        一个pipeline删除一批缓存键 - UNLINK并更新计数，同时删除调试数据并移出失效索引
+
+        Args:
+            cache_keys: 路径缓存键或共享内容键
+            domain_members: 需要移出的域名索引成员 {索引键: 成员列表}
+
+        Returns:
+            实际删除的缓存键（已过期或已被删除的不含在内）
+        """
+        if not cache_keys:
+            return []
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key in cache_keys:
+                await self.delete_with_stats_script(
+                    keys=[cache_key, self.stats_key], args=self.get_stats_fields(cache_key), client=pipe
+                )
+            for cache_key in cache_keys:
+                if cache_key.startswith("r:"):
+                    pipe.unlink(self.get_debug_cache_key(cache_key))
+                elif cache_key.startswith("c:"):
+                    pipe.unlink(self.get_translation_map_key(cache_key))
+                pipe.srem(self.get_language_index_key(cache_key), cache_key)
+            for domain_index_key, members in (domain_members or {}).items():
+                if members:
+                    pipe.zrem(domain_index_key, *members)
+            results = await pipe.execute()
+        return [cache_key for cache_key, removed in zip(cache_keys, results) if removed]
+    
+    async def invalidate(self, domain: Optional[str] = None, path_prefix: Optional[str] = None,
+                         target_lang: Optional[str] = None, use_scan: bool = False) -> Dict[str, int]:
+        """
+        按域名、路径前缀、语言对批量失效缓存 - 从失效索引分批取出缓存键，每批一个pipeline UNLINK
+
+        路径前缀包含域名（如 example.com/news），给出时忽略domain；共享内容键随引用它的路径一起删除，
+        其他路径再次命中时视为未命中。use_scan=True时改为SCAN路径缓存键并读取metadata匹配，
+        用于失效索引建立之前写入的缓存
+
+        Returns:
+            删除的路径缓存键数、共享内容键数和批次数
+        """
+        if not self.redis_client:
+            return {"path_entries": 0, "content_entries": 0, "batches": 0}
+        if not (domain or path_prefix or target_lang):
+            raise ValueError("至少需要指定域名、路径前缀或目标语言之一")
+        
+        language_suffix = self.get_language_suffix(target_lang) if target_lang else None
+        prefix = self.get_index_path(path_prefix or domain) if (path_prefix or domain) else None
+        
+        if use_scan:
+            batches = self.scan_invalidation_batches(prefix, language_suffix)
+        elif prefix:
+            batches = self.domain_invalidation_batches(prefix, language_suffix)
+        else:
+            batches = self.language_invalidation_batches(language_suffix)
+        
+        result = {"path_entries": 0, "content_entries": 0, "batches": 0}
+        async for cache_keys, domain_members in batches:
+            deleted_keys = await self.unlink_keys(cache_keys, domain_members)
+            result["path_entries"] += sum(1 for cache_key in deleted_keys if cache_key.startswith("r:"))
+            result["content_entries"] += sum(1 for cache_key in deleted_keys if cache_key.startswith("c:"))
+            result["batches"] += 1
+            await asyncio.sleep(0)  # 批次之间让出事件循环
+        
+        print(f"🗑️ Redis缓存已失效: 路径缓存 {result['path_entries']} 个, 共享内容 {result['content_entries']} 个, "
+              f"{result['batches']} 批 (前缀: {prefix or '全部'}, 语言对: {language_suffix or '全部'}, "
+              f"{'SCAN' if use_scan else '索引'})")
+        return result
+    
+    async def domain_invalidation_batches(self, prefix: str, language_suffix: Optional[str]):
+        """
+        从域名索引按字典序分批取出路径前缀范围内的缓存键
+
+        被语言对过滤掉的成员留在索引中，下一批用偏移量跳过
+        """
+        domain_index_key = self.get_domain_index_key(prefix)
+        min_member = b"[" + prefix.encode()
+        max_member = min_member + b"\xff"  # 按字节比较，UTF-8编码的路径都小于0xff
+        skipped = 0
+        while True:
+            members = await self.redis_client.zrangebylex(
+                domain_index_key, min_member, max_member, start=skipped, num=self.invalidate_batch_size
+            )
+            if not members:
+                return
+            members = [member.decode() for member in members]
+            matched = [
+                member for member in members
+                if language_suffix is None or member.endswith(f":{language_suffix}")
+            ]
+            skipped += len(members) - len(matched)
+            if matched:
+                yield [member.split("\t", 1)[1] for member in matched], {domain_index_key: matched}
+    
+    async def language_invalidation_batches(self, language_suffix: str):
+        """从语言对索引分批弹出缓存键；域名索引中留下的成员由后台校准清理"""
+        language_index_key = f"{self.language_index_prefix}{language_suffix}"
+        while True:
+            cache_keys = await self.redis_client.spop(language_index_key, self.invalidate_batch_size)
+            if not cache_keys:
+                return
+            yield [cache_key.decode() for cache_key in cache_keys], None
+    
+    async def scan_invalidation_batches(self, prefix: Optional[str], language_suffix: Optional[str]):
+        """SCAN路径缓存键，分批MGET读取metadata中的路径匹配前缀，连同引用的共享内容键一起返回"""
+        pattern = f"r:*:{language_suffix or 'zh-*'}"
+        batch = []
+        async for cache_key in self.redis_client.scan_iter(match=pattern, count=self.scan_batch_size):
+            cache_key = cache_key.decode()
+            if cache_key.endswith(":dbg"):
+                continue
+            batch.append(cache_key)
+            if len(batch) >= self.invalidate_batch_size:
+                matched = await self.match_scanned_keys(batch, prefix)
+                if matched:
+                    yield matched, None
+                batch = []
+        matched = await self.match_scanned_keys(batch, prefix)
+        if matched:
+            yield matched, None
+        
+        # 只按语言对失效时，没有被路径引用的共享内容键也一并删除
+        if prefix is None:
+            batch = []
+            async for content_key in self.redis_client.scan_iter(match=f"c:*:{language_suffix}", count=self.scan_batch_size):
+                batch.append(content_key.decode())
+                if len(batch) >= self.invalidate_batch_size:
+                    yield batch, None
+                    batch = []
+            if batch:
+                yield batch, None
+    
+    async def match_scanned_keys(self, cache_keys: List[str], prefix: Optional[str]) -> List[str]:
+        """一次MGET读取一批路径缓存条目，返回路径匹配前缀的缓存键及其引用的共享内容键"""
+        if not cache_keys:
+            return []
+        matched = []
+        for cache_key, cached_data in zip(cache_keys, await self.redis_client.mget(cache_keys)):
+            if cached_data is None:
+                continue
+            metadata = serializer_service.loads(self.decompress_data(cached_data)).get("metadata", {})
+            index_path = self.get_index_path(metadata.get("path", ""))
+            if prefix is not None and not (
+                index_path.startswith(prefix) and self.get_domain_index_key(index_path) == self.get_domain_index_key(prefix)
+            ):
+                continue
+            matched.append(cache_key)
+            if "content_ref" in metadata:
+                matched.append(metadata["content_ref"])
+        return list(dict.fromkeys(matched))
+    
     async def clear_all_cache(self) -> bool:
-        """清空所有路径缓存"""
+        """清空所有路径缓存 - SCAN分批UNLINK，不用KEYS遍历和一次性DEL阻塞Redis"""
         if not self.redis_client:
             return False
         
         try:
-            pattern = "r:*:zh-*"
-            cache_keys = await self.redis_client.keys(pattern)
+            deleted_count = 0
+            for pattern in ("r:*:zh-*", "c:*:zh-*", "m:*:zh-*", "sk:*", "ri:*"):
+                batch = []
+                async for key in self.redis_client.scan_iter(match=pattern, count=self.scan_batch_size):
+                    batch.append(key)
+                    if len(batch) >= self.invalidate_batch_size:
+                        deleted_count += await self.redis_client.unlink(*batch)
+                        batch = []
+                        await asyncio.sleep(0)
+                if batch:
+                    deleted_count += await self.redis_client.unlink(*batch)
             
-            if cache_keys:
-                await self.redis_client.delete(*cache_keys)
-                print(f"🗑️ 已清空 {len(cache_keys)} 个Redis路径缓存")
-                return True
+            await self.redis_client.delete(self.stats_key)
+            if deleted_count:
+                print(f"🗑️ 已清空 {deleted_count} 个Redis路径缓存")
             else:
                 print("⚠️ 没有找到Redis路径缓存")
-                return True
+            return True
                 
         except Exception as e:
             print(f"❌ 清空Redis缓存失败: {e}")
             return False
     
+    async def reconcile_stats(self) -> Dict[str, int]:
+        """
+        SCAN全部路径缓存键和共享内容键，按实际键和值长度重写计数（遍历整个键空间，只在后台定期执行）
+
+        Returns:
+            重新统计的计数
+        """
+        counts = defaultdict(int)
+        for pattern in ("r:*:zh-*", "c:*:zh-*"):
+            batch = []
+            async for key in self.redis_client.scan_iter(match=pattern, count=self.scan_batch_size):
+                key = key.decode()
+                if key.endswith(":dbg"):
+                    continue  # 调试数据不计入
+                batch.append(key)
+                if len(batch) >= self.scan_batch_size:
+                    await self.count_keys(batch, counts)
+                    batch = []
+            await self.count_keys(batch, counts)
+        
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.delete(self.stats_key)
+            pipe.hset(self.stats_key, mapping={**counts, "reconciled_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+            await pipe.execute()
+        
+        pruned_count = await self.prune_indexes()
+        print(f"🧮 Redis缓存计数已校准: 路径缓存 {counts['entries']} 个, 共享内容 {counts['content_entries']} 个, "
+              f"清理失效索引成员 {pruned_count} 个")
+        return dict(counts)
+    
+    async def prune_indexes(self) -> int:
+        """
+        清理失效索引中已不存在的缓存键（按TTL过期、按语言对失效后留在域名索引中的成员）
+
+        Returns:
+            移出索引的成员数
+        """
+        pruned_count = 0
+        async for index_key in self.redis_client.scan_iter(match="ri:*", count=self.scan_batch_size):
+            is_domain_index = index_key.startswith(self.domain_index_prefix.encode())
+            members = (
+                self.redis_client.zscan_iter(index_key, count=self.scan_batch_size)
+                if is_domain_index else self.redis_client.sscan_iter(index_key, count=self.scan_batch_size)
+            )
+            batch = []
+            async for member in members:
+                batch.append(member[0] if is_domain_index else member)  # 有序集合返回 (成员, 分值)
+                if len(batch) >= self.scan_batch_size:
+                    pruned_count += await self.prune_index_members(index_key, is_domain_index, batch)
+                    batch = []
+            pruned_count += await self.prune_index_members(index_key, is_domain_index, batch)
+        return pruned_count
+    
+    async def prune_index_members(self, index_key: bytes, is_domain_index: bool, members: List[bytes]) -> int:
+        """一次pipeline检查一批索引成员对应的缓存键是否存在，移出已不存在的成员"""
+        if not members:
+            return 0
+        cache_keys = [member.split(b"\t", 1)[1] if is_domain_index else member for member in members]
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key in cache_keys:
+                pipe.exists(cache_key)
+            existing = await pipe.execute()
+        stale_members = [member for member, exists in zip(members, existing) if not exists]
+        if stale_members:
+            if is_domain_index:
+                await self.redis_client.zrem(index_key, *stale_members)
+            else:
+                await self.redis_client.srem(index_key, *stale_members)
+        return len(stale_members)
+    
+    async def count_keys(self, keys: List[str], counts: Dict[str, int]):
+        """一次pipeline取回一批键的值长度并累加到计数（期间已过期的键不计入）"""
+        if not keys:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.strlen(key)
+            sizes = await pipe.execute()
+        for key, size in zip(keys, sizes):
+            if not size:
+                continue
+            entries_field, bytes_field, *language_fields = self.get_stats_fields(key)
+            for field, value in zip([entries_field, bytes_field, *language_fields], [1, size, 1, size]):
+                counts[field] += value
+    
+    async def reconcile_loop(self):
+        """后台计数校准协程 - 每个校准间隔内所有worker中只有拿到Redis锁的一个执行SCAN"""
+        print("🧮 Redis缓存计数校准协程已启动")
+        while self.reconcile_running:
+            try:
+                if self.redis_client and await self.redis_client.set(
+                    self.reconcile_lock_key, 1, nx=True, ex=self.reconcile_interval
+                ):
+                    await self.reconcile_stats()
+            except Exception as e:
+                print(f"❌ Redis缓存计数校准失败: {e}")
+            try:
+                await asyncio.wait_for(self.reconcile_wakeup.wait(), timeout=self.reconcile_interval)
+            except asyncio.TimeoutError:
+                pass
+        print("🧮 Redis缓存计数校准协程已停止")
+    
+    def start_reconciler(self):
+        """启动后台计数校准协程"""
+        if self.reconcile_running:
+            return
+        self.reconcile_wakeup = asyncio.Event()
+        self.reconcile_running = True
+        self.reconcile_task = asyncio.create_task(self.reconcile_loop())
+    
+    async def stop_reconciler(self):
+        """停止后台计数校准协程"""
+        if not self.reconcile_running:
+            return
+        self.reconcile_running = False
+        self.reconcile_wakeup.set()
+        await self.reconcile_task
+        self.reconcile_task = None
+    
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """连接池指标（占用、峰值、等待时间），未连接时为空"""
+        if not self.connection_pool:
+            return {}
+        return {**self.connection_pool.get_metrics(), "parser": "hiredis" if HIREDIS_AVAILABLE else "python"}
+    
     async def close(self):
-        """关闭Redis连接"""
+        """关闭Redis连接和连接池"""
         if self.redis_client:
-            await self.redis_client.close()
+            await self.redis_client.aclose()
+            self.redis_client = None
+            self.connection_pool = None
             print("✅ Redis路径缓存连接已关闭")
 
 
@@ -0,0 +1,101 @@
+"""
+序列化服务 - 缓存条目和API响应的可插拔序列化层
+"""
+
+import hashlib
+import json
+import time
+from email.utils import formatdate
+from typing import Any, Dict
+from fastapi.responses import JSONResponse
+from app.config.config import get_settings
+
+# orjson / msgpack 为可选依赖，未安装时回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class SerializerService:
+    """序列化服务类"""
+
+    def __init__(self):
+        """初始化序列化服务"""
+        self.settings = get_settings()
+
+        # 缓存序列化格式: orjson / msgpack / json
+        self.cache_format = self.resolve_format(self.settings.cache_serializer)
+        # API响应始终为JSON，有orjson时使用orjson
+        self.json_backend = "orjson" if orjson is not None else "json"
+
+        print(f"🧬 序列化服务初始化完成")
+        print(f"  缓存格式: {self.cache_format} (配置: {self.settings.cache_serializer})")
+        print(f"  响应JSON: {self.json_backend}")
+
+    def resolve_format(self, cache_format: str) -> str:
+        """解析配置的缓存格式，依赖未安装时回退"""
+        cache_format = cache_format.lower()
+        if cache_format == "msgpack" and msgpack is not None:
+            return "msgpack"
+        if cache_format in ("orjson", "msgpack") and orjson is not None:
+            return "orjson"
+        return "json"
+
+    def dumps_json(self, data: Any) -> bytes:
+        """序列化为UTF-8 JSON字节"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+    def loads_json(self, data: bytes) -> Any:
+        """反序列化JSON字节"""
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    def dumps(self, data: Any) -> bytes:
+        """按缓存格式序列化"""
+        if self.cache_format == "msgpack":
+            return msgpack.packb(data, use_bin_type=True)
+        return self.dumps_json(data)
+
+    def loads(self, data: bytes) -> Any:
+        """反序列化缓存数据 - 自动识别JSON和msgpack，兼容切换格式前写入的旧缓存"""
+        if self.is_json(data):
+            return self.loads_json(data)
+        if msgpack is None:
+            raise ValueError("缓存数据为msgpack格式，但未安装msgpack")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def build_validators(self, content: Any) -> Dict[str, str]:
+        """
+        生成缓存条目的HTTP校验信息，写入缓存时随条目保存，命中时无需重新计算
+
+        Returns:
+            {"etag": 序列化内容的MD5, "last_modified": HTTP日期}
+        """
+        return {
+            "etag": hashlib.md5(self.dumps_json(content)).hexdigest(),
+            "last_modified": formatdate(time.time(), usegmt=True)
+        }
+
+    def is_json(self, data: bytes) -> bool:
+        """判断是否为JSON数据 - msgpack的map首字节不会是 { [ 或空白"""
+        return data[:1] in (b'{', b'[', b' ', b'\n', b'\r', b'\t', b'"')
+
+
+# 创建全局实例
+serializer_service = SerializerService()
+
+
+class FastJSONResponse(JSONResponse):
+    """使用序列化服务渲染的JSON响应"""
+
+    def render(self, content: Any) -> bytes:
+        return serializer_service.dumps_json(content)
@@ -0,0 +1,153 @@
+"""
+请求合并服务 - 同一页面同时只执行一次翻译（进程内共享任务 + 跨worker的Redis租约锁）
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+from app.config.config import get_settings
+from app.services.redis_path_cache_service import redis_path_cache_service
+
+
+class SingleflightService:
+    """请求合并服务类"""
+
+    def __init__(self):
+        """初始化请求合并服务"""
+        self.settings = get_settings()
+
+        self.lock_key_prefix = "tl:"                                # Redis翻译锁前缀
+        self.lock_lease = self.settings.translation_lock_lease      # 锁租约(秒)，持有者崩溃后自动释放
+        self.lock_wait = self.settings.translation_lock_wait        # 其他worker等待锁释放的最长时间(秒)
+        self.poll_interval = 0.2                                    # 等待时检查锁的间隔(秒)
+
+        # 进程内正在执行的任务，相同键的并发请求共用一个任务
+        self.inflight: Dict[str, asyncio.Task] = {}
+        # 写入完成后释放锁的后台任务；事件循环只弱引用任务，保留引用避免执行前被回收
+        self.release_tasks: Set[asyncio.Task] = set()
+
+        print(f"🪢 请求合并服务初始化完成")
+        print(f"  锁租约: {self.lock_lease}秒")
+        print(f"  最长等待: {self.lock_wait}秒")
+
+    @property
+    def redis_client(self):
+        """复用Redis路径缓存服务的连接"""
+        return redis_path_cache_service.redis_client
+
+    def get_lock_key(self, key: str) -> str:
+        """生成Redis翻译锁键"""
+        key_hash = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return f"{self.lock_key_prefix}{key_hash}"  # 例如: tl:9e107d9d...
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        进程内合并 - 相同键的并发调用只执行一次func，其余调用等待同一结果
+
+        共享任务不随单个请求取消，其他等待者仍能拿到结果
+        """
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            print(f"🪢 合并到进行中的翻译: {key}")
+        return await asyncio.shield(task)
+
+    async def acquire_lock(self, key: str):
+        """
+        尝试获取跨worker的翻译锁（不阻塞）
+
+        Returns:
+            获取成功返回锁对象；已被其他worker持有返回None；Redis不可用返回False（不做跨worker合并）
+        """
+        if not self.redis_client:
+            return False
+
+        try:
+            lock = self.redis_client.lock(self.get_lock_key(key), timeout=self.lock_lease, blocking=False)
+            if await lock.acquire():
+                return lock
+            return None
+        except Exception as e:
+            print(f"❌ 获取翻译锁失败: {e}")
+            return False
+
+    async def release_lock(self, lock):
+        """释放翻译锁 - 失败时等待租约到期"""
+        try:
+            await lock.release()
+        except Exception as e:
+            print(f"⚠️ 释放翻译锁失败，等待租约到期: {e}")
+
+    async def wait_for_release(self, key: str) -> bool:
+        """
+        等待其他worker释放翻译锁
+
+        Returns:
+            锁已释放返回True，等待超时返回False
+        """
+        lock_key = self.get_lock_key(key)
+        deadline = time.time() + self.lock_wait
+        try:
+            while time.time() < deadline:
+                if not await self.redis_client.exists(lock_key):
+                    return True
+                await asyncio.sleep(self.poll_interval)
+        except Exception as e:
+            print(f"❌ 等待翻译锁失败: {e}")
+        return False
+
+    async def release_after(self, lock, persisted: Awaitable):
+        """结果写入缓存后再释放翻译锁"""
+        try:
+            if not await persisted:
+                print(f"⚠️ 翻译结果未写入缓存，等待中的worker将自行翻译")
+        except Exception as e:
+            print(f"⚠️ 等待缓存写入失败: {e}")
+        finally:
+            await self.release_lock(lock)
+
+    async def run_once(self, key: str, func: Callable[[], Awaitable[Dict]],
+                       load_result: Callable[[], Awaitable[Optional[Dict]]],
+                       persisted: Optional[Callable[[], Awaitable]] = None) -> Dict:
+        """
+        跨worker合并 - 拿到锁的worker执行func，其他worker等待锁释放后读取其写入的结果
+
+        Args:
+            func: 执行翻译并写入缓存
+            load_result: 读取其他worker写入的结果，没有时返回None
+            persisted: 等待func的结果写入缓存；缓存异步写入时锁在写入完成后才释放，不阻塞当前请求
+
+        持有者失败或等待超时时自行执行func
+        """
+        lock = await self.acquire_lock(key)
+        if lock is None:
+            print(f"🪢 其他worker正在翻译，等待结果: {key}")
+            if await self.wait_for_release(key):
+                result = await load_result()
+                if result is not None:
+                    return result
+            print(f"⚠️ 未等到其他worker的结果，自行翻译: {key}")
+
+        try:
+            result = await func()
+        except Exception:
+            if lock:
+                await self.release_lock(lock)
+            raise
+
+        if lock:
+            if persisted:
+                task = asyncio.create_task(self.release_after(lock, persisted()))
+                self.release_tasks.add(task)
+                task.add_done_callback(self.release_tasks.discard)
+            else:
+                await self.release_lock(lock)
+        return result
+
+
+# 创建全局实例
+singleflight_service = SingleflightService()
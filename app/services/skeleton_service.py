@@ -0,0 +1,137 @@
+"""
+骨架存储服务 - 多语言缓存去重：原文骨架按页面只存一份，各语言只存译文片段
+"""
+
+from itertools import chain
+from typing import Dict, List, Optional
+from app.config.config import get_settings
+from app.services.dom_replacement_service import dom_replacement_service
+from app.services.large_html_processor import large_html_processor
+
+
+class SkeletonService:
+    """骨架存储服务类"""
+
+    def __init__(self):
+        """初始化骨架存储服务"""
+        self.settings = get_settings()
+
+        # 缓存存储格式: full=完整译文HTML, skeleton=骨架+译文片段
+        self.storage_format = self.settings.cache_storage_format.lower()
+        self.enabled = self.storage_format == "skeleton"
+        self.slot_marker = "\x00"  # 生成骨架时代替中文片段的槽位标记
+        self.result_sections = ("ultimate_replacement_results", "large_html_results")
+
+        print(f"🦴 骨架存储服务初始化完成")
+        print(f"  缓存存储格式: {self.storage_format}")
+
+    def build_skeleton(self, html_body: str, is_large: bool) -> List[str]:
+        """
+        生成原文骨架
+
+        用替换流程本身（大型HTML逐块）把每个中文片段替换为槽位标记，
+        替换时对文本节点的改写（如去掉首尾空白）同样作用于骨架；
+        再以槽位标记切分，返回槽位之间的固定HTML片段，共 槽位数+1 段
+        """
+        # 原文中已有槽位标记时无法切分，返回的单段骨架不会与任何译文匹配
+        if self.slot_marker in html_body:
+            return [html_body]
+
+        if is_large:
+            chunks, chinese_texts = large_html_processor.extract_chunks(
+                html_body, dom_replacement_service, keep_dom=True
+            )
+            slot_map = dict.fromkeys(chinese_texts, self.slot_marker)
+            base_html = "".join(large_html_processor.iter_replaced_chunks(
+                chunks, dom_replacement_service, slot_map, []
+            ))
+        else:
+            dom_data = dom_replacement_service.extract_all_chinese_with_dom(html_body)
+            slot_map = dict.fromkeys(dom_data["chinese_texts"], self.slot_marker)
+            base_html, _ = dom_replacement_service.ultimate_replace_chinese(html_body, slot_map, dom_data=dom_data)
+        return base_html.split(self.slot_marker)
+
+    def encode(self, skeleton: List[str], translated_html: str) -> Optional[List[str]]:
+        """
+        按骨架拆出译文片段 - 依次定位骨架中的固定片段，之间的内容即为译文片段
+
+        Returns:
+            译文片段列表，译文与骨架对不上时返回None（按完整HTML存储）
+        """
+        head, tail = skeleton[0], skeleton[-1]
+        if len(skeleton) == 1:
+            return [] if translated_html == head else None
+        if not translated_html.startswith(head) or not translated_html.endswith(tail):
+            return None
+
+        segments = []
+        position = len(head)
+        end = len(translated_html) - len(tail)
+        for part in skeleton[1:-1]:
+            found = translated_html.find(part, position, end)
+            if found < 0:
+                return None
+            segments.append(translated_html[position:found])
+            position = found + len(part)
+        if position > end:
+            return None
+        segments.append(translated_html[position:end])
+
+        # 拼回后必须与译文完全一致
+        if self.decode(skeleton, segments) != translated_html:
+            return None
+        return segments
+
+    def decode(self, skeleton: List[str], segments: List[str]) -> str:
+        """骨架与译文片段交替拼接还原译文HTML"""
+        return "".join(chain.from_iterable(zip(skeleton, segments))) + skeleton[-1]
+
+    def compact(self, translation_result: Dict, skeleton: List[str]) -> Optional[Dict]:
+        """
+        把缓存内容中的译文HTML换成译文片段
+
+        Returns:
+            紧凑格式的缓存内容，任一译文与骨架对不上时返回None
+        """
+        content_hash = translation_result["cache_info"]["content_fingerprint"]
+        compacted = dict(translation_result)
+        for section in self.result_sections:
+            if section not in compacted:
+                continue
+            section_data = dict(compacted[section])
+            segments = self.encode(skeleton, section_data.pop("translated_html_body", ""))
+            if segments is None:
+                return None
+            compacted[section] = {"translated_segments": segments, "skeleton_ref": content_hash, **section_data}
+        return compacted
+
+    def get_skeleton_refs(self, translation_result: Dict) -> List[str]:
+        """取出缓存内容引用的骨架"""
+        return [
+            translation_result[section]["skeleton_ref"]
+            for section in self.result_sections
+            if section in translation_result and "skeleton_ref" in translation_result[section]
+        ]
+
+    def expand(self, translation_result: Dict, skeletons: Dict[str, List[str]]) -> Optional[Dict]:
+        """
+        紧凑格式的缓存内容还原为完整译文HTML
+
+        Returns:
+            完整缓存内容，引用的骨架已过期时返回None
+        """
+        expanded = dict(translation_result)
+        for section in self.result_sections:
+            if section not in expanded or "skeleton_ref" not in expanded[section]:
+                continue
+            section_data = dict(expanded[section])
+            skeleton = skeletons.get(section_data.pop("skeleton_ref"))
+            if skeleton is None:
+                return None
+            segments = section_data.pop("translated_segments")
+            expanded[section] = {"translated_html_body": self.decode(skeleton, segments), **section_data}
+        return expanded
+
+
+# 创建全局实例
+skeleton_service = SkeletonService()
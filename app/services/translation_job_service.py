@@ -0,0 +1,338 @@
+"""
+异步翻译任务服务 - 基于Redis队列的后台翻译任务
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional
+from app.config.config import get_settings
+from app.models.translation_models import TranslationRequest
+from app.services.page_translation_service import page_translation_service
+from app.services.redis_path_cache_service import redis_path_cache_service
+from app.services.serializer_service import serializer_service
+
+
+class TranslationJobService:
+    """异步翻译任务服务类 - Redis不可用时回退到进程内队列"""
+
+    def __init__(self):
+        """初始化异步翻译任务服务"""
+        self.settings = get_settings()
+
+        self.queue_key = "tq:jobs"          # Redis任务队列 (LPUSH入队, BLMOVE出队到处理中列表)
+        self.job_key_prefix = "tj:"         # Redis任务状态哈希前缀
+        self.job_ttl = self.settings.translation_job_ttl
+        self.worker_count = self.settings.translation_job_workers
+        self.poll_timeout = 1               # 出队阻塞超时(秒)，用于及时响应停止信号
+
+        # 可靠队列：出队的任务先移入本进程的处理中列表，执行结束后移除；
+        # 进程崩溃后心跳键过期，其他进程把它处理中列表里的任务放回队列
+        self.processing_key_prefix = "tq:processing:"
+        self.heartbeat_key_prefix = "tq:worker:"
+        self.worker_token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_interval = 10        # 心跳和检查中断任务的间隔(秒)
+        self.heartbeat_ttl = 30             # 心跳键过期时间(秒)，超过后视为进程已崩溃
+        self.heartbeat_task: Optional[asyncio.Task] = None
+
+        # 轮询任务状态时只读取这些字段，不读取请求体和结果
+        self.status_fields = ["status", "progress", "stage", "message", "path", "error",
+                              "created_at", "updated_at", "started_at", "finished_at"]
+
+        # Redis不可用时的进程内队列和任务表
+        self.local_queue: asyncio.Queue = asyncio.Queue()
+        self.local_jobs: Dict[str, Dict] = {}
+
+        self.workers: List[asyncio.Task] = []
+        self.running = False
+
+        print(f"📮 异步翻译任务服务初始化完成")
+        print(f"  任务队列: {self.queue_key}")
+        print(f"  后台工作协程: {self.worker_count}个")
+        print(f"  任务保留时间: {self.job_ttl}秒")
+
+    @property
+    def redis_client(self):
+        """复用Redis路径缓存服务的连接"""
+        return redis_path_cache_service.redis_client
+
+    def get_job_key(self, job_id: str) -> str:
+        """生成任务状态键"""
+        return f"{self.job_key_prefix}{job_id}"  # 例如: tj:3f2a...
+
+    @property
+    def processing_key(self) -> str:
+        """本进程的处理中列表"""
+        return f"{self.processing_key_prefix}{self.worker_token}"  # 例如: tq:processing:host:1234:ab12cd34
+
+    @property
+    def heartbeat_key(self) -> str:
+        """本进程的心跳键"""
+        return f"{self.heartbeat_key_prefix}{self.worker_token}"
+
+    def dump_value(self, data) -> bytes:
+        """序列化并压缩任务数据（请求和结果可能很大）"""
+        return redis_path_cache_service.compress_data(serializer_service.dumps(data))
+
+    def load_value(self, data: bytes):
+        """解压并反序列化任务数据"""
+        return serializer_service.loads(redis_path_cache_service.decompress_data(data))
+
+    async def save_job_fields(self, job_id: str, fields: Dict):
+        """更新任务状态字段"""
+        fields = {**fields, "updated_at": time.time()}
+
+        if not self.redis_client:
+            self.local_jobs.setdefault(job_id, {}).update(fields)
+            return
+
+        job_key = self.get_job_key(job_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(job_key, mapping={
+            field: value if isinstance(value, bytes) else str(value)
+            for field, value in fields.items()
+        })
+        pipe.expire(job_key, self.job_ttl)
+        await pipe.execute()
+
+    async def submit_job(self, request: TranslationRequest) -> str:
+        """提交翻译任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        if not self.redis_client:
+            self.local_jobs[job_id] = {
+                "status": "queued",
+                "progress": 0,
+                "stage": "queued",
+                "message": "任务已排队",
+                "path": request.path,
+                "request": request.model_dump(),
+                "created_at": now,
+                "updated_at": now
+            }
+            await self.local_queue.put(job_id)
+            print(f"📮 任务已进入进程内队列: {job_id}")
+            return job_id
+
+        await self.save_job_fields(job_id, {
+            "status": "queued",
+            "progress": 0,
+            "stage": "queued",
+            "message": "任务已排队",
+            "path": request.path,
+            "request": self.dump_value(request.model_dump()),
+            "created_at": now
+        })
+        await self.redis_client.lpush(self.queue_key, job_id)
+        print(f"📮 任务已进入Redis队列: {job_id}")
+        return job_id
+
+    async def get_job(self, job_id: str, include_result: bool = True) -> Optional[Dict]:
+        """
+        获取任务状态，任务不存在或已过期时返回None
+
+        只用HMGET读取状态字段，不读取请求体；include_result=False时也不读取和解压结果，供轮询使用
+        """
+        if not self.redis_client:
+            job = self.local_jobs.get(job_id)
+            if job is None:
+                return None
+            raw = {field: value for field, value in job.items() if field != "request"}
+        else:
+            field_names = self.status_fields + (["result"] if include_result else [])
+            values = await self.redis_client.hmget(self.get_job_key(job_id), field_names)
+            if values[0] is None:
+                return None
+            raw = {field: value for field, value in zip(field_names, values) if value is not None}
+            for field in ("status", "stage", "message", "path", "error"):
+                if field in raw:
+                    raw[field] = raw[field].decode('utf-8')
+            for field in ("created_at", "updated_at", "started_at", "finished_at"):
+                if field in raw:
+                    raw[field] = float(raw[field])
+            raw["progress"] = int(raw.get("progress", 0))
+            if "result" in raw:
+                raw["result"] = self.load_value(raw["result"])
+
+        job = {"job_id": job_id, **raw}
+        if not include_result:
+            job.pop("result", None)
+        return job
+
+    async def load_request(self, job_id: str) -> Optional[TranslationRequest]:
+        """读取任务的翻译请求"""
+        if not self.redis_client:
+            job = self.local_jobs.get(job_id)
+            return TranslationRequest(**job["request"]) if job else None
+
+        data = await self.redis_client.hget(self.get_job_key(job_id), "request")
+        if data is None:
+            return None
+        return TranslationRequest(**self.load_value(data))
+
+    async def dequeue_job(self) -> Optional[str]:
+        """取出一个待处理任务，超时返回None"""
+        if not self.redis_client:
+            try:
+                return await asyncio.wait_for(self.local_queue.get(), timeout=self.poll_timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        job_id = await self.redis_client.blmove(
+            self.queue_key, self.processing_key, self.poll_timeout, src="RIGHT", dest="LEFT"
+        )
+        if job_id is None:
+            return None
+        return job_id.decode('utf-8')
+
+    async def ack_job(self, job_id: str):
+        """任务执行结束（完成或失败），移出处理中列表"""
+        if self.redis_client:
+            await self.redis_client.lrem(self.processing_key, 1, job_id)
+
+    async def requeue_processing(self, processing_key: str) -> int:
+        """把处理中列表里的任务逐个放回队列头部（最先出队），返回放回的任务数"""
+        requeued = 0
+        while True:
+            job_id = await self.redis_client.lmove(processing_key, self.queue_key, src="RIGHT", dest="RIGHT")
+            if job_id is None:
+                return requeued
+            requeued += 1
+            await self.save_job_fields(job_id.decode('utf-8'), {
+                "status": "queued",
+                "stage": "queued",
+                "message": "工作进程中断，任务已重新排队"
+            })
+
+    async def requeue_stale_jobs(self) -> int:
+        """检查所有处理中列表，心跳已过期的进程未完成的任务放回队列"""
+        requeued = 0
+        async for processing_key in self.redis_client.scan_iter(match=f"{self.processing_key_prefix}*"):
+            processing_key = processing_key.decode('utf-8')
+            token = processing_key[len(self.processing_key_prefix):]
+            if token == self.worker_token or await self.redis_client.exists(f"{self.heartbeat_key_prefix}{token}"):
+                continue
+            requeued += await self.requeue_processing(processing_key)
+        if requeued:
+            print(f"♻️ 已将 {requeued} 个中断的翻译任务重新排队")
+        return requeued
+
+    async def heartbeat_loop(self):
+        """心跳协程 - 定期续期本进程心跳，并回收已崩溃进程的任务（启动时立即检查一次）"""
+        while self.running:
+            try:
+                await self.redis_client.set(self.heartbeat_key, 1, ex=self.heartbeat_ttl)
+                await self.requeue_stale_jobs()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ 翻译任务心跳异常: {e}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def process_job(self, job_id: str):
+        """执行单个翻译任务"""
+        request = await self.load_request(job_id)
+        if request is None:
+            print(f"⚠️ 任务已过期或不存在: {job_id}")
+            return
+
+        print(f"🚀 开始执行翻译任务: {job_id} ({request.path})")
+        await self.save_job_fields(job_id, {
+            "status": "running",
+            "progress": 5,
+            "stage": "started",
+            "message": "任务执行中",
+            "started_at": time.time()
+        })
+
+        async def report_progress(progress: int, stage: str):
+            await self.save_job_fields(job_id, {"progress": progress, "stage": stage})
+
+        try:
+            result = await page_translation_service.translate_with_cache(request, progress_callback=report_progress)
+            await self.save_job_fields(job_id, {
+                "status": "completed",
+                "progress": 100,
+                "stage": "completed",
+                "message": result["message"],
+                "result": result if not self.redis_client else self.dump_value(result),
+                "finished_at": time.time()
+            })
+            print(f"✅ 翻译任务完成: {job_id}")
+        except Exception as e:
+            await self.save_job_fields(job_id, {
+                "status": "failed",
+                "stage": "failed",
+                "message": "任务执行失败",
+                "error": str(e),
+                "finished_at": time.time()
+            })
+            print(f"❌ 翻译任务失败: {job_id} - {e}")
+
+    async def worker_loop(self, worker_id: int):
+        """后台工作协程 - 循环取出并执行任务"""
+        print(f"👷 翻译任务工作协程 #{worker_id} 已启动")
+        while self.running:
+            try:
+                job_id = await self.dequeue_job()
+                if job_id:
+                    try:
+                        await self.process_job(job_id)
+                    except asyncio.CancelledError:
+                        raise  # 被中断的任务留在处理中列表，停止时放回队列
+                    except Exception:
+                        await self.ack_job(job_id)
+                        raise
+                    await self.ack_job(job_id)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"❌ 翻译任务工作协程 #{worker_id} 异常: {e}")
+                await asyncio.sleep(self.poll_timeout)
+        print(f"👷 翻译任务工作协程 #{worker_id} 已停止")
+
+    def start(self, worker_count: Optional[int] = None):
+        """启动后台工作协程"""
+        if self.running:
+            return
+        self.running = True
+        worker_count = self.worker_count if worker_count is None else worker_count
+        self.workers = [asyncio.create_task(self.worker_loop(i)) for i in range(worker_count)]
+        if self.redis_client:
+            self.heartbeat_task = asyncio.create_task(self.heartbeat_loop())
+        print(f"✅ 已启动 {len(self.workers)} 个翻译任务工作协程 ({'Redis' if self.redis_client else '进程内'}队列)")
+
+    async def stop(self):
+        """停止后台工作协程，被中断的任务放回队列"""
+        self.running = False
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            await asyncio.gather(self.heartbeat_task, return_exceptions=True)
+            self.heartbeat_task = None
+            try:
+                requeued = await self.requeue_processing(self.processing_key)
+                if requeued:
+                    print(f"♻️ 已将 {requeued} 个未完成的翻译任务放回队列")
+                await self.redis_client.delete(self.heartbeat_key)
+            except Exception as e:
+                print(f"⚠️ 放回未完成的翻译任务失败，等待其他进程回收: {e}")
+
+    async def run_forever(self, worker_count: Optional[int] = None):
+        """独立工作进程入口 - 持续执行任务直到被取消"""
+        self.start(worker_count)
+        try:
+            await asyncio.gather(*self.workers)
+        finally:
+            await self.stop()
+
+
+# 创建全局实例
+translation_job_service = TranslationJobService()
@@ -0,0 +1,134 @@
+"""
+序列化基准测试 - 对比 json / orjson / msgpack 在真实缓存条目上的编解码性能
+
+用法:
+    python benchmarks/bench_serializer.py [页面数量]
+"""
+
+import gzip
+import json
+import random
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+WORDS = ["新闻", "公司", "产品", "服务", "首页", "联系我们", "关于", "最新动态", "客户案例", "解决方案"]
+
+
+def build_page(paragraphs: int) -> dict:
+    """构造一个与Redis/文件缓存中结构一致的标准页面缓存条目"""
+    random.seed(paragraphs)
+    translation_map = {
+        f"{random.choice(WORDS)}{i}{random.choice(WORDS)}": f"translated text number {i} for this fragment"
+        for i in range(paragraphs // 4)
+    }
+    fragments = list(translation_map.items())
+    body = "".join(
+        f'<div class="item-{i}"><a href="/news/{i}.html" title="{fragments[i % len(fragments)][1]}">'
+        f'{fragments[i % len(fragments)][1]}</a><p>{fragments[(i * 7) % len(fragments)][1]}</p></div>'
+        for i in range(paragraphs)
+    )
+    return {
+        "metadata": {
+            "cache_key": "a1b2c3d4e5f6",
+            "path": "https://example.com/news/list",
+            "source_lang": "zh",
+            "target_lang": "en",
+            "cache_method": "path_hash_md5"
+        },
+        "content": {
+            "request_info": {
+                "path": "https://example.com/news/list",
+                "html_length": len(body),
+                "source_language": "zh",
+                "target_language": "en",
+                "processing_mode": "standard",
+                "cache_strategy": "redis_cache"
+            },
+            "dom_extraction_results": {
+                "total_text_nodes": paragraphs * 2,
+                "total_chinese_segments": paragraphs * 3,
+                "unique_chinese_texts": len(translation_map)
+            },
+            "translation_results": {
+                "success_count": len(translation_map),
+                "failed_count": 0,
+                "total_count": paragraphs * 3,
+                "unique_count": len(translation_map),
+                "duration": 2.8
+            },
+            "ultimate_replacement_results": {
+                "translated_html_body": f"<html><body>{body}</body></html>",
+                "replacement_statistics": {
+                    "original_chinese_count": paragraphs * 3,
+                    "remaining_chinese_count": 0,
+                    "replaced_count": paragraphs * 3,
+                    "replacement_rate": 100.0,
+                    "remaining_texts": []
+                }
+            },
+            "cache_info": {"translation_map": translation_map}
+        }
+    }
+
+
+def measure(func, rounds: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    entry = build_page(paragraphs)
+
+    codecs = {
+        "json": (
+            lambda data: json.dumps(data, ensure_ascii=False).encode('utf-8'),
+            lambda raw: json.loads(raw)
+        )
+    }
+    if orjson is not None:
+        codecs["orjson"] = (
+            lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+            orjson.loads
+        )
+    if msgpack is not None:
+        codecs["msgpack"] = (
+            lambda data: msgpack.packb(data, use_bin_type=True),
+            lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False)
+        )
+
+    html_size = len(entry["content"]["ultimate_replacement_results"]["translated_html_body"])
+    print(f"页面HTML: {html_size / 1024:.1f} KB, 翻译映射: {len(entry['content']['cache_info']['translation_map'])} 条")
+    print(f"{'格式':<10}{'大小KB':>10}{'gzip KB':>10}{'编码ms':>10}{'解码ms':>10}{'编码倍数':>10}{'解码倍数':>10}")
+
+    baseline = None
+    for name, (dumps, loads) in codecs.items():
+        raw = dumps(entry)
+        rounds = 50
+        encode_ms = measure(lambda: dumps(entry), rounds)
+        decode_ms = measure(lambda: loads(raw), rounds)
+        if baseline is None:
+            baseline = (encode_ms, decode_ms)
+        print(
+            f"{name:<10}{len(raw) / 1024:>10.1f}{len(gzip.compress(raw)) / 1024:>10.1f}"
+            f"{encode_ms:>10.2f}{decode_ms:>10.2f}"
+            f"{baseline[0] / encode_ms:>10.1f}{baseline[1] / decode_ms:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
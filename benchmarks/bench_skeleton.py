@@ -0,0 +1,129 @@
+"""
+骨架存储基准测试 - 对比完整译文HTML与 骨架+译文片段 两种缓存存储格式
+
+对比多语言缓存占用的字节数，以及命中时读取（解压+反序列化+拼接）的耗时；
+各语言译文由实际的替换流程 ultimate_replace_chinese 生成，只有翻译API用固定的伪译文代替
+
+用法:
+    python benchmarks/bench_skeleton.py [段落数量] [目标语言数量]
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.dom_replacement_service import dom_replacement_service
+from app.services.skeleton_service import skeleton_service
+
+
+WORDS = ["新闻", "公司", "产品", "服务", "首页", "联系我们", "关于", "最新动态", "客户案例", "解决方案"]
+ENGLISH_WORDS = ["news", "company", "product", "service", "home", "contact", "about", "latest", "case", "solution"]
+
+
+def build_page(paragraphs: int) -> str:
+    """构造一个典型的中文列表页 - 带缩进和换行"""
+    random.seed(paragraphs)
+    items = "".join(
+        f'\n    <div class="item item-{i}">\n      <a href="/news/{i}.html" title="{random.choice(WORDS)}{i}">\n'
+        f'        {random.choice(WORDS)}{random.choice(WORDS)}\n      </a>\n      <p class="summary">\n'
+        f'        {random.choice(WORDS)}，{random.choice(WORDS)}。\n      </p>\n'
+        f'      <span class="date">2024-01-{i % 28 + 1:02d}</span>\n    </div>'
+        for i in range(paragraphs)
+    )
+    return (
+        f'<html>\n<head>\n  <title>{WORDS[0]}</title>\n</head>\n<body>\n'
+        f'  <div class="list">{items}\n  </div>\n</body>\n</html>'
+    )
+
+
+def translate(html_body: str, chinese_texts: list, language: str) -> str:
+    """用实际替换流程生成某一目标语言的译文 - 伪译文长度接近真实英文译文"""
+    translation_map = {
+        text: " ".join(f"{language}-{ENGLISH_WORDS[ord(char) % len(ENGLISH_WORDS)]}" for char in text[::2])
+        for text in chinese_texts
+    }
+    translated_html, _ = dom_replacement_service.ultimate_replace_chinese(html_body, translation_map)
+    return translated_html
+
+
+def pack(data) -> bytes:
+    return gzip.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def unpack(raw: bytes):
+    return json.loads(gzip.decompress(raw))
+
+
+def measure(func, rounds: int) -> float:
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    language_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    languages = [f"l{i}" for i in range(language_count)]
+
+    html_body = build_page(paragraphs)
+    # 替换流程逐节点打印日志，基准测试中不输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        chinese_texts = list(dict.fromkeys(
+            dom_replacement_service.extract_all_chinese_with_dom(html_body)["chinese_texts"]
+        ))
+        skeleton = skeleton_service.build_skeleton(html_body, is_large=False)
+        translations = {language: translate(html_body, chinese_texts, language) for language in languages}
+
+    # 完整格式：每种语言一份完整译文HTML
+    full_entries = {language: pack({"translated_html_body": html}) for language, html in translations.items()}
+
+    # 骨架格式：骨架一份 + 每种语言一份译文片段
+    skeleton_entry = pack({"skeleton": skeleton})
+    segments = {language: skeleton_service.encode(skeleton, html) for language, html in translations.items()}
+    unmatched = [language for language, language_segments in segments.items() if language_segments is None]
+    if unmatched:
+        raise SystemExit(f"译文与骨架不一致: {unmatched}")
+    segment_entries = {
+        language: pack({"translated_segments": language_segments})
+        for language, language_segments in segments.items()
+    }
+
+    full_bytes = sum(len(raw) for raw in full_entries.values())
+    skeleton_bytes = len(skeleton_entry) + sum(len(raw) for raw in segment_entries.values())
+
+    rounds = 50
+    language = languages[0]
+    full_read_ms = measure(lambda: unpack(full_entries[language])["translated_html_body"], rounds)
+    skeleton_read_ms = measure(
+        lambda: skeleton_service.decode(
+            unpack(skeleton_entry)["skeleton"],
+            unpack(segment_entries[language])["translated_segments"]
+        ),
+        rounds
+    )
+    assert skeleton_service.decode(skeleton, unpack(segment_entries[language])["translated_segments"]) == translations[language]
+
+    print(f"页面HTML: {len(html_body) / 1024:.1f} KB, 槽位: {len(skeleton) - 1}, 目标语言: {language_count}")
+    print(f"{'格式':<10}{'总大小KB':>12}{'单语言读取KB':>14}{'读取ms':>10}")
+    print(
+        f"{'full':<10}{full_bytes / 1024:>12.1f}"
+        f"{len(full_entries[language]) / 1024:>14.1f}{full_read_ms:>10.2f}"
+    )
+    print(
+        f"{'skeleton':<10}{skeleton_bytes / 1024:>12.1f}"
+        f"{(len(skeleton_entry) + len(segment_entries[language])) / 1024:>14.1f}{skeleton_read_ms:>10.2f}"
+    )
+    print(f"存储节省: {full_bytes / skeleton_bytes:.1f}x, 读取耗时比: {skeleton_read_ms / full_read_ms:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
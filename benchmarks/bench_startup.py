@@ -0,0 +1,119 @@
+"""
+启动基准测试 - 测量工作进程从启动到可用（time-to-ready）的耗时
+
+每轮在全新的Python进程和空的工作目录中执行，分别测量:
+  - 导入独立工作进程（worker.py）依赖的服务模块
+  - 导入API应用（app.main）
+  - 首次文件缓存写入+读取（索引打开、分片目录创建推迟到这里）
+并与启动时预先创建全部 10×256 个分片目录的耗时对比
+
+用法:
+    python benchmarks/bench_startup.py [轮数]
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的测量脚本，结果以JSON输出在最后一行
+CHILD_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+result = {}
+try:
+    __import__(sys.argv[1])
+    result["import_ms"] = (time.perf_counter() - start) * 1000
+except Exception as e:
+    result["error"] = f"{type(e).__name__}: {e}"
+    print(json.dumps(result))
+    sys.exit(0)
+
+from app.services.file_cache_service import get_file_cache_service
+
+async def first_hit():
+    file_cache_service = get_file_cache_service()
+    await file_cache_service.set_cache("https://example.com/bench", "zh", "en", {"ultimate_replacement_results": {"translated_html_body": "<p>hello</p>"}})
+    return await file_cache_service.get_cache("https://example.com/bench", "zh", "en")
+
+start = time.perf_counter()
+asyncio.run(first_hit())
+result["first_cache_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+MODULES = [
+    ("工作进程 (translation_job_service)", "app.services.translation_job_service"),
+    ("API应用 (app.main)", "app.main"),
+]
+
+
+def run_child(module: str) -> dict:
+    """在全新进程和空工作目录中导入模块，返回测量结果"""
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        # app.main 挂载了相对工作目录的 static 目录
+        os.symlink(os.path.join(ROOT_DIR, "static"), os.path.join(work_dir, "static"))
+        env = {**os.environ, "PYTHONPATH": ROOT_DIR}
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT, module],
+            cwd=work_dir, env=env, capture_output=True, text=True
+        )
+        total_ms = (time.perf_counter() - start) * 1000
+        lines = completed.stdout.strip().splitlines()
+        result = json.loads(lines[-1]) if lines else {"error": completed.stderr.strip().splitlines()[-1]}
+        result["process_ms"] = total_ms
+        return result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def measure_eager_directories() -> float:
+    """启动时预先创建全部语言对分片目录的耗时（毫秒）"""
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_dirs_")
+    try:
+        start = time.perf_counter()
+        for language in range(10):
+            for i in range(16):
+                for j in range(16):
+                    os.makedirs(os.path.join(work_dir, f"lang-{language}", f"{i:02x}", f"{j:02x}"), exist_ok=True)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"启动基准测试: {rounds} 轮，每轮全新进程 + 空缓存目录")
+    print()
+    print(f"{'模块':<36}{'导入(ms)':>12}{'首次缓存(ms)':>16}{'进程总计(ms)':>16}")
+    print("-" * 80)
+
+    for title, module in MODULES:
+        results = [run_child(module) for _ in range(rounds)]
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            print(f"{title:<36}  导入失败: {errors[0]}")
+            continue
+        print(
+            f"{title:<36}"
+            f"{statistics.median(result['import_ms'] for result in results):>12.1f}"
+            f"{statistics.median(result['first_cache_ms'] for result in results):>16.1f}"
+            f"{statistics.median(result['process_ms'] for result in results):>16.1f}"
+        )
+
+    print()
+    eager_ms = statistics.median(measure_eager_directories() for _ in range(rounds))
+    print(f"对比: 启动时预先创建 10×256 个分片目录需 {eager_ms:.1f} ms（现改为首次写入时按需创建）")
+
+
+if __name__ == "__main__":
+    main()
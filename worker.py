@@ -0,0 +1,30 @@
+"""
+异步翻译任务独立工作进程 - 从Redis队列取出任务执行翻译
+
+用法: python worker.py [工作协程数]
+"""
+
+import asyncio
+import sys
+from app.services.redis_path_cache_service import redis_path_cache_service
+from app.services.translation_job_service import translation_job_service
+
+
+async def main():
+    worker_count = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    if not await redis_path_cache_service.initialize():
+        print("❌ Redis不可用，独立工作进程无法共享任务队列，退出")
+        return
+
+    try:
+        await translation_job_service.run_forever(worker_count)
+    finally:
+        await redis_path_cache_service.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("👋 翻译任务工作进程已停止")